@@ -1,5 +1,4 @@
-import os
-from utils.datetime_utils import get_current_time_with_offset
+import asyncio, logging, re, time
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
@@ -7,11 +6,20 @@ from langgraph.graph import MessagesState, START, StateGraph, END
 from langgraph.prebuilt import ToolNode
 from langgraph.checkpoint.memory import MemorySaver
 
-from utils.llmUtils import getLLM, filter_messages
-from utils.pr_utils import fetch_pr_diff, slice_diff, annotate_diff
+from utils.llmUtils import getLLM
+from utils.prompt_utils import build_messages
+from utils.pr_utils import (
+    fetch_pr_diff_index, fetch_pr_head, fetch_compare_diff, parse_pr_url, chunk_diff,
+)
+from utils.pr_cache import pr_cache, full_review
+from utils.diff_engine import DiffResult
+from utils import code_context
+from utils.github_client import GitHubError
+from constants import PREVIEW_CHUNK_TOKENS, PREVIEW_CONCURRENCY
 from tools.tools_list import tools_list
 
 tool_node = ToolNode(tools_list["PREVIEW"])
+logger = logging.getLogger(__name__)
 # --- BASE SYSTEM PROMPT ---
 BASE_SYSTEM = """
     You are a senior developer reviewing a GitHub Pull Request (PR). Your goal is to help your teammate by pointing out specific improvements.
@@ -51,29 +59,147 @@ llm_with_tools = llm.bind_tools(tools_list["PREVIEW"])
 model_with_prompt = instruction_prompt | llm_with_tools
 
 
+# --- Map-reduce review for large diffs ---
+MERGE_PROMPT = """The pull request was too large for one pass and was reviewed in {n} parts.
+Below are the findings of each part. Merge them into one review:
+- drop duplicates and findings that say the same thing about different parts
+- group the rest by file, most important first
+- keep every concrete code suggestion and file:line reference as is
+- follow your formatting rules
+
+{notes}"""
+
+_CHUNK_FILE_RE = re.compile(r"^\+\+\+ b/(.+)$", re.M)
+
+async def review_chunk(query: str, chunk: str, index: int, total: int,
+                       semaphore: asyncio.Semaphore, config: RunnableConfig,
+                       context: list = ()) -> str:
+    """
+    Findings for one piece of the diff; only the PR link and the definitions
+    of this piece's files go along, not the chat history.
+    """
+    async with semaphore:
+        result = await model_with_prompt.ainvoke({"messages": [
+            ("user", query),
+            *context,
+            ("user", f"```Pull Request difference (part {index + 1} of {total}) : \n{chunk}\n```\n"
+                     "List the issues in this part only. No summary."),
+        ]}, config=config)
+    return result.content
+
 # --- Core invoke function for assistant node ---
 async def invoke(state: dict, config: RunnableConfig):
+    """
+    Review the PR in the last message.  Unchanged PRs (same head SHA, checked
+    with a conditional request) get the cached review back; PRs that moved
+    since the last review get only the commits in between reviewed.
+    """
     query = next(m.content for m in state["messages"][::-1] if m.type == "human")
-    diff_raw = await fetch_pr_diff(query, token=os.getenv("GITHUB_PAT"))
-    if not diff_raw:
+    pr = parse_pr_url(query)
+    entry = pr_cache.load(*pr) if pr else None
+    head = etag = None
+    if pr:
+        try:
+            head, etag = await fetch_pr_head(*pr, etag=(entry or {}).get("etag"))
+            if head is None:                                  # 304 Not Modified
+                head = entry["head_sha"]
+        except Exception as e:
+            logger.warning(f"PREVIEW could not read PR head, reviewing without cache: {e!r}")
+
+    diff = since = None
+    if entry and head and entry.get("review"):
+        if head == entry["head_sha"]:
+            logger.info(f"PREVIEW cache hit {pr} @ {head[:7]}")
+            return {"messages": [AIMessage(content=full_review(entry))]}
+        diff = await fetch_compare_diff(pr[0], pr[1], entry["head_sha"], head)
+        if diff is not None and not diff.files:              # e.g. empty merge commit
+            return {"messages": [AIMessage(content=full_review(entry))]}
+        since = entry["head_sha"] if diff else None
+    if not diff:
+        try:
+            diff = await fetch_pr_diff_index(query)
+        except GitHubError as e:
+            logger.error(f"PREVIEW diff fetch failed: {e}")
+            return {"messages": [("system", f"❌ Unable to fetch diff ({e}).")]}
+    if not diff or not diff.text:
         return {"messages": [("system","❌ Unable to fetch diff.")]}
 
-    diff_cut = slice_diff(diff_raw, context=3)
-    diff_trim = annotate_diff(diff_cut)
-    # Clean messages and append diff
-    state["messages"] = filter_messages(state["messages"])
-    state["messages"].append(("system", f"Today is {get_current_time_with_offset(config).strftime('%d-%m-%Y %H:%M:%S')}. TimeZone configured for the logged in user in the Mobile Cloud is {config.get('configurable', {}).get('timezone', 'Asia/Kolkata')}, with an offset of {config.get('configurable', {}).get('timezone_offset', 330)} minutes."))
-    state["messages"].append(("user",f"```Pull Request difference : \n{diff_trim}\n```"))
-    result = await model_with_prompt.ainvoke(state, config=config)
+    context = {}
+    if head:
+        try:
+            context = await code_context.enrich(pr[0], pr[1], head, diff.files)
+        except Exception as e:
+            logger.warning(f"PREVIEW code context skipped: {e!r}")
+
+    result = await review_diff(state, config, query, diff, since, context)
+    if since:
+        # the full review stays the base; the delta is kept alongside it
+        update = {"since": since, "head": head, "review": result.content}
+        pr_cache.save(*pr, head_sha=head, etag=etag, review=entry["review"],
+                      updates=entry.get("updates", []) + [update])
+        result.content = (f"Changes since the last review ({since[:7]} → {head[:7]}):\n\n"
+                          + result.content)
+    elif head:
+        pr_cache.save(*pr, head_sha=head, etag=etag, review=result.content)
     return {"messages": [result]}
 
+def context_message(context: dict[str, list[str]], paths=None) -> list:
+    """Enclosing definitions (at the PR head) of the given files, as an extra message."""
+    blocks = [b for p, bs in context.items() if paths is None or p in paths for b in bs]
+    if not blocks:
+        return []
+    return [("user", "Full definitions around the changed lines, at the PR head "
+                     "(context only, review the diff):\n```python\n"
+                     + "\n\n".join(blocks) + "\n```")]
+
+async def review_diff(state: dict, config: RunnableConfig, query: str, diff: DiffResult,
+                      since: str | None = None, context: dict[str, list[str]] | None = None):
+    """One review call for small diffs, map-reduce over chunks for large ones."""
+    context = context or {}
+    diff_trim = diff.text                     # sliced + annotated in one pass
+    label = f" (only commits after {since[:7]}, which was already reviewed)" if since else ""
+    chunks = chunk_diff(diff_trim, PREVIEW_CHUNK_TOKENS)
+    if len(chunks) <= 1:
+        messages = build_messages(
+            state["messages"], config,
+            *context_message(context),
+            ("user", f"```Pull Request difference{label} : \n{diff_trim}\n```"),
+            agent="PREVIEW",
+        )
+        return await model_with_prompt.ainvoke({"messages": messages}, config=config)
+
+    # map: review every chunk on its own, a few at a time
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(PREVIEW_CONCURRENCY)
+    reviews = await asyncio.gather(
+        *(review_chunk(query + label, chunk, i, len(chunks), semaphore, config,
+                       context_message(context, set(_CHUNK_FILE_RE.findall(chunk))))
+          for i, chunk in enumerate(chunks)),
+        return_exceptions=True,
+    )
+    notes = []
+    for i, review in enumerate(reviews, 1):
+        if isinstance(review, Exception):
+            logger.error(f"PREVIEW chunk {i}/{len(chunks)} failed: {review!r}")
+            notes.append(f"### Part {i}\n(review of this part failed)")
+        else:
+            notes.append(f"### Part {i}\n{review}")
+    logger.info(f"PREVIEW reviewed {len(chunks)} chunks in {time.perf_counter() - started:.2f}s")
+
+    # reduce: one pass to merge and de-duplicate
+    messages = build_messages(
+        state["messages"], config,
+        ("user", MERGE_PROMPT.format(n=len(chunks), notes="\n\n".join(notes))),
+        agent="PREVIEW",
+    )
+    return await model_with_prompt.ainvoke({"messages": messages}, config=config)
+
 # --- Conditional Edge Logic ---
 def should_continue(state):
     last_message = state["messages"][-1]
     return "continue" if getattr(last_message, "tool_calls", None) else "end"
 
 # --- LangGraph Setup ---
-memory = MemorySaver()
 graph = StateGraph(MessagesState)
 
 graph.add_node("assistant", invoke)
@@ -91,4 +217,8 @@ graph.add_conditional_edges(
 graph.add_edge("tools", "assistant")
 
 # --- Compile Graph ---
-preview = graph.compile(checkpointer=memory)
+def get_preview(checkpointer=None):
+    """Compile PREVIEW against `checkpointer` (in-process MemorySaver by default)."""
+    return graph.compile(checkpointer=checkpointer or MemorySaver())
+
+preview = get_preview()
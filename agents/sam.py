@@ -6,10 +6,10 @@ from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
 from langgraph.checkpoint.memory import MemorySaver
-from utils.llmUtils import getLLM
+from utils.llmUtils import getLLM, is_empty_response
 from tools.tools_list import tools_list
-from utils.datetime_utils import get_current_time_with_offset
-from utils.llmUtils import filter_messages
+from utils.prompt_utils import build_messages
+from constants import EMPTY_RESPONSE_RETRIES
 tool_node = ToolNode(tools_list["SAM"])
 
 # Set up the model with an instruction prompt
@@ -24,6 +24,7 @@ instruction_prompt = ChatPromptTemplate.from_messages([
         Once you get all the order of the user, you can store order ids of the user to use it to get the order item details.
         one order can have multiple order items and you have to ask order id and order item id from the user for which he want details if he ask for their order item details.
         once you get order id and order item id, you can call get_order_item_detials_tool to get tracking of that item, its status, its refund status, payment details of that item.
+        When the user asks about more than one item of an order, call get_order_items_batch_tool once with all the order item ids instead of calling get_order_item_details_tool per item. Fields in its `common` section apply to every item.
         Your role involves:
         -> Analyzing the user's request and determining the correct action.
         -> IDs of order and order items which form a part of many tool calls. IDs can be retreived via tool calls that return order/item details.
@@ -54,14 +55,13 @@ model = instruction_prompt | model.bind_tools(tools_list["SAM"])
 
 
 async def invoke(state: dict, config: RunnableConfig):
-    while True:
-        state["messages"] = filter_messages(state["messages"])
-        state["messages"].append(("system", f"Today is {get_current_time_with_offset(config).strftime('%d-%m-%Y %H:%M:%S')}. TimeZone configured for the logged in user in the Mobile Cloud is {config.get('configurable', {}).get('timezone', 'Asia/Kolkata')}, with an offset of {config.get('configurable', {}).get('timezone_offset', 330)} minutes."))
-        result = await model.ainvoke(state, config=config)
-        if not result.tool_calls and (not result.content or isinstance(result.content, list) and not result.content[0].get("text")):
-            state["messages"].append(("user", "Please provide a meaningful response."))
-        else:
+    messages = build_messages(state["messages"], config, agent="SAM")
+    for attempt in range(EMPTY_RESPONSE_RETRIES + 1):
+        result = await model.ainvoke({"messages": messages}, config=config)
+        if not is_empty_response(result):
             break
+        if attempt == 0:                     # nudge once, locally only
+            messages = messages + [("user", "Please provide a meaningful response.")]
     return {"messages": result}
 
 
@@ -77,8 +77,7 @@ def should_continue(state):
     else:
         return "continue"
 
-# Initialize memory and state graph
-memory = MemorySaver()
+# Initialize state graph
 red_builder = StateGraph(MessagesState)
 
 # Define nodes and edges
@@ -97,4 +96,8 @@ red_builder.add_conditional_edges(
 red_builder.add_edge("tools", "assistant")
 
 # Compile the graph
-sam = red_builder.compile(checkpointer=memory)
+def get_sam(checkpointer=None):
+    # supervisor passes the shared backend; standalone use keeps MemorySaver
+    return red_builder.compile(checkpointer=checkpointer or MemorySaver())
+
+sam = get_sam()
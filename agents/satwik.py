@@ -1,14 +1,19 @@
+import hashlib, logging
 from datetime import datetime
 from langgraph.graph import MessagesState, START, StateGraph, END
 from langgraph.prebuilt import ToolNode
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import Runnable, RunnableConfig
 from langgraph.checkpoint.memory import MemorySaver
-from utils.llmUtils import getLLM
-from tools.tools_list import tools_list
-from utils.datetime_utils import get_current_time_with_offset
-from utils.llmUtils import filter_messages
+from langchain_core.messages import SystemMessage, ToolMessage
+from utils.llmUtils import getLLM, is_empty_response, count_tokens, record_prompt_usage
+from tools.tools_list import tools_list, SQL_EXECUTION
+from utils.prompt_utils import build_messages
+from utils.schema_index import SchemaRegistry
+from utils.sql_validator import extract_sql, validate_sql
+from constants import EMPTY_RESPONSE_RETRIES, SCHEMA_RETRIEVAL, SQL_REPAIR_ATTEMPTS
 tool_node = ToolNode(tools_list["SATWIK"])
+logger = logging.getLogger(__name__)
 
 
 
@@ -270,15 +275,58 @@ COLUMNS = [
 ]
 SCHEMA_SUMMARY = "analytics.order_items_view → " + ", ".join(COLUMNS)
 
-instruction_prompt = ChatPromptTemplate.from_messages([
-    (
-        "system",
-        f"""
+# Business-rule hints indexed next to each column for schema retrieval
+COLUMN_HINTS = {
+    "order_date": "when the order was placed; use for orders placed",
+    "order_status": "order level status; exclude wc-failed, trash, wc-pending by default",
+    "item_status": "current status of the item e.g. wc-delivered, wc-cancelled, wc-returned",
+    "cancelled_time": "when the item was cancelled; use for cancellations",
+    "cancelled_reason": "reason for cancellation",
+    "cancellation_requested_by_admin": "cancellation raised by admin",
+    "cancellation_request_time": "when cancellation was requested",
+    "returned_time": "when the return completed; use for returns",
+    "return_initiated_time": "when the return was initiated; use for returns",
+    "return_reason": "why the customer returned the item",
+    "refund_status": "refund state; use for refunds",
+    "refund_amount": "refunded amount",
+    "refund_completed_date": "when the refund completed",
+    "refund_initiated_date": "when the refund started",
+    "delivered_time": "when the item was delivered; delivery",
+    "dispatched_time": "when the item was shipped; dispatch",
+    "first_edd": "first estimated delivery date promised",
+    "payment_method": "cod or prepaid payment",
+    "price_after_coupon_and_wallet": "amount paid, revenue, sales value",
+    "quantity": "units, pieces",
+    "city": "customer city, location",
+    "state": "customer state, region",
+    "pincode": "postal code",
+    "shipping_provider": "courier partner, logistics",
+    "dto_return": "delivered then returned by customer",
+    "rto_return": "return to origin, undelivered",
+    "user_id": "customer",
+    "product_id": "product, sku",
+    "coupon_name": "discount coupon, promo code",
+}
+CORE_COLUMNS = ("order_item_id", "order_id", "order_date", "order_status", "item_status")
+
+schema_registry = SchemaRegistry()
+schema_registry.register(
+    "analytics.order_items_view",
+    table_name_structure_map["analytics.order_items_view"],
+    hints=COLUMN_HINTS,
+    core=CORE_COLUMNS,
+)
+
+# Everything before the conversation is static – identical bytes for every
+# request and session – so the provider can serve it from its prompt cache.
+# Per-turn context (time, question data) is appended after the history by
+# build_messages and never touches this prefix.
+SATWIK_RULES = """
 
 You are **SATWIK**, an expert ClickHouse-SQL assistant.
 
 **Rules (always obey)**  
-1. Use **only** columns appearing in the schema summary below – never invent new ones.  
+1. Use **only** the relevant columns provided with the question – never invent new ones.  
 2. Cancellations ⇒ `cancelled_time` (≠ 'status' strings).  
 3. Returns ⇒ `returned_time` or `return_initiated_time`.  
 4. Refunds ⇒ `refund_status` / `refund_amount` / `refund_completed_date`.  
@@ -292,28 +340,102 @@ You are **SATWIK**, an expert ClickHouse-SQL assistant.
 12. all possible item statuses : [wc-cancelled,wc-processing (it means it is under processing),wc-returned,wc-delivered,wc-return-initiated,wc-return-reverse-pickup-failed,wc-return-picked-up,wc-completed (it means dispatched),wc-awaiting-dispatch,wc-cancellation-requested,cancelled,wc-customer-cancelled-return-reverse-pickup,wc-return-rejected,wc-return-approved,wc-return-courier-assignment-failed,wc-return-requested]
 
 ALWAYS prioritize schema compliance, correctness, and clean formatting. You are writing for production analytics use cases.
-**ALWAYS STICK TO THIS SCHEMA , Schema : **  
-{SCHEMA_SUMMARY}
 """
-    ),
+
+if SCHEMA_RETRIEVAL:
+    # columns relevant to the question arrive after the conversation
+    SYSTEM_PROMPT = (
+        SATWIK_RULES
+        + "**ALWAYS STICK TO THE SCHEMA sent with each question (relevant columns only).**\n"
+    )
+else:
+    SYSTEM_PROMPT = (
+        SATWIK_RULES
+        + "**ALWAYS STICK TO THIS SCHEMA , Schema : **  \n"
+        + SCHEMA_SUMMARY
+        + "\n"
+    )
+if SQL_EXECUTION:
+    SYSTEM_PROMPT += (
+        "When the user wants numbers rather than the query, call `execute_sql_tool` with the "
+        "final SQL and answer with the ```sql block followed by the returned table.\n"
+    )
+PROMPT_FINGERPRINT = hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()[:12]
+logger.info(f"SATWIK static prefix {PROMPT_FINGERPRINT}: {count_tokens(SYSTEM_PROMPT)} tokens")
+
+instruction_prompt = ChatPromptTemplate.from_messages([
+    SystemMessage(content=SYSTEM_PROMPT),    # a message, not a template: never re-rendered
     ("placeholder", "{messages}")
 ])
 
 # Compose prompt with LLM
 llm = getLLM("openai", "SATWIK")
-model = instruction_prompt | llm  # ✅ No bind_tools here unless you have actual tool calling logic
+model = instruction_prompt | (llm.bind_tools(tools_list["SATWIK"]) if tools_list["SATWIK"] else llm)
 
 # Assistant node logic
 
+def last_question(messages: list) -> str:
+    return next((m.content for m in reversed(messages) if m.type == "human"), "")
+
+async def schema_message(messages: list) -> list:
+    """Per-question schema block (empty when retrieval is off)."""
+    if not SCHEMA_RETRIEVAL:
+        return []
+    question = last_question(messages)
+    schema = await schema_registry.schema_for(question)
+    return [SystemMessage(content=f"Schema for this question:\n{schema}")]
+
+async def _generate(messages: list, config: RunnableConfig):
+    for attempt in range(EMPTY_RESPONSE_RETRIES + 1):
+        result = await model.ainvoke({"messages": messages}, config=config)
+        record_prompt_usage("SATWIK", result)
+        if not is_empty_response(result):
+            break
+        if attempt == 0:                     # nudge once, locally only
+            messages = messages + [("user", "Please provide a meaningful response.")]
+    return result
+
+def check_answer(result, question: str) -> list[str]:
+    """
+    Static problems in the SQL of an answer or of a pending `execute_sql_tool`
+    call ([] if fine or no SQL at all).  Tool calls are checked before they
+    reach the database.
+    """
+    content = result.content if isinstance(result.content, str) else ""
+    sqls = [c["args"].get("sql", "") for c in getattr(result, "tool_calls", None) or []
+            if c["name"] == "execute_sql_tool"]
+    if not sqls:
+        sql = extract_sql(content)
+        if sql is None:
+            return []                        # clarifying question, not SQL
+        sqls = [sql]
+    columns, tables = schema_registry.columns(), set(schema_registry.tables())
+    return [e for sql in sqls for e in validate_sql(extract_sql(sql) or sql, columns, tables, question)]
+
+def repair_messages(result, errors: list[str]) -> list:
+    """Feedback turn; a rejected tool call is answered with ToolMessages, as the API requires."""
+    feedback = ("The SQL above has problems:\n- " + "\n- ".join(errors)
+                + "\nFix only these and return the corrected query.")
+    if getattr(result, "tool_calls", None):
+        return [result] + [ToolMessage(content=feedback, tool_call_id=c["id"])
+                           for c in result.tool_calls]
+    return [result, ("user", feedback)]
+
 async def invoke(state: dict, config: RunnableConfig):
-    while True:
-        state["messages"] = filter_messages(state["messages"])
-        state["messages"].append(("system", f"Today is {get_current_time_with_offset(config).strftime('%d-%m-%Y %H:%M:%S')}. TimeZone configured for the logged in user in the Mobile Cloud is {config.get('configurable', {}).get('timezone', 'Asia/Kolkata')}, with an offset of {config.get('configurable', {}).get('timezone_offset', 330)} minutes."))
-        result = await model.ainvoke(state, config=config)
-        if not result.tool_calls and (not result.content or isinstance(result.content, list) and not result.content[0].get("text")):
-            state["messages"].append(("user", "Please provide a meaningful response."))
-        else:
+    question = last_question(state["messages"])
+    messages = build_messages(
+        state["messages"], config, *await schema_message(state["messages"]), agent="SATWIK"
+    )
+    result = await _generate(messages, config)
+
+    # targeted repair: only when the local validator finds a problem
+    for _ in range(SQL_REPAIR_ATTEMPTS):
+        errors = check_answer(result, question)
+        if not errors:
             break
+        logger.info(f"SATWIK SQL failed validation: {errors}")
+        messages = messages + repair_messages(result, errors)
+        result = await _generate(messages, config)
     return {"messages": result}
 
 # Conditional edge: whether to continue
@@ -323,7 +445,6 @@ def should_continue(state):
     return "continue" if getattr(last_message, "tool_calls", None) else "end"
 
 # LangGraph setup
-memory = MemorySaver()
 graph = StateGraph(MessagesState)
 
 graph.add_node("assistant", invoke)
@@ -341,4 +462,8 @@ graph.add_conditional_edges(
 graph.add_edge("tools", "assistant")
 
 # Compile final SATWIK agent
-satwik = graph.compile(checkpointer=memory)
\ No newline at end of file
+def get_satwik(checkpointer=None):
+    """Build the SATWIK graph; `checkpointer` defaults to an in-process MemorySaver."""
+    return graph.compile(checkpointer=checkpointer or MemorySaver())
+
+satwik = get_satwik()
\ No newline at end of file
@@ -1,27 +1,38 @@
+import asyncio, logging, time
 from typing import Annotated
-from agents.sam import sam
-from agents.satwik import satwik
-from agents.preview import preview  
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage, SystemMessage
-import operator
+from agents.sam import sam, get_sam
+from agents.satwik import satwik, get_satwik
+from agents.preview import preview, get_preview
+from utils.checkpointer import get_checkpointer
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from typing import Sequence
 from typing_extensions import TypedDict
 from utils.llmUtils import getLLM
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import BaseMessage
 from langgraph.graph import END, StateGraph, START
-from langgraph.prebuilt import ToolNode
+from langgraph.graph.message import add_messages
 from tools.tools_list import tools_list
 from langchain_core.runnables.config import RunnableConfig
+from utils.prompt_utils import build_messages
 from utils.datetime_utils import get_current_time_with_offset
-from utils.llmUtils import filter_messages
+from utils.semantic_cache import SemanticCache, openai_embed
 from langchain.tools import tool   
+from utils import router
+from constants import TOOL_TIMEOUTS, TOOL_TIMEOUT_DEFAULT, FAST_ROUTER
+
+logger = logging.getLogger(__name__)
 
 class AgentState(TypedDict):
-    # The annotation tells the graph that new messages will always
-    # be added to the current states
-    messages: Annotated[Sequence[BaseMessage], operator.add]
+    # add_messages appends new messages to the checkpointed thread by id
+    # (callers send only the new turn) and honours RemoveMessage for trimming
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    # this turn's fast-path decision (agent, query) from ROUTE, None → SUPERVISOR
+    route: tuple[str, str] | None
+
+
+# repeat analytics questions skip the SATWIK graph entirely
+satwik_cache = SemanticCache(embed=openai_embed)
 
 
 async def SAM(session_id, query, config: RunnableConfig):
@@ -34,9 +45,18 @@ async def SAM(session_id, query, config: RunnableConfig):
 
 
 async def SATWIK(session_id, query, config: RunnableConfig):
+    today = f"{get_current_time_with_offset(config):%Y-%m-%d}"
+    cached, probe = await satwik_cache.lookup(query, today)
+    if cached is not None:
+        return cached
     try:
         result = await satwik.ainvoke({"messages": [f"session_id: {session_id}\n"] + [HumanMessage(content=query)]}, config=config)
         content = result["messages"][-1].content
+        executed = any(isinstance(m, ToolMessage) and m.name == "execute_sql_tool"
+                       for m in result["messages"])
+        # don't cache clarifying questions, nor live result tables (stale within the TTL)
+        if "```sql" in content and not executed:
+            satwik_cache.store(probe, content)
     except Exception as e:
         content = "I am sorry I could not find the information you are looking for. Please try again later."
     return content
@@ -52,7 +72,8 @@ async def PREVIEW(session_id, query, config: RunnableConfig):
 
 subordinate_agents = {
     "SAM": SAM,
-    "SATWIK" : SATWIK
+    "SATWIK" : SATWIK,
+    "PREVIEW" : PREVIEW,
 }
 
 @tool("SAM", return_direct=True)      # wrapper for function-calling
@@ -152,8 +173,51 @@ prompt = ChatPromptTemplate.from_messages(
 
 llm = getLLM("openai", "SUPERVISOR")
 
-# tool_node = ToolNode(tools_list["SUPERVISOR"]+list(subordinate_agents.values()))
-tool_node = ToolNode(subordinate_tools) 
+tools_by_name = {t.name: t for t in subordinate_tools}
+
+
+async def _run_tool_call(call: dict, config: RunnableConfig) -> tuple[ToolMessage, float]:
+    """One sub-agent call under its timeout; failures become error ToolMessages."""
+    name = call["name"]
+    timeout = TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT_DEFAULT)
+    started = time.perf_counter()
+    tool_ = tools_by_name.get(name)
+    if tool_ is None:
+        message = ToolMessage(content=f"Unknown agent {name!r}.", tool_call_id=call["id"],
+                              name=name, status="error")
+        return message, time.perf_counter() - started
+    try:
+        message = await asyncio.wait_for(tool_.ainvoke({**call, "type": "tool_call"}, config), timeout)
+    except asyncio.TimeoutError:
+        message = ToolMessage(content=f"{name} did not answer within {timeout}s; "
+                                      "tell the user this part is unavailable right now.",
+                              tool_call_id=call["id"], name=name, status="error")
+    except Exception as e:
+        logger.exception(f"ACTION {name} failed")
+        message = ToolMessage(content=f"{name} failed: {e}. Answer with what the other agents returned.",
+                              tool_call_id=call["id"], name=name, status="error")
+    return message, time.perf_counter() - started
+
+
+async def act(state: dict, config: RunnableConfig):
+    """
+    Run every tool call of the last supervisor message concurrently, each
+    with its own timeout (TOOL_TIMEOUTS).  A failed or timed-out sub-agent
+    yields an error ToolMessage, so the supervisor still answers with the
+    others' results.  Cancelling the turn cancels all pending calls.
+    """
+    calls = state["messages"][-1].tool_calls
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_run_tool_call(c, config) for c in calls))
+    wall = time.perf_counter() - started
+    for (message, elapsed), call in zip(results, calls):
+        logger.info(f"ACTION {call['name']} {message.status} in {elapsed:.2f}s")
+    if len(calls) > 1:
+        slowest, (_, slowest_time) = max(zip(calls, results), key=lambda r: r[1][1])
+        logger.info(f"ACTION {len(calls)} calls in {wall:.2f}s wall "
+                    f"(sum {sum(e for _, e in results):.2f}s), "
+                    f"critical path {slowest['name']} {slowest_time:.2f}s")
+    return {"messages": [message for message, _ in results]}
 
 supervisor_chain = (
     prompt
@@ -162,15 +226,35 @@ supervisor_chain = (
 )
 
 async def invoke(state: dict, config: RunnableConfig):
-    state["messages"] = filter_messages(state["messages"])
-    state["messages"].append(SystemMessage(
-                                content=f"Today is {get_current_time_with_offset(config):%d-%m-%Y %H:%M:%S}. "
-                                f"TZ={config.get('configurable', {}).get('timezone', 'Asia/Kolkata')} "
-                                f"offset={config.get('configurable', {}).get('timezone_offset', 330)}m."
-                            ))
-    result = await supervisor_chain.ainvoke(state, config)
+    messages = build_messages(state["messages"], config, agent="SUPERVISOR")
+    result = await supervisor_chain.ainvoke({"messages": messages}, config)
     return {"messages": [result]}
 
+def _last_query(state) -> str:
+    return next((m.content for m in reversed(state["messages"]) if m.type == "human"), "")
+
+def _first_turn(state) -> bool:
+    return sum(m.type == "human" for m in state["messages"]) <= 1
+
+def pre_route(state):
+    """Decide once per turn whether an obvious request can skip the LLM (utils/router.py)."""
+    decision = router.route(_last_query(state), _first_turn(state)) if FAST_ROUTER else None
+    router.record(decision[0] if decision else None)
+    return {"route": decision}
+
+def after_route(state):
+    return "FASTPATH" if state.get("route") else "SUPERVISOR"
+
+async def fastpath(state: dict, config: RunnableConfig):
+    """Call the routed sub-agent directly; its answer is the turn's answer."""
+    agent, query = state["route"]
+    session_id = config.get("configurable", {}).get("session_id", "")
+    started = time.perf_counter()
+    content = await subordinate_agents[agent](session_id, query, config)
+    logger.info(f"FASTPATH {agent} in {time.perf_counter() - started:.2f}s "
+                f"(LLM hops saved so far: {router.ROUTER_STATS['llm_hops_saved']})")
+    return {"messages": [AIMessage(content=content, name=agent)]}
+
 # Define the function that determines whether to continue or not
 def should_continue(state):
     messages = state["messages"]
@@ -185,7 +269,10 @@ def should_continue(state):
 workflow = StateGraph(AgentState)
 
 workflow.add_node("SUPERVISOR", invoke)
-workflow.add_node("ACTION", tool_node)
+workflow.add_node("ACTION", act)
+workflow.add_node("ROUTE", pre_route)
+workflow.add_node("FASTPATH", fastpath)
+workflow.add_edge("FASTPATH", END)
 workflow.add_edge("ACTION", "SUPERVISOR")
 
 workflow.add_conditional_edges(
@@ -204,19 +291,21 @@ workflow.add_conditional_edges(
     }
 )
 
-# Finally, add entrypoint
-workflow.add_edge(START, "SUPERVISOR")
+# Finally, add entrypoint: rule-based fast path first, supervisor otherwise
+workflow.add_edge(START, "ROUTE")
+workflow.add_conditional_edges("ROUTE", after_route, ["FASTPATH", "SUPERVISOR"])
 
 
 async def get_supervisor():
-    # DB_URI = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?sslmode=disable"
-    # logger.info(f"Connecting to database at {DB_URI}")
-    # connection_kwargs = {
-    #     "autocommit": True,
-    #     "prepare_threshold": 0,
-    # }
-    # conn = await AsyncConnection.connect(DB_URI, **connection_kwargs)
-    # memory = AsyncPostgresSaver(conn)
-    # await memory.setup()
-    supervisor = workflow.compile(checkpointer=MemorySaver())
+    """
+    Compile the supervisor and recompile SAM / SATWIK / PREVIEW against the
+    shared checkpointer (see utils/checkpointer.py), so every replica reads
+    and writes the same thread state.
+    """
+    global sam, satwik, preview
+    checkpointer = await get_checkpointer()
+    sam = get_sam(checkpointer)
+    satwik = get_satwik(checkpointer)
+    preview = get_preview(checkpointer)
+    supervisor = workflow.compile(checkpointer=checkpointer)
     return supervisor
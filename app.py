@@ -1,7 +1,16 @@
-import os, asyncio, datetime
+import os, asyncio, logging
 from slack_bolt.async_app import AsyncApp
 from slack_bolt.adapter.socket_mode.aiohttp import AsyncSocketModeHandler
 from utils.ai_session import Session  # noqa: E402  (after sys.path tweak)
+from utils.slack_stream import SlackStreamer
+from utils.session_store import SessionStore
+from utils.scheduler import TurnScheduler, SchedulerBusy
+from utils.event_queue import EventPipeline
+from utils.checkpointer import close_checkpointer, forget_thread
+from utils.http_client import close_clients as close_http_clients
+from constants import MAX_INFLIGHT_RUNS, MAX_QUEUED_TURNS, EVENT_WORKERS
+
+logger = logging.getLogger(__name__)
 
 BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
@@ -10,11 +19,22 @@ if not (BOT_TOKEN and APP_TOKEN):
         "❌  SLACK_BOT_TOKEN and/or SLACK_APP_TOKEN env-vars are missing."
     )
 
+# SLACK_STREAMING=0 falls back to posting the whole answer in one message
+STREAMING = os.getenv("SLACK_STREAMING", "1") != "0"
+
 app = AsyncApp(token=BOT_TOKEN)
 
-_sessions: dict[str, Session] = {}
+sessions = SessionStore(lambda key, user_id, exp: Session(key, user_id, exp=exp),
+                        on_evict=forget_thread)   # session key == thread id
+scheduler = TurnScheduler(
+    max_inflight=int(os.getenv("MAX_INFLIGHT_RUNS", MAX_INFLIGHT_RUNS)),
+    max_queued=int(os.getenv("MAX_QUEUED_TURNS", MAX_QUEUED_TURNS)),
+)
 
-test_session  = Session('testsession', 'shresth', exp=1234567890)
+# listeners only enqueue; workers run the agent off the Socket Mode path
+pipeline = EventPipeline(workers=int(os.getenv("EVENT_WORKERS", EVENT_WORKERS)))
+
+BUSY_REPLY = "I'm handling a lot of requests right now, please try again in a minute."
 
 def _conversation_id(body: dict) -> str:
     """Return a stable id for each DM or thread in a channel."""
@@ -26,14 +46,7 @@ def _conversation_id(body: dict) -> str:
     return ev.get("thread_ts") or ev["ts"]  # thread or root message ts
 
 def _get_session(user_id: str, conv_id: str) -> Session:
-    return test_session
-    key = f"{user_id}::{conv_id}"
-    sess = _sessions.get(key)
-    now = int(datetime.datetime.utcnow().timestamp())
-    if sess is None or getattr(sess, "exp", 0) < now:
-        sess = Session(key, user_id, exp=now + 2 * 360000)  # 2-hour TTL
-        _sessions[key] = sess
-    return sess
+    return sessions.get(user_id, conv_id)
 
 async def _ask(session: Session, text: str) -> str:
     chunks = []
@@ -42,36 +55,73 @@ async def _ask(session: Session, text: str) -> str:
         chunks.append(chunk)
     return "".join(chunks).strip() or "_(no answer)_"
 
+async def _reply(session: Session, text: str, say, client,
+                 channel: str, thread_ts: str | None = None) -> str:
+    """
+    Answer `text`, streaming into Slack unless STREAMING is off.  Turns are
+    serialized per conversation and capped globally by `scheduler`.
+    """
+    if not STREAMING:
+        try:
+            async with scheduler.turn(session.session_id):
+                reply = await _ask(session, text)
+        except SchedulerBusy:
+            reply = BUSY_REPLY
+        await say(reply, thread_ts=thread_ts)
+        return reply
+
+    streamer = SlackStreamer(client, channel, thread_ts)
+    await streamer.start()                  # placeholder shows while queued
+    try:
+        async with scheduler.turn(session.session_id):
+            async for chunk in session.run_query(text, sync=True):
+                await streamer.push(chunk)
+    except SchedulerBusy:
+        await streamer.push(BUSY_REPLY)
+    return await streamer.finish()
+
 # ---------------------------------------------------------------------
 #  SLACK LISTENERS
 # ---------------------------------------------------------------------
 @app.event("app_mention")
-async def handle_mention(body, say, logger):
+async def handle_mention(body, say, client, logger):
     uid = body["event"]["user"]
     conv_id = _conversation_id(body)
     text = body["event"]["text"].split(None, 1)[1] if " " in body["event"]["text"] else ""
     logger.info(f"[mention] {uid} → {text!r}")
     sess = _get_session(uid, conv_id)
-    reply = await _ask(sess, text)
-    await say(reply, thread_ts=conv_id)
+    pipeline.submit(body, lambda: _reply(
+        sess, text, say, client, body["event"]["channel"], thread_ts=conv_id
+    ), on_full=lambda: say(BUSY_REPLY, thread_ts=conv_id))
 
 @app.event("message")
-async def handle_dm(body, say, logger):
-    if body["event"].get("channel_type") != "im":
+async def handle_dm(body, say, client, logger):
+    ev = body["event"]
+    if ev.get("channel_type") != "im":
         return
-    uid = body["event"]["user"]
+    if ev.get("subtype") or ev.get("bot_id"):   # edits (incl. our streaming), bot posts
+        return
+    uid = ev["user"]
     conv_id = _conversation_id(body)
-    print(f'conv_id, uid : {conv_id}, {uid}')
     logger.info(f'conv_id, uid : {conv_id}, {uid}')
-    text = body["event"]["text"]
+    text = ev["text"]
     logger.info(f"[dm] {uid} → {text!r}")
     sess = _get_session(uid, conv_id)
-    reply = await _ask(sess, text)
-    await say(reply)
+    pipeline.submit(body, lambda: _reply(sess, text, say, client, ev["channel"]),
+                    on_full=lambda: say(BUSY_REPLY))
 
 async def main():
+    if pipeline.workers <= scheduler.max_inflight + scheduler.max_queued:
+        logger.warning("EVENT_WORKERS should exceed MAX_INFLIGHT_RUNS + MAX_QUEUED_TURNS, "
+                       "otherwise turns wait in the event queue and never get BUSY_REPLY")
+    sessions.start_sweeper()
+    pipeline.start()
     handler = AsyncSocketModeHandler(app, APP_TOKEN)
-    await handler.start_async()  # blocks forever
+    try:
+        await handler.start_async()  # blocks forever
+    finally:
+        await close_http_clients()
+        await close_checkpointer()
 
 if __name__ == "__main__":
     asyncio.run(main())
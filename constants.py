@@ -1,2 +1,101 @@
 DATA_CUTOFF_LIMIT = 20
-RECURSION_LIMIT = 10
\ No newline at end of file
+RECURSION_LIMIT = 10
+
+# Slack streaming delivery
+STREAM_PLACEHOLDER = "_thinking…_"
+STREAM_FLUSH_INTERVAL = 1.2      # seconds between chat.update calls
+STREAM_FLUSH_CHARS = 400         # or flush early once this many chars are pending
+SLACK_MAX_MESSAGE_CHARS = 3900   # roll over to a new message beyond this
+
+# Session registry
+SESSION_TTL_SECONDS = 2 * 60 * 60   # idle time before a conversation is dropped
+MAX_SESSIONS = 5000                 # LRU cap on live sessions per process
+SESSION_SWEEP_INTERVAL = 60         # seconds between background sweeps
+
+# Turn scheduling.  TurnScheduler owns backpressure: past MAX_QUEUED_TURNS
+# waiting turns it answers BUSY_REPLY.  A waiting turn holds an event worker,
+# so EVENT_WORKERS must exceed MAX_INFLIGHT_RUNS + MAX_QUEUED_TURNS for that
+# cap to be reachable (app.py warns otherwise).
+MAX_INFLIGHT_RUNS = 8     # graph runs executing at once across the process
+MAX_QUEUED_TURNS = 48     # turns allowed to wait before we shed load
+
+# Slack event pipeline
+EVENT_WORKERS = 64          # async workers draining the event queue (see above)
+EVENT_QUEUE_SIZE = 1000     # last resort: beyond this an event gets BUSY_REPLY at once
+EVENT_DEDUP_TTL = 60 * 60   # Slack retries within this window are ignored
+EVENT_DEDUP_MAX = 50000     # cap on remembered event ids
+
+# LangGraph checkpointer (memory | sqlite | postgres)
+CHECKPOINT_BACKEND = "memory"
+CHECKPOINT_SQLITE_PATH = "data/checkpoints.sqlite"
+CHECKPOINT_POOL_MIN = 1
+CHECKPOINT_POOL_MAX = 10
+
+# Prompt token budget (gpt-4o, 128k context)
+PROMPT_TOKEN_BUDGET = 59000    # history kept by filter_messages
+
+# Rolling conversation summary
+SUMMARY_TRIGGER_TOKENS = 12000   # compact the thread once history exceeds this
+SUMMARY_KEEP_TURNS = 4           # most recent turns always kept verbatim
+SUMMARY_MODEL = "gpt-4o-mini"
+
+# Agents re-prompt this many times when the model returns an empty answer
+EMPTY_RESPONSE_RETRIES = 2
+
+# SATWIK schema retrieval
+SCHEMA_RETRIEVAL = True   # send only relevant columns instead of the whole schema
+SCHEMA_TOP_K = 25         # columns retrieved per question (on top of core columns)
+
+# SATWIK answer cache
+SATWIK_CACHE_TTL = 6 * 60 * 60    # seconds
+SATWIK_CACHE_MAX = 1000           # entries (LRU)
+SATWIK_CACHE_SIMILARITY = 0.95    # cosine threshold for a semantic hit
+
+# SATWIK SQL repair rounds after local validation fails
+SQL_REPAIR_ATTEMPTS = 2
+
+# SATWIK query execution (none | sqlite | duckdb | clickhouse)
+SQL_BACKEND = "none"
+SQL_RESULT_MAX_BYTES = 16000     # rendered result cap; rows are capped by DATA_CUTOFF_LIMIT
+SQL_FETCH_BATCH = 500            # rows pulled per cursor fetch
+SQL_TIMEOUT = 30                 # seconds
+SQL_POOL_SIZE = 4
+
+# Outbound HTTP (internal tools API, GitHub)
+NEWME_API_URL = "https://internaltoolsapi.newme.asia/kapture/fetch/"
+HTTP_TIMEOUT = 10            # seconds per read / write
+HTTP_CONNECT_TIMEOUT = 3
+HTTP_MAX_CONNECTIONS = 20    # per shared client
+HTTP_MAX_KEEPALIVE = 10
+HTTP_RETRIES = 3             # extra attempts on connection errors, 429 and 5xx
+HTTP_BACKOFF = 0.3           # base seconds; exponential with full jitter
+
+# Order-item lookup cache (SAM)
+ORDER_CACHE_TTL = 60        # seconds; order state changes, keep this short
+ORDER_CACHE_MAX = 2000      # entries (LRU)
+ORDER_BATCH_CONCURRENCY = 5   # item/details calls in flight per batch tool call
+
+# Supervisor ACTION node: per sub-agent timeouts (seconds)
+TOOL_TIMEOUTS = {"SAM": 60, "SATWIK": 90, "PREVIEW": 300}
+TOOL_TIMEOUT_DEFAULT = 120
+
+# Deterministic pre-router in front of the supervisor LLM
+FAST_ROUTER = True
+FAST_ROUTER_MIN_SCORE = 2     # analytics keyword score needed to send straight to SATWIK
+
+# PREVIEW map-reduce review
+PREVIEW_CHUNK_TOKENS = 6000    # diff tokens per review call; larger PRs are chunked
+PREVIEW_CONCURRENCY = 4        # chunk reviews in flight per PR
+PREVIEW_CACHE_DIR = "data/pr_cache"    # PR reviews keyed by owner/repo/PR and head SHA
+
+# GitHub API client (PREVIEW)
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_ETAG_CACHE_MAX = 500     # conditional-request cache entries (LRU)
+GITHUB_RATE_RESERVE = 0.1       # below this fraction of the hourly limit left, spread requests until reset
+GITHUB_MAX_RATE_WAIT = 60       # seconds we will wait out a rate limit before failing
+
+# PREVIEW code context (enclosing definitions fetched at the PR head)
+CONTEXT_TOKEN_BUDGET = 4000    # tokens of function / class bodies attached per review
+CONTEXT_MAX_FILES = 20         # touched .py files fetched per PR
+CONTEXT_FETCH_CONCURRENCY = 4
+CONTEXT_CACHE_MAX = 256        # parsed files kept (LRU), keyed by repo, SHA and path
@@ -0,0 +1,34 @@
+import os
+import sys
+import types
+
+import pytest
+
+# Add the project root to sys.path so 'utils' / 'agents' are importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def newme_api():
+    """
+    tools/mock_newme_api.py on a free port.  `.url` is the NEWME_API_URL to
+    use; set `.handler.script` / `.handler.delay` to shape the responses and
+    read `.handler.calls` afterwards.
+    """
+    from tools import mock_newme_api
+
+    with mock_newme_api.serve() as url:
+        yield types.SimpleNamespace(url=url, handler=mock_newme_api.Handler)
+
+
+@pytest.fixture
+def github_api():
+    """
+    tools/mock_github_api.py on a free port.  `.url` is the GITHUB_API_URL to
+    use; `.handler` exposes the rate-limit counters and `.calls`.
+    """
+    from tools import mock_github_api
+
+    with mock_github_api.serve() as url:
+        yield types.SimpleNamespace(url=url, handler=mock_github_api.Handler,
+                                    sample_diff=mock_github_api.SAMPLE_DIFF)
@@ -0,0 +1,89 @@
+"""Event pipeline and turn scheduler: where load is shed and what the user sees."""
+import asyncio
+
+import pytest
+
+from constants import EVENT_WORKERS, MAX_INFLIGHT_RUNS, MAX_QUEUED_TURNS
+from utils.event_queue import EventPipeline
+from utils.scheduler import TurnScheduler, SchedulerBusy
+
+
+def _event(n):
+    return {"event_id": f"Ev{n}", "event": {"client_msg_id": f"m{n}", "channel": "D1", "ts": f"{n}.0"}}
+
+
+def test_default_sizes_leave_backpressure_to_the_scheduler():
+    # every waiting turn holds a worker; otherwise MAX_QUEUED_TURNS is unreachable
+    assert EVENT_WORKERS > MAX_INFLIGHT_RUNS + MAX_QUEUED_TURNS
+
+
+def test_scheduler_sheds_beyond_max_queued():
+    async def run():
+        scheduler = TurnScheduler(max_inflight=1, max_queued=1)
+        release = asyncio.Event()
+
+        async def turn(key):
+            async with scheduler.turn(key):
+                await release.wait()
+
+        running = asyncio.ensure_future(turn("a"))
+        waiting = asyncio.ensure_future(turn("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy):
+            async with scheduler.turn("c"):
+                pass
+        release.set()
+        await asyncio.gather(running, waiting)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["rejected"] == 1 and stats["completed"] == 2
+
+
+def test_full_event_queue_runs_the_busy_reply():
+    async def run():
+        pipeline = EventPipeline(workers=1, maxsize=1)
+        pipeline.start()
+        release, done, busy = asyncio.Event(), [], []
+
+        def job(n):
+            async def run_job():
+                await release.wait()
+                done.append(n)
+            return run_job
+
+        def on_full(n):
+            async def reply():
+                busy.append(n)
+            return reply
+
+        results = []
+        for n in range(3):
+            results.append(pipeline.submit(_event(n), job(n), on_full=on_full(n)))
+            await asyncio.sleep(0)                      # let the worker pick up event 0
+        await asyncio.sleep(0)
+        release.set()
+        await pipeline.stop()
+        return results, done, busy, pipeline.stats()
+
+    results, done, busy, stats = asyncio.run(run())
+    assert results == [True, True, False]
+    assert done == [0, 1] and busy == [2]
+    assert stats["dropped"] == 1 and stats["completed"] == 2
+
+
+def test_redelivered_event_is_ignored():
+    async def run():
+        pipeline = EventPipeline(workers=1)
+        pipeline.start()
+        calls = []
+
+        async def job():
+            calls.append(1)
+
+        first = pipeline.submit(_event(1), job)
+        again = pipeline.submit(_event(1), job)
+        await pipeline.stop()
+        return first, again, calls
+
+    assert asyncio.run(run()) == (True, False, [1])
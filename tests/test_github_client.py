@@ -0,0 +1,131 @@
+"""utils/github_client.py against tools/mock_github_api.py."""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from utils import http_client, github_client
+from utils.github_client import GitHubClient, GitHubError, DIFF
+
+PULL = "repos/org/repo/pulls/1"
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    # clients are bound to the loop they were created on; every test runs its own loop
+    monkeypatch.setattr(http_client, "_clients", {})
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await http_client.close_clients()
+    return asyncio.run(main())
+
+
+def test_etag_304_is_served_from_memory(github_api):
+    gh = GitHubClient(base_url=github_api.url, token="")
+
+    async def twice():
+        return await gh.get(PULL), await gh.get(PULL)
+
+    first, second = _run(twice())
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json() == {"number": 1, "head": {"sha": "a" * 40}}
+    assert gh.metrics["requests"] == 2 and gh.metrics["not_modified"] == 1
+    assert github_api.handler.used == 1                   # the 304 did not count
+
+
+def test_explicit_etag_returns_304(github_api):
+    gh = GitHubClient(base_url=github_api.url, token="")
+
+    async def conditional():
+        first = await gh.pull("org", "repo", 1)
+        return first, await gh.pull("org", "repo", 1, etag=first.headers["ETag"])
+
+    first, second = _run(conditional())
+    assert first.status_code == 200 and second.status_code == 304
+
+
+def test_errors_raise(github_api):
+    gh = GitHubClient(base_url=github_api.url, token="")
+    with pytest.raises(GitHubError) as e:
+        _run(gh.get("repos/org/repo/pulls/999"))
+    assert e.value.status == 404
+
+
+def test_stream_lines(github_api):
+    gh = GitHubClient(base_url=github_api.url, token="")
+
+    async def collect(path):
+        return [line async for line in gh.stream_lines(path, DIFF)]
+
+    assert _run(collect(PULL)) == github_api.sample_diff.splitlines()
+    with pytest.raises(GitHubError) as e:
+        _run(collect("repos/org/repo/pulls/999"))
+    assert e.value.status == 404
+
+
+def test_rate_headers_are_tracked(github_api):
+    gh = GitHubClient(base_url=github_api.url, token="")
+    _run(gh.get(PULL))
+    assert gh.rate["limit"] == 5000 and gh.rate["remaining"] == 4999
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+
+    async def fake_sleep(delay):
+        slept.append(round(delay))
+
+    monkeypatch.setattr(github_client.asyncio, "sleep", fake_sleep)
+    return slept
+
+
+def test_no_pacing_above_the_reserve(sleeps):
+    gh = GitHubClient(base_url="http://unused", token="")
+    # unauthenticated limit: 40 of 60 left is well above the 10 % reserve
+    gh.rate = {"limit": 60, "remaining": 40, "reset": int(time.time()) + 3000}
+    asyncio.run(gh._pace())
+    assert sleeps == []
+
+
+def test_concurrent_callers_are_spread_over_the_window(sleeps):
+    gh = GitHubClient(base_url="http://unused", token="")
+    gh.rate = {"limit": 60, "remaining": 5, "reset": int(time.time()) + 50}
+
+    async def three():
+        await asyncio.gather(*(gh._pace() for _ in range(3)))
+
+    asyncio.run(three())
+    assert sleeps == [10, 20]                             # first goes now, then one slot each
+
+
+def test_hit_rate_limit_is_waited_out(github_api):
+    github_api.handler.rate_limit = 1
+    gh = GitHubClient(base_url=github_api.url, token="")
+
+    async def run():
+        await gh.get(PULL)
+        github_api.handler.reset = int(time.time()) + 1   # budget spent, resets in ~1 s
+        return await gh.file_content("org", "repo", "app.py", "a" * 40)
+
+    assert _run(run()).startswith("import os")
+    assert gh.metrics["rate_limited"] == 1
+
+
+def test_long_rate_limit_fails_fast(github_api):
+    github_api.handler.rate_limit = 1
+    gh = GitHubClient(base_url=github_api.url, token="")
+
+    async def run():
+        await gh.get(PULL)                                # window resets in an hour
+        await gh.file_content("org", "repo", "app.py", "a" * 40)
+
+    with pytest.raises(GitHubError, match="rate limited"):
+        _run(run())
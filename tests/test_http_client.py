@@ -0,0 +1,81 @@
+"""request_with_retries and the SAM item fetch against tools/mock_newme_api.py."""
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from utils import http_client
+from utils.http_client import request_with_retries, close_clients
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    # no backoff sleeps, and a fresh client registry per test (clients are bound to one loop)
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt, base=0: 0)
+    monkeypatch.setattr(http_client, "_clients", {})
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_clients()
+    return asyncio.run(main())
+
+
+def _post(url, path="item/details", retries=3, **client_kwargs):
+    async def call():
+        client = http_client.get_client("test", **client_kwargs)
+        return await request_with_retries(client, "POST", url + path,
+                                          retries=retries, json={"order_id": 1, "order_item_id": 2})
+    return _run(call())
+
+
+def test_ok_first_time(newme_api):
+    resp = _post(newme_api.url)
+    assert resp.status_code == 200
+    assert resp.json()["data"]["order_item_id"] == 2
+    assert newme_api.handler.calls == 1
+
+
+def test_retries_429_and_5xx(newme_api):
+    newme_api.handler.script = [429, 503, 502]
+    resp = _post(newme_api.url)
+    assert resp.status_code == 200
+    assert newme_api.handler.calls == 4
+
+
+def test_gives_up_after_retries_and_returns_last_response(newme_api):
+    newme_api.handler.script = [503, 503, 503]
+    resp = _post(newme_api.url, retries=2)
+    assert resp.status_code == 503
+    assert newme_api.handler.calls == 3
+
+
+def test_non_retryable_status_is_returned_at_once(newme_api):
+    resp = _post(newme_api.url, path="order/unknown")
+    assert resp.status_code == 404
+    assert newme_api.handler.calls == 1
+
+
+def test_timeouts_are_retried_then_raised(newme_api):
+    newme_api.handler.delay = 0.3
+    with pytest.raises(httpx.TimeoutException):
+        _post(newme_api.url, retries=1, timeout=httpx.Timeout(0.05))
+    assert newme_api.handler.calls == 2
+
+
+def test_item_fetch_raises_for_status(newme_api, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from tools import newme_tools
+
+    monkeypatch.setattr(newme_tools, "base_url", newme_api.url)
+    newme_api.handler.script = [503]
+    data = _run(newme_tools._fetch_item_details(1, 2))
+    assert data["data"]["tracking_number"] == "TRK2"
+
+    newme_api.handler.script = [500] * 4                # every attempt fails
+    with pytest.raises(httpx.HTTPStatusError):
+        _run(newme_tools._fetch_item_details(1, 2))
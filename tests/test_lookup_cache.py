@@ -0,0 +1,137 @@
+"""utils/lookup_cache.py: single-flight misses, TTL, LRU eviction and cancellation."""
+import asyncio
+
+import pytest
+
+from utils.lookup_cache import LookupCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Upstream:
+    """Counts fetches; each one waits for `release` so callers overlap."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    def fetch(self, value):
+        async def run():
+            self.calls += 1
+            await self.release.wait()
+            return value
+        return run
+
+
+def test_concurrent_misses_fetch_once():
+    async def run():
+        cache, up = LookupCache(ttl=10, max_entries=10), Upstream()
+        waiters = [asyncio.ensure_future(cache.get_or_fetch("k", up.fetch("v"))) for _ in range(5)]
+        await asyncio.sleep(0)
+        up.release.set()
+        return cache, up, await asyncio.gather(*waiters)
+
+    cache, up, results = asyncio.run(run())
+    assert results == ["v"] * 5 and up.calls == 1
+    assert cache.metrics["misses"] == 1 and cache.metrics["coalesced"] == 4
+    assert cache.stats()["saved_upstream_calls"] == 4
+
+
+def test_hit_until_ttl_then_refetch():
+    clock = Clock()
+    cache = LookupCache(ttl=10, max_entries=10, clock=clock)
+    calls = []
+
+    async def fetch():
+        calls.append(clock.now)
+        return len(calls)
+
+    async def run():
+        first = await cache.get_or_fetch("k", fetch)
+        clock.now = 10                                     # still fresh at exactly ttl
+        second = await cache.get_or_fetch("k", fetch)
+        clock.now = 10.5
+        third = await cache.get_or_fetch("k", fetch)
+        return first, second, third
+
+    assert asyncio.run(run()) == (1, 1, 2)
+    assert cache.metrics["hits"] == 1 and cache.metrics["expired"] == 1
+
+
+def test_lru_eviction():
+    cache = LookupCache(ttl=100, max_entries=2)
+
+    async def value(v):
+        return v
+
+    async def run():
+        await cache.get_or_fetch("a", lambda: value(1))
+        await cache.get_or_fetch("b", lambda: value(2))
+        await cache.get_or_fetch("a", lambda: value(1))     # a is now most recent
+        await cache.get_or_fetch("c", lambda: value(3))     # evicts b
+        return await cache.get_or_fetch("b", lambda: value(20))
+
+    assert asyncio.run(run()) == 20
+    assert cache.metrics["evicted"] == 2                    # b, then a when b came back
+    assert cache.stats()["size"] == 2
+
+
+def test_failures_are_shared_but_not_cached():
+    cache = LookupCache(ttl=100, max_entries=10)
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        results = await asyncio.gather(cache.get_or_fetch("k", boom), cache.get_or_fetch("k", boom),
+                                       return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch("k", boom)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(calls) == 2 and cache.metrics["errors"] == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_fetch():
+    async def run():
+        cache, up = LookupCache(ttl=10, max_entries=10), Upstream()
+        first = asyncio.ensure_future(cache.get_or_fetch("k", up.fetch("v")))
+        second = asyncio.ensure_future(cache.get_or_fetch("k", up.fetch("v")))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        up.release.set()
+        return cache, up, first, await second
+
+    cache, up, first, value = asyncio.run(run())
+    assert first.cancelled()
+    assert value == "v" and up.calls == 1
+    assert cache.stats()["size"] == 1 and cache.stats()["inflight"] == 0
+
+
+def test_invalidate():
+    cache = LookupCache(ttl=100, max_entries=10)
+
+    async def value(v):
+        return v
+
+    async def run():
+        for k in ((1, 1), (1, 2), (2, 1)):
+            await cache.get_or_fetch(k, lambda: value(k))
+
+    asyncio.run(run())
+    cache.invalidate((2, 1))
+    cache.invalidate_where(lambda key: key[0] == 1)
+    assert cache.stats()["size"] == 0 and cache.metrics["invalidated"] == 3
@@ -0,0 +1,99 @@
+"""Batch order-item lookups and cache invalidation in tools/newme_tools.py (upstream faked)."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from constants import DATA_CUTOFF_LIMIT
+from tools import newme_tools
+from utils.lookup_cache import LookupCache
+from utils.payload_projection import project
+
+
+def _item(order_id, item_id, history=3):
+    return {
+        "order_id": order_id,
+        "customer_name": "Asha",
+        "shipping_city": "Pune",
+        "order_item_id": item_id,
+        "item_status": "shipped" if item_id % 2 else "delivered",
+        # numbered entries, as the upstream returns for tracking history
+        **{str(n): {"event": f"scan {n} of {item_id}"} for n in range(1, history + 1)},
+    }
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake `_fetch_item_details`; records calls, item 404 fails."""
+    calls = []
+
+    async def fetch(order_id, order_item_id):
+        calls.append((order_id, order_item_id))
+        await asyncio.sleep(0)
+        if order_item_id == 404:
+            raise RuntimeError("item not found")
+        return _item(order_id, order_item_id, history=40 if order_item_id == 7 else 3)
+
+    monkeypatch.setattr(newme_tools, "_fetch_item_details", fetch)
+    # projection without the byte / token report (the tokenizer may not be downloadable)
+    monkeypatch.setattr(newme_tools, "project_and_report", lambda data, prompt, tool: project(data, prompt))
+    monkeypatch.setattr(newme_tools, "item_cache", LookupCache(ttl=60, max_entries=100))
+    return calls
+
+
+def _batch(order_id, ids, prompt="full details"):
+    return asyncio.run(newme_tools.get_order_items_batch_tool.ainvoke(
+        {"order_id": order_id, "order_item_ids": ids, "user_prompt": prompt}))
+
+
+def test_batch_hoists_common_fields(upstream):
+    out = _batch(1, [11, 12, 11])
+    assert sorted(upstream) == [(1, 11), (1, 12)]              # duplicates fetched once
+    assert out["common"]["customer_name"] == "Asha"
+    assert set(out["items"]) == {11, 12}
+    assert out["items"][11]["item_status"] == "shipped"
+    assert "customer_name" not in out["items"][11]
+    assert out["message"] == "Retrieved 2 of 2 items"
+
+
+def test_batch_reports_failed_items(upstream):
+    out = _batch(1, [11, 404])
+    assert out["errors"] == {404: "item not found"}
+    assert out["message"] == "Retrieved 1 of 2 items"
+
+
+def test_batch_caps_item_count(upstream):
+    ids = list(range(100, 100 + DATA_CUTOFF_LIMIT + 3))
+    out = _batch(1, ids)
+    assert len(upstream) == DATA_CUTOFF_LIMIT
+    assert out["message"].endswith(f"skipped 3 items beyond the limit of {DATA_CUTOFF_LIMIT}: {ids[-3:]}")
+
+
+def test_batch_applies_per_item_entry_limit(upstream):
+    out = _batch(1, [7, 8])
+    numbered = [k for k in out["items"][7] if k.isdigit()]
+    assert len(numbered) == DATA_CUTOFF_LIMIT                  # 40 upstream, cut like the single-item tool
+
+
+def test_batch_reuses_cached_items(upstream):
+    _batch(1, [11, 12])
+    _batch(1, [12, 13])
+    assert sorted(upstream) == [(1, 11), (1, 12), (1, 13)]
+
+
+def test_invalidate_item_details(upstream):
+    _batch(1, [11, 12])
+    _batch(2, [21])
+    newme_tools.invalidate_item_details(1, 11)
+    _batch(1, [11, 12])
+    assert upstream.count((1, 11)) == 2 and upstream.count((1, 12)) == 1
+
+    newme_tools.invalidate_item_details(1)                     # every item of order 1
+    _batch(1, [11, 12])
+    _batch(2, [21])
+    assert upstream.count((1, 12)) == 2 and upstream.count((2, 21)) == 1
+
+    newme_tools.invalidate_item_details()
+    _batch(2, [21])
+    assert upstream.count((2, 21)) == 2
@@ -0,0 +1,81 @@
+"""utils/payload_projection.py on a realistic item payload."""
+import json
+import sys
+import types
+
+import pytest
+
+from tools.mock_newme_api import fake_item
+from utils import payload_projection
+from utils.payload_projection import project, project_and_report, prompt_words
+
+
+def _payload():
+    item = fake_item(123456, 789)
+    item.update({
+        "customer_name": "Asha Rao",
+        "billing_address": {"line1": "12 MG Road", "city": "Pune", "pincode": "411001"},
+        "refund_details": {"refund_amount": "1299.00", "refund_utr": "UTR998877",
+                           "refund_status": "processed", "bank_name": "HDFC"},
+        "productDescription": "Cotton kurta, hand block printed " * 20,
+        "tracking_history": [{"status": f"scan {i}", "time": f"2024-05-01 {i % 24:02d}:00:00"}
+                             for i in range(30)],
+    })
+    return item
+
+
+@pytest.fixture
+def count_tokens(monkeypatch):
+    """The real tokenizer when it can load, else a stand-in (tiktoken downloads its data)."""
+    try:
+        from utils.llmUtils import count_tokens
+        return count_tokens
+    except Exception:
+        def count_tokens(text):
+            return len(text.split())
+        monkeypatch.setitem(sys.modules, "utils.llmUtils", types.SimpleNamespace(count_tokens=count_tokens))
+        return count_tokens
+
+
+def test_prompt_words_expand_synonyms():
+    words = prompt_words("Where is my order?")
+    assert {"tracking", "courier", "delivered"} <= words
+    assert "my" not in words and "order" not in words
+
+
+def test_tracking_question_keeps_shipping_fields():
+    out = project(_payload(), "where is my order")
+    assert {"tracking_number", "shipping_provider", "delivered_time", "tracking_history"} <= set(out)
+    # ids and statuses are always kept
+    assert {"order_id", "order_item_id", "item_status", "order_status"} <= set(out)
+    assert not {"payment_method", "billing_address", "productDescription", "refund_details"} & set(out)
+    assert len(out["tracking_history"]) == 21
+    assert out["tracking_history"][-1] == "… 10 more entries omitted"
+
+
+def test_refund_question_keeps_nested_refund_fields():
+    out = project(_payload(), "how much money was refunded")
+    assert out["refund_details"]["refund_amount"] == "1299.00"
+    assert "tracking_history" not in out and "billing_address" not in out
+
+
+def test_unmatched_question_keeps_everything_truncated():
+    payload = _payload()
+    out = project(payload, "hello there")
+    assert set(out) == set(payload)
+    assert len(out["tracking_history"]) == 21
+
+
+def test_report_numbers(count_tokens, monkeypatch):
+    monkeypatch.setattr(payload_projection, "PROJECTION_STATS", dict.fromkeys(payload_projection.PROJECTION_STATS, 0))
+    payload = _payload()
+    out = project_and_report(payload, "where is my order", "test_tool")
+
+    raw = json.dumps(payload, default=str, ensure_ascii=False)
+    kept = json.dumps(out, default=str, ensure_ascii=False)
+    stats = payload_projection.PROJECTION_STATS
+    assert stats["calls"] == 1
+    assert stats["raw_bytes"] == len(raw.encode()) and stats["bytes"] == len(kept.encode())
+    assert stats["raw_tokens"] == count_tokens(raw) and stats["tokens"] == count_tokens(kept)
+    assert stats["bytes"] < stats["raw_bytes"] / 2
+    assert stats["tokens"] < stats["raw_tokens"]
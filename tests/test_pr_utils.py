@@ -0,0 +1,51 @@
+"""chunk_diff in utils/pr_utils.py."""
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("httpx")          # pr_utils imports the GitHub client
+
+from utils.pr_utils import chunk_diff
+
+
+@pytest.fixture(autouse=True)
+def one_token_per_word(monkeypatch):
+    # predictable sizes, and no tokenizer download
+    monkeypatch.setitem(sys.modules, "utils.llmUtils",
+                        types.SimpleNamespace(count_tokens=lambda text: len(text.split())))
+
+
+def _file(name, hunks):
+    lines = [f"+++ b/{name}"]
+    for start, body in hunks:
+        lines.append(f"@@ -{start},{len(body)} +{start},{len(body)} @@")
+        lines += body
+    return lines
+
+
+def test_small_files_are_packed_together():
+    diff = _file("a.py", [(1, ["+x = 1"])]) + _file("b.py", [(1, ["+y = 2"])])
+    assert chunk_diff("\n".join(diff), 100) == ["\n".join(diff)]
+
+
+def test_large_file_splits_between_hunks_with_its_header():
+    hunks = [(i * 10, [f"+line {i} {j}" for j in range(5)]) for i in range(4)]
+    chunks = chunk_diff("\n".join(_file("a.py", hunks)), 40)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith("+++ b/a.py\n@@")
+    body = [ln for c in chunks for ln in c.splitlines() if not ln.startswith("+++")]
+    assert body == _file("a.py", hunks)[1:]
+
+
+def test_oversized_hunk_repeats_its_hunk_header():
+    body = ["+same line"] * 30                    # identical lines must not confuse the split
+    diff = _file("a.py", [(1, body)])
+    chunks = chunk_diff("\n".join(diff), 25)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        lines = chunk.splitlines()
+        assert lines[:2] == diff[:2]
+        assert sum(len(ln.split()) + 1 for ln in lines) <= 25
+    assert sum(c.count("+same line") for c in chunks) == 30
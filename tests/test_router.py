@@ -0,0 +1,52 @@
+"""Rule-based fast path in utils/router.py."""
+import pytest
+
+pytest.importorskip("httpx")          # utils.router imports the PR URL pattern from pr_utils
+
+from utils import router
+
+
+@pytest.mark.parametrize("text", [
+    "how many orders were cancelled last week",
+    "what is the number of refunds this week",
+    "count orders by city",
+    "cancellation rate per city last month",
+    "sql for cancellations",
+])
+def test_analytics_questions_go_to_satwik(text):
+    assert router.route(text) == ("SATWIK", text)
+
+
+@pytest.mark.parametrize("text", [
+    "I have a query regarding order status",
+    "how many orders did I place",
+    "can you tell me how many items are in my order",
+    "where is my order",
+    "how many",
+    "query",
+])
+def test_support_questions_go_to_the_supervisor(text):
+    assert router.route(text) is None
+
+
+def test_order_and_item_ids_go_to_sam():
+    text = "status of order 123456 item 789"
+    assert router.route(text) == ("SAM", text)
+
+
+@pytest.mark.parametrize("text,url", [
+    ("https://github.com/org/repo/pull/12", "https://github.com/org/repo/pull/12"),
+    ("please review <https://github.com/org/repo/pull/12|PR 12>", "https://github.com/org/repo/pull/12"),
+])
+def test_bare_pr_links_go_to_preview(text, url):
+    assert router.route(text) == ("PREVIEW", url)
+
+
+def test_pr_link_with_a_question_goes_to_the_supervisor():
+    assert router.route("why does https://github.com/org/repo/pull/12 change the retry logic") is None
+
+
+def test_follow_ups_with_back_references_need_the_supervisor():
+    assert router.route("same for returns per day", first_turn=True) is not None
+    assert router.route("same for returns per day", first_turn=False) is None
+    assert router.route("how many orders were returned yesterday", first_turn=False) is not None
@@ -0,0 +1,74 @@
+"""utils/semantic_cache.py: exact and semantic hits, and the gate that keeps near-duplicates apart."""
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.semantic_cache import SemanticCache
+
+TODAY = "2024-05-01"
+
+
+async def same_vector(text):
+    # every question embeds identically, so only the gate can tell them apart
+    return np.array([1.0, 0.0])
+
+
+def _served(cache, first, second):
+    async def run():
+        _, probe = await cache.lookup(first, TODAY)
+        cache.store(probe, "answer")
+        answer, _ = await cache.lookup(second, TODAY)
+        return answer
+    return asyncio.run(run()) == "answer"
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = SemanticCache()
+    assert _served(cache, "How many orders were cancelled?", "how many orders were cancelled")
+    assert cache.metrics["exact_hits"] == 1
+
+
+def test_rephrasing_is_a_semantic_hit():
+    cache = SemanticCache(embed=same_vector)
+    assert _served(cache, "orders by city last week", "city-wise orders last week")
+    assert _served(cache, "daily cancellations", "cancellations per day")
+    assert cache.metrics["semantic_hits"] == 2
+
+
+@pytest.mark.parametrize("first,second", [
+    ("orders by city last week", "orders by state last week"),
+    ("orders per city", "orders per brand"),
+    ("monthly refunds", "weekly refunds"),
+    ("orders last week", "orders this week"),
+    ("top 5 products", "top 10 products"),
+    ("orders in 'Pune'", "orders in 'Delhi'"),
+])
+def test_different_dimensions_never_share_an_answer(first, second):
+    cache = SemanticCache(embed=same_vector)
+    assert not _served(cache, first, second)
+    assert cache.metrics["semantic_hits"] == 0
+
+
+def test_below_threshold_is_a_miss():
+    async def orthogonal(text):
+        return np.array([1.0, 0.0]) if "orders" in text else np.array([0.0, 1.0])
+
+    cache = SemanticCache(embed=orthogonal)
+    assert not _served(cache, "count of orders", "count of returns")
+
+
+def test_entries_expire():
+    now = [0.0]
+    cache = SemanticCache(ttl=10, clock=lambda: now[0])
+
+    async def run():
+        _, probe = await cache.lookup("refunds by courier", TODAY)
+        cache.store(probe, "answer")
+        now[0] = 11
+        return await cache.lookup("refunds by courier", TODAY)
+
+    answer, probe = asyncio.run(run())
+    assert answer is None and probe is not None
+    assert cache.metrics["expired"] == 1
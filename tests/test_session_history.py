@@ -0,0 +1,106 @@
+# Checkpointed conversation history: one copy per turn, cleared on eviction.
+import asyncio, importlib, sys, types
+import pytest
+
+from utils.session_store import SessionStore
+
+langgraph = pytest.importorskip("langgraph")
+
+from typing import Annotated, Sequence
+from typing_extensions import TypedDict
+from langchain_core.messages import AIMessage, BaseMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+
+class _State(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+
+
+def _stub_supervisor(checkpointer):
+    """Stands in for the supervisor: answers every turn with one AIMessage."""
+    async def answer(state):
+        return {"messages": [AIMessage(content=f"answer {len(state['messages'])}")]}
+
+    graph = StateGraph(_State)
+    graph.add_node("SUPERVISOR", answer)
+    graph.add_edge(START, "SUPERVISOR")
+    graph.add_edge("SUPERVISOR", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+@pytest.fixture
+def session_cls(monkeypatch):
+    """utils.ai_session.Session with the LLM-backed modules replaced by stubs."""
+    stubs = {
+        "agents.supervisor_agents": {"get_supervisor": None},
+        "utils.summarizer": {"needs_compaction": lambda messages: False},
+        "utils.datetime_utils": {"timezone_to_offset": lambda tz: "+05:30"},
+    }
+    for name, attrs in stubs.items():
+        monkeypatch.setitem(sys.modules, name, types.SimpleNamespace(**attrs))
+    monkeypatch.delitem(sys.modules, "utils.ai_session", raising=False)
+    Session = importlib.import_module("utils.ai_session").Session
+    yield Session
+    Session._app = None
+
+
+async def _turns(session, n):
+    for i in range(n):
+        async for _ in session.run_query(f"question {i}"):
+            pass
+
+
+def _thread(app, thread_id):
+    return app.get_state({"configurable": {"thread_id": thread_id}}).values["messages"]
+
+
+def test_thread_grows_linearly_with_turns(session_cls):
+    saver = MemorySaver()
+    session_cls._app = _stub_supervisor(saver)
+    session = session_cls("u::c", "u", exp=0)
+
+    asyncio.run(_turns(session, 5))
+
+    messages = _thread(session_cls._app, "u::c")
+    # session header + one question and one answer per turn, nothing resent
+    assert len(messages) == 1 + 2 * 5
+    assert [m.content for m in messages if m.type == "human"] == [f"question {i}" for i in range(5)]
+
+
+def test_thread_is_trimmed_to_max_turns(session_cls):
+    session_cls._app = _stub_supervisor(MemorySaver())
+    session = session_cls("u::c", "u", exp=0, max_turns=3)
+
+    asyncio.run(_turns(session, 6))
+
+    messages = _thread(session_cls._app, "u::c")
+    # at most max_turns * 2 messages including the header, cut on whole turns
+    assert len(messages) <= 3 * 2
+    assert messages[0].type == "system" and messages[1].type == "human"
+    assert [m.content for m in messages if m.type == "human"] == ["question 4", "question 5"]
+
+
+def test_evicted_and_expired_sessions_drop_their_thread():
+    saver = MemorySaver()
+    app = _stub_supervisor(saver)
+    now = [0.0]
+
+    async def run():
+        store = SessionStore(lambda key, user_id, exp: key, ttl=10, max_sessions=1,
+                             on_evict=lambda key: saver.adelete_thread(key), clock=lambda: now[0])
+        for conv in ("a", "b"):
+            store.get("u", conv)
+            await app.ainvoke({"messages": [("user", "hi")]},
+                              {"configurable": {"thread_id": f"u::{conv}"}})
+        store.get("u", "c")                   # evicts u::b (u::a went when b arrived)
+        now[0] = 100
+        assert store.sweep() == 1             # u::c expired
+        await asyncio.gather(*store._cleanups)
+        return store
+
+    store = asyncio.run(run())
+    assert store.metrics["evicted"] == 2 and store.metrics["expired"] == 1
+    for conv in ("a", "b"):
+        assert not app.get_state({"configurable": {"thread_id": f"u::{conv}"}}).values
@@ -0,0 +1,146 @@
+"""SlackStreamer against a fake Slack client and a manual clock."""
+import asyncio
+
+import pytest
+
+from utils.slack_stream import SlackStreamer
+
+
+class FakeSlack:
+    """Records chat.postMessage / chat.update calls; `text` holds each message's current text."""
+
+    def __init__(self):
+        self.calls: list[tuple] = []
+        self.text: dict[str, str] = {}
+
+    async def chat_postMessage(self, *, channel, thread_ts, text):
+        ts = f"{len(self.text) + 1}.000"
+        self.calls.append(("post", ts, text))
+        self.text[ts] = text
+        return {"ts": ts}
+
+    async def chat_update(self, *, channel, ts, text):
+        self.calls.append(("update", ts, text))
+        self.text[ts] = text
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _streamer(slack, clock, **kw):
+    kw = {"placeholder": "…", "flush_interval": 1.0, "flush_chars": 50, "max_chars": 100, **kw}
+    return SlackStreamer(slack, "D1", "1.0", clock=clock, **kw)
+
+
+def _updates(slack):
+    return [c for c in slack.calls if c[0] == "update"]
+
+
+def test_start_posts_placeholder():
+    slack, clock = FakeSlack(), Clock()
+    s = _streamer(slack, clock)
+    asyncio.run(s.start())
+    assert slack.calls == [("post", "1.000", "…")]
+    assert s.messages == ["1.000"]
+
+
+def test_small_chunks_are_coalesced_until_the_interval():
+    slack, clock = FakeSlack(), Clock()
+    s = _streamer(slack, clock)
+
+    async def run():
+        await s.start()
+        for word in ("a", "b", "c"):
+            clock.now += 0.2
+            await s.push(word)
+        assert _updates(slack) == []            # below both budgets
+        clock.now += 1.0
+        await s.push("d")
+
+    asyncio.run(run())
+    assert _updates(slack) == [("update", "1.000", "abcd")]
+
+
+def test_flush_on_chars():
+    slack, clock = FakeSlack(), Clock()
+    s = _streamer(slack, clock)
+
+    async def run():
+        await s.start()
+        await s.push("x" * 30)
+        await s.push("y" * 30)                   # 60 pending >= 50, no time passed
+
+    asyncio.run(run())
+    assert _updates(slack) == [("update", "1.000", "x" * 30 + "y" * 30)]
+
+
+def test_rollover_past_max_chars():
+    slack, clock = FakeSlack(), Clock()
+    s = _streamer(slack, clock)
+    lines = [f"line {i:02d} " + "z" * 20 + "\n" for i in range(10)]   # 30 chars each
+
+    async def run():
+        await s.start()
+        for line in lines:
+            await s.push(line)
+        return await s.finish()
+
+    reply = asyncio.run(run())
+    assert len(s.messages) == 4                  # three 30-char lines fit in 100
+    assert all(len(t) <= 100 for t in slack.text.values())
+    # every message was cut on a line boundary and nothing was lost
+    assert "\n".join(slack.text[ts] for ts in s.messages) == "".join(lines).strip()
+    assert reply == "".join(lines).strip()
+
+
+def test_finish_on_empty_stream_shows_fallback():
+    slack, clock = FakeSlack(), Clock()
+    s = _streamer(slack, clock)
+
+    async def run():
+        await s.start()
+        return await s.finish()
+
+    assert asyncio.run(run()) == "_(no answer)_"
+    assert slack.text["1.000"] == "_(no answer)_"
+
+
+def test_failed_update_is_retried_on_next_flush():
+    slack, clock = FakeSlack(), Clock()
+    s = _streamer(slack, clock)
+    original = slack.chat_update
+    failures = [RuntimeError("ratelimited")]
+
+    async def flaky(**kw):
+        if failures:
+            raise failures.pop()
+        await original(**kw)
+
+    slack.chat_update = flaky
+
+    async def run():
+        await s.start()
+        await s.push("x" * 60)                   # update fails
+        return await s.finish()
+
+    assert asyncio.run(run()) == "x" * 60
+    assert slack.text["1.000"] == "x" * 60
+
+
+@pytest.mark.parametrize("chunks", [["", ""], []])
+def test_empty_chunks_are_ignored(chunks):
+    slack, clock = FakeSlack(), Clock()
+    s = _streamer(slack, clock)
+
+    async def run():
+        await s.start()
+        for c in chunks:
+            await s.push(c)
+
+    asyncio.run(run())
+    assert _updates(slack) == []
@@ -0,0 +1,103 @@
+"""
+utils/sql_engine.py against the SQLite stand-in: row / byte caps, the
+truncation flag, TSV decoding for ClickHouse and execute_sql_tool's output.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from utils import sql_engine
+from utils.sql_engine import SQLiteBackend, QueryResult, render_table, _tsv_unescape, _FORMAT_CLAUSE
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "analytics.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE order_items_view (order_id INTEGER, city TEXT, quantity INTEGER)")
+    conn.executemany("INSERT INTO order_items_view VALUES (?, ?, ?)",
+                     [(i, f"city-{i % 7}", i % 3) for i in range(1, 1001)])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def _run(backend, sql, max_rows=20, max_bytes=16000) -> QueryResult:
+    return asyncio.run(backend.execute(sql, max_rows, max_bytes))
+
+
+def test_small_result_is_complete(db_path):
+    result = _run(SQLiteBackend(db_path, pool_size=1),
+                  "SELECT city, count(*) AS n FROM order_items_view GROUP BY city ORDER BY city")
+    assert result.columns == ["city", "n"]
+    assert len(result.rows) == 7 and not result.truncated
+    assert result.rows[0] == ("city-0", 142)
+
+
+def test_row_cap_truncates(db_path):
+    result = _run(SQLiteBackend(db_path, pool_size=1), "SELECT * FROM order_items_view", max_rows=20)
+    assert len(result.rows) == 20 and result.truncated
+
+
+def test_exact_row_cap_is_not_truncated(db_path):
+    result = _run(SQLiteBackend(db_path, pool_size=1),
+                  "SELECT * FROM order_items_view LIMIT 20", max_rows=20)
+    assert len(result.rows) == 20 and not result.truncated
+
+
+def test_byte_cap_truncates(db_path):
+    result = _run(SQLiteBackend(db_path, pool_size=1), "SELECT * FROM order_items_view",
+                  max_rows=1000, max_bytes=200)
+    assert result.truncated
+    assert 0 < result.nbytes <= 200
+    assert len(result.rows) < 20
+
+
+def test_backend_is_read_only(db_path):
+    with pytest.raises(sqlite3.OperationalError):
+        _run(SQLiteBackend(db_path, pool_size=1), "DELETE FROM order_items_view")
+
+
+def test_render_table_marks_nulls_and_truncation():
+    text = render_table(QueryResult(["city", "n"], [("Pune", 3), (None, 1)], True, 12))
+    lines = text.splitlines()
+    assert lines[1].startswith("city") and "NULL" in lines[4]
+    assert lines[-1] == "2 row(s) – truncated, add filters / LIMIT for the rest"
+
+
+@pytest.mark.parametrize("field,value", [
+    (r"plain", "plain"),
+    (r"a\tb\nc", "a\tb\nc"),
+    (r"C:\\new\\tab", r"C:\new\tab"),          # escaped backslash before n / t
+    (r"it\'s", "it's"),
+    (r"\N", None),
+])
+def test_tsv_unescape(field, value):
+    assert _tsv_unescape(field) == value
+
+
+@pytest.mark.parametrize("sql,expected", [
+    ("SELECT 1 FORMAT JSONEachRow", "SELECT 1"),
+    ("SELECT 1 FORMAT JSON SETTINGS max_threads = 4", "SELECT 1 SETTINGS max_threads = 4"),
+    ("SELECT 'FORMAT CSV' AS f", "SELECT 'FORMAT CSV' AS f"),
+])
+def test_format_clause_is_stripped(sql, expected):
+    assert _FORMAT_CLAUSE.sub("", sql) == expected
+
+
+def test_execute_sql_tool_output(db_path, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from tools.satwik_tools import execute_sql_tool
+
+    monkeypatch.setattr(sql_engine, "_backend", SQLiteBackend(db_path, pool_size=1))
+
+    async def call(sql):
+        return await execute_sql_tool.ainvoke({"sql": sql})
+
+    out = asyncio.run(call("```sql\nSELECT order_id, city FROM order_items_view ORDER BY order_id\n```"))
+    assert out.startswith("```\norder_id | city")
+    assert out.endswith("20 row(s) – truncated, add filters / LIMIT for the rest")
+
+    assert asyncio.run(call("DELETE FROM order_items_view")).startswith("Refused")
+    assert asyncio.run(call("SELECT nope FROM order_items_view")).startswith("Error executing query")
@@ -0,0 +1,105 @@
+"""
+Offline corpus for utils/sql_validator.py: valid ClickHouse queries must
+pass untouched (every false rejection costs a repair round-trip), broken
+ones must be caught.  Columns come from agents/satwik.py without importing
+it (no LLM / langchain needed).
+"""
+import ast
+import pathlib
+
+import pytest
+
+from utils.sql_validator import validate_sql, extract_sql, is_read_only, is_known_function
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+TABLE = "analytics.order_items_view"
+EXCL = "order_status NOT IN ('wc-failed','trash','wc-pending')"
+
+
+def _satwik_columns() -> set[str]:
+    tree = ast.parse((ROOT / "agents" / "satwik.py").read_text())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", "") == "COLUMNS":
+            return set(ast.literal_eval(node.value))
+    raise AssertionError("COLUMNS not found in agents/satwik.py")
+
+
+COLUMNS = _satwik_columns()
+TABLES = {TABLE}
+
+VALID = [
+    # explicit and implicit aliases
+    f"SELECT city, count() AS cancellations FROM {TABLE} WHERE date(cancelled_time) = yesterday() "
+    f"AND {EXCL} GROUP BY city ORDER BY cancellations DESC LIMIT 10",
+    f"SELECT formatDateTime(order_date, '%Y-%m') m, count() c FROM {TABLE} WHERE {EXCL} GROUP BY m ORDER BY m",
+    f"SELECT city c, sum(quantity) units FROM {TABLE} o WHERE o.{EXCL} GROUP BY c",
+    # subquery with alias, referenced through the alias
+    f"SELECT t.city, t.cnt FROM (SELECT city, count() cnt FROM {TABLE} WHERE {EXCL} GROUP BY city) t "
+    "ORDER BY t.cnt DESC LIMIT 5",
+    f"SELECT city FROM (SELECT city, uniqExact(order_id) AS orders FROM {TABLE} WHERE {EXCL} GROUP BY city) AS s "
+    "WHERE s.orders > 10",
+    # CTEs
+    f"WITH base AS (SELECT o.order_id, toStartOfMonth(o.order_date) AS m FROM {TABLE} AS o WHERE o.{EXCL}) "
+    "SELECT m, uniqExact(order_id) FROM base GROUP BY m",
+    # EXTRACT / TRIM keyword arguments
+    f"SELECT EXTRACT(YEAR FROM order_date) AS y, count() FROM {TABLE} WHERE {EXCL} GROUP BY y",
+    f"SELECT trim(BOTH ' ' FROM city) AS c FROM {TABLE} WHERE {EXCL} LIMIT 5",
+    # CASE … END alias
+    f"SELECT CASE WHEN quantity > 1 THEN 'multi' ELSE 'single' END bucket, count() n FROM {TABLE} "
+    f"WHERE {EXCL} GROUP BY bucket",
+    # SETTINGS / FORMAT clauses
+    f"SELECT count() FROM {TABLE} WHERE {EXCL} SETTINGS max_threads = 4, max_execution_time = 30",
+    f"SELECT count() FROM {TABLE} WHERE {EXCL} FORMAT JSONEachRow",
+    # lambdas, intervals, window functions
+    f"SELECT count(*) FROM {TABLE} WHERE order_date >= now() - INTERVAL 7 DAY "
+    f"AND arrayExists(x -> x > 1, [1, 2]) AND {EXCL}",
+    f"SELECT order_id, row_number() OVER (PARTITION BY user_id ORDER BY order_date) rn FROM {TABLE} WHERE {EXCL}",
+    # combinators and function families
+    f"SELECT quantileExact(0.9)(quantity), countDistinct(user_id), uniqCombined(order_id), "
+    f"sumIf(quantity, city = 'Pune'), avgOrNull(quantity) FROM {TABLE} WHERE {EXCL}",
+    f"SELECT toLastDayOfMonth(order_date) AS d, uniqExactIf(order_id, quantity > 1) FROM {TABLE} "
+    f"WHERE {EXCL} GROUP BY d",
+    # the user asked about the excluded statuses themselves
+    f"SELECT count() FROM {TABLE} WHERE order_status = 'wc-failed'",
+]
+
+INVALID = [
+    (f"SELECT status FROM {TABLE} WHERE {EXCL}", "unknown column 'status'"),
+    (f"SELECT citty c FROM {TABLE} WHERE {EXCL}", "unknown column 'citty'"),
+    (f"SELECT fooBar(city) FROM {TABLE} WHERE {EXCL}", "unknown function fooBar()"),
+    (f"SELECT count() FROM analytics.orders WHERE {EXCL}", "unknown table 'analytics.orders'"),
+    (f"SELECT count() FROM {TABLE} WHERE (city = 'x'", "unbalanced parentheses"),
+    (f"SELECT count() FROM {TABLE}", "rule 6"),
+    (f"DROP TABLE {TABLE}", "read-only"),
+]
+
+
+@pytest.mark.parametrize("sql", VALID)
+def test_valid_queries_pass(sql):
+    question = "how many wc-failed orders" if "= 'wc-failed'" in sql else ""
+    assert validate_sql(sql, COLUMNS, TABLES, question) == []
+
+
+@pytest.mark.parametrize("sql,problem", INVALID)
+def test_invalid_queries_are_reported(sql, problem):
+    errors = validate_sql(sql, COLUMNS, TABLES)
+    assert any(problem in e for e in errors), errors
+
+
+def test_extract_sql_and_read_only():
+    assert extract_sql("here\n```sql\nSELECT 1\n```") == "SELECT 1"
+    assert extract_sql("no query") is None
+    assert is_read_only("SELECT 1")
+    assert not is_read_only("SELECT 1; DROP TABLE x")
+
+
+@pytest.mark.parametrize("name", ["quantileExact", "quantilesTDigest", "countDistinct",
+                                  "uniqCombined64", "toLastDayOfMonth", "sumIfState",
+                                  "avgMerge", "groupArrayDistinct", "COUNT", "ToStartOfWeek"])
+def test_known_functions(name):
+    assert is_known_function(name)
+
+
+@pytest.mark.parametrize("name", ["fooBar", "fooIf", "state", "selectStuff"])
+def test_unknown_functions(name):
+    assert not is_known_function(name)
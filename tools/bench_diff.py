@@ -0,0 +1,87 @@
+"""
+Benchmark: two-pass slice_diff + annotate_diff vs the single-pass diff engine.
+
+    python tools/bench_diff.py --files 400 --hunks 8 --lines 60 --repeat 3
+
+Builds a synthetic unified diff, then reports wall time, peak traced
+memory and output size of both paths.  The engine is also fed the diff
+as a lazy line generator, the way a streamed HTTP body arrives, so its
+peak memory excludes the input text.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pr_utils import slice_diff, annotate_diff  # noqa: E402
+from utils.diff_engine import process_diff            # noqa: E402
+
+
+def synthetic_lines(files: int, hunks: int, lines: int, seed: int = 7):
+    """Lines of a synthetic diff, generated lazily like a streamed body."""
+    rnd = random.Random(seed)
+    for f in range(files):
+        path = f"pkg/module_{f}.py"
+        yield from (f"diff --git a/{path} b/{path}", "index 0000000..1111111 100644",
+                    f"--- a/{path}", f"+++ b/{path}")
+        old = new = 1
+        for _ in range(hunks):
+            old += rnd.randint(5, 40)
+            new = old + rnd.randint(-3, 3)
+            body, o, n = [], 0, 0
+            for i in range(lines):
+                r = rnd.random()
+                if r < 0.15:
+                    body.append(f"-    value_{i} = compute({i})"); o += 1
+                elif r < 0.35:
+                    body.append(f"+    value_{i} = compute_fast({i}, cache=True)"); n += 1
+                else:
+                    body.append(f"     context_line_{i}()"); o += 1; n += 1
+            yield f"@@ -{old},{o} +{max(new, 1)},{n} @@ def function_{f}():"
+            yield from body
+            old += o
+
+
+def measure(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--hunks", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    shape = (args.files, args.hunks, args.lines)
+    diff = "\n".join(synthetic_lines(*shape)) + "\n"
+    print(f"diff: {len(diff) / 1e6:.1f} MB, {diff.count(chr(10))} lines")
+
+    cases = {
+        "slice_diff + annotate_diff": lambda: annotate_diff(slice_diff(diff)),
+        "diff_engine (text)": lambda: process_diff(diff).text,
+        # never holds the input text; timing includes generating the lines
+        "diff_engine (line stream)": lambda: process_diff(synthetic_lines(*shape)).text,
+    }
+    print(f"{'path':<30}{'best s':>10}{'peak MB':>10}{'out MB':>10}")
+    for name, fn in cases.items():
+        secs, peak, out = measure(fn, args.repeat)
+        print(f"{name:<30}{secs:>10.3f}{peak / 1e6:>10.1f}{len(out) / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
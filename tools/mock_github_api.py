@@ -0,0 +1,124 @@
+"""
+Local fake of the GitHub REST endpoints PREVIEW uses.
+
+    python tools/mock_github_api.py --port 8090 --rate-limit 30
+    GITHUB_API_URL=http://127.0.0.1:8090 python app.py
+
+Serves PRs registered in `PULLS` (pull JSON with ETag / 304, `.diff`
+media type), the compare API and raw file contents, and sends
+X-RateLimit-* headers, answering 403 once the budget is spent.
+`serve()` runs it on a background thread for scripts and tests (see the
+`github_api` fixture in tests/conftest.py).
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_DIFF = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,4 @@
+ import os
++import sys
+ 
+ def main():
+"""
+
+# (owner, repo, num) -> {"head": sha, "diff": text}
+PULLS = {("org", "repo", 1): {"head": "a" * 40, "diff": SAMPLE_DIFF}}
+# (owner, repo, base, head) -> diff text
+COMPARES: dict = {}
+# (owner, repo, ref, path) -> file text
+FILES = {("org", "repo", "a" * 40, "app.py"): "import os\nimport sys\n\ndef main():\n    pass\n"}
+
+_PULL    = re.compile(r"^/repos/([^/]+)/([^/]+)/pulls/(\d+)$")
+_COMPARE = re.compile(r"^/repos/([^/]+)/([^/]+)/compare/([0-9a-f]+)\.\.\.([0-9a-f]+)$")
+_CONTENT = re.compile(r"^/repos/([^/]+)/([^/]+)/contents/(.+)$")
+
+
+class Handler(BaseHTTPRequestHandler):
+    rate_limit = 5000
+    used = 0
+    reset = 0
+    calls = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.calls += 1
+        path, _, query = self.path.partition("?")
+        accept = self.headers.get("Accept", "")
+        if cls.reset < time.time():
+            cls.used, cls.reset = 0, int(time.time()) + 3600
+
+        body, ctype = self._route(path, query, accept)
+        if body is None:
+            return self._send(404, b'{"message": "Not Found"}', "application/json")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", ctype, etag)       # free: not counted
+        if cls.used >= cls.rate_limit:
+            return self._send(403, b'{"message": "API rate limit exceeded"}', "application/json")
+        cls.used += 1
+        self._send(200, body, ctype, etag)
+
+    def _route(self, path, query, accept):
+        if m := _PULL.match(path):
+            pr = PULLS.get((m.group(1), m.group(2), int(m.group(3))))
+            if pr is None:
+                return None, ""
+            if "diff" in accept:
+                return pr["diff"].encode(), "text/plain"
+            return json.dumps({"number": int(m.group(3)), "head": {"sha": pr["head"]}}).encode(), \
+                "application/json"
+        if m := _COMPARE.match(path):
+            diff = COMPARES.get(m.groups())
+            return (diff.encode(), "text/plain") if diff is not None else (None, "")
+        if m := _CONTENT.match(path):
+            ref = dict(p.split("=", 1) for p in query.split("&") if "=" in p).get("ref", "")
+            text = FILES.get((m.group(1), m.group(2), ref, m.group(3)))
+            return (text.encode(), "text/plain") if text is not None else (None, "")
+        return None, ""
+
+    def _send(self, status, body, ctype, etag=None):
+        cls = type(self)
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("X-RateLimit-Limit", str(cls.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(max(cls.rate_limit - cls.used, 0)))
+        self.send_header("X-RateLimit-Reset", str(cls.reset))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve(port: int = 0, rate_limit: int = 5000):
+    """Yields the base URL to use as GITHUB_API_URL."""
+    Handler.rate_limit, Handler.used, Handler.reset, Handler.calls = rate_limit, 0, 0, 0
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    args = parser.parse_args()
+    with serve(args.port, args.rate_limit) as url:
+        print(f"fake GitHub API on {url}")
+        threading.Event().wait()
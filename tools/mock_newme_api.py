@@ -0,0 +1,95 @@
+"""
+Local stand-in for the internal tools API used by SAM.
+
+    python tools/mock_newme_api.py --port 8089 --delay 0.2 --fail-rate 0.2
+    NEWME_API_URL=http://127.0.0.1:8089/kapture/fetch/ python app.py
+
+`--fail-rate` answers that share of requests with 503 to exercise the
+retry path.  `serve()` runs the server on a background thread for scripts
+and tests (see the `newme_api` fixture in tests/conftest.py); its `script`
+lists status codes to answer the first requests with, in order.
+"""
+import argparse
+import contextlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_item(order_id, order_item_id):
+    return {
+        "order_id": order_id,
+        "order_item_id": order_item_id,
+        "item_status": "wc-delivered",
+        "order_status": "wc-completed",
+        "payment_method": "cod",
+        "shipping_provider": "delhivery",
+        "tracking_number": f"TRK{order_item_id}",
+        "delivered_time": "2024-05-02 14:10:00",
+        "price_after_coupon_and_wallet": "1299.00",
+        "tracking_history": [
+            {"status": s, "time": f"2024-05-0{i + 1} 10:00:00"}
+            for i, s in enumerate(("packed", "shipped", "out for delivery", "delivered"))
+        ],
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_rate = 0.0
+    calls = 0
+    script: list = []          # status codes for the next requests (429 carries Retry-After: 0)
+
+    def do_POST(self):
+        type(self).calls += 1
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.delay)
+        if not self.path.endswith("/item/details"):
+            return self._send(404, {"error": "not found"})
+        if self.script:
+            status = self.script.pop(0)
+            return self._send(status, {"error": "scripted"},
+                              {"Retry-After": "0"} if status == 429 else {})
+        if random.random() < self.fail_rate:
+            return self._send(503, {"error": "unavailable"})
+        self._send(200, {"data": fake_item(body.get("order_id"), body.get("order_item_id"))})
+
+    def _send(self, status, payload, headers=None):
+        raw = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve(port: int = 0, delay: float = 0.0, fail_rate: float = 0.0, script=()):
+    """Yields the base URL to use as NEWME_API_URL."""
+    Handler.delay, Handler.fail_rate, Handler.calls = delay, fail_rate, 0
+    Handler.script = list(script)
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/kapture/fetch/"
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    with serve(args.port, args.delay, args.fail_rate) as url:
+        print(f"mock tools API on {url}")
+        threading.Event().wait()
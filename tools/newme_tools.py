@@ -1,15 +1,29 @@
+import os
+import asyncio
 import traceback
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.tools import tool
-import requests
-from constants import DATA_CUTOFF_LIMIT
+from constants import (
+    DATA_CUTOFF_LIMIT,
+    NEWME_API_URL,
+    ORDER_CACHE_TTL,
+    ORDER_CACHE_MAX,
+    ORDER_BATCH_CONCURRENCY,
+)
+from utils.http_client import get_client, request_with_retries
+from utils.lookup_cache import LookupCache
+from utils.payload_projection import project_and_report
 import logging
-import json
 
-base_url = "https://internaltoolsapi.newme.asia/kapture/fetch/"
-auth_token = "<NEWME AUTH TOKEN>"
+# NEWME_API_URL can point at tools/mock_newme_api.py for local runs
+base_url = os.getenv("NEWME_API_URL", NEWME_API_URL)
+auth_token = os.getenv("NEWME_AUTH_TOKEN", "<NEWME AUTH TOKEN>")
 logger = logging.getLogger(__name__)
 
+# order items are looked up repeatedly within a conversation and across a
+# support burst; see invalidate_item_details() after anything mutates an order
+item_cache = LookupCache(ttl=ORDER_CACHE_TTL, max_entries=ORDER_CACHE_MAX)
+
 class GetOrderDetailsPromptInput(BaseModel):
     order_id: int = Field("order_id")
     order_item_id: int = Field("order_item_id")
@@ -19,7 +33,7 @@ class GetOrderDetailsPromptInput(BaseModel):
     )
 
 @tool("get_order_item_details_tool", args_schema=GetOrderDetailsPromptInput)
-def get_order_item_details_tool(order_id : int, order_item_id : int, user_prompt: str):
+async def get_order_item_details_tool(order_id : int, order_item_id : int, user_prompt: str):
     """
     Retrieves detailed information about a specific order based on the provided order ID, item ID, 
     and a natural language prompt describing the required data.
@@ -37,8 +51,15 @@ def get_order_item_details_tool(order_id : int, order_item_id : int, user_prompt
         Exception: If an error occurs while retrieving the order details.
     """
     try:
-        data = get_item_details(order_id, order_item_id, user_prompt)
-        result = {'data' : data, 'message' : "I have retrieved your items details succesfully"}
+        data = await get_item_details(order_id, order_item_id, user_prompt)
+        message = "I have retrieved your items details succesfully"
+        if isinstance(data, dict):
+            limited = filter_docs_to_limit(data, DATA_CUTOFF_LIMIT)
+            if len(limited) < len(data):
+                message += f" (showing the first {DATA_CUTOFF_LIMIT} entries only)"
+            data = limited
+        data = project_and_report(data, user_prompt, "get_order_item_details_tool")
+        result = {'data' : data, 'message' : message}
         return result
 
     except Exception as e:
@@ -46,23 +67,109 @@ def get_order_item_details_tool(order_id : int, order_item_id : int, user_prompt
         return f"Error calling get_order_details_tool: {e}"
 
 
-def get_item_details(order_id, order_item_id, user_prompt):
+class GetOrderItemsBatchInput(BaseModel):
+    order_id: int = Field(..., description="The order the items belong to.")
+    order_item_ids: list[int] = Field(
+        ...,
+        description="Every order item id the user is asking about, all in this one call."
+    )
+    user_prompt: str = Field(
+        ...,
+        description="A pricise single sentence question describing the data user is looking for exactly, for all the items."
+    )
+
+@tool("get_order_items_batch_tool", args_schema=GetOrderItemsBatchInput)
+async def get_order_items_batch_tool(order_id: int, order_item_ids: list[int], user_prompt: str):
+    """
+    Retrieves details for several items of one order in a single call. Use it instead of
+    calling get_order_item_details_tool once per item whenever the question covers more
+    than one item (e.g. "status of all items in order 123").
+
+    Returns:
+        dict: `common` holds the fields that are identical for every item (order level data),
+              `items` maps each order item id to its remaining fields and `errors` lists the
+              items that could not be fetched. At most DATA_CUTOFF_LIMIT items are fetched.
+    """
+    try:
+        return await get_items_batch(order_id, order_item_ids, user_prompt)
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        return f"Error calling get_order_items_batch_tool: {e}"
+
+
+def _client():
+    return get_client("newme", headers={
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {auth_token}',
+    })
+
+async def get_item_details(order_id, order_item_id, user_prompt):
+    """Item details, served from `item_cache` when fresh (the prompt is not part of the key)."""
+    return await item_cache.get_or_fetch(
+        (int(order_id), int(order_item_id)),
+        lambda: _fetch_item_details(order_id, order_item_id),
+    )
+
+async def get_items_batch(order_id, order_item_ids, user_prompt):
+    """Concurrent lookups (at most ORDER_BATCH_CONCURRENCY at a time) merged into one payload."""
+    ids = list(dict.fromkeys(order_item_ids))
+    skipped = ids[DATA_CUTOFF_LIMIT:]
+    ids = ids[:DATA_CUTOFF_LIMIT]
+    semaphore = asyncio.Semaphore(ORDER_BATCH_CONCURRENCY)
+
+    async def one(item_id):
+        async with semaphore:
+            return await get_item_details(order_id, item_id, user_prompt)
+
+    results = await asyncio.gather(*(one(i) for i in ids), return_exceptions=True)
+    # same per-item entry limit as get_order_item_details_tool
+    found = {i: filter_docs_to_limit(r, DATA_CUTOFF_LIMIT) if isinstance(r, dict) else r
+             for i, r in zip(ids, results) if not isinstance(r, Exception)}
+    errors = {i: str(r) or type(r).__name__ for i, r in zip(ids, results) if isinstance(r, Exception)}
+    payload = project_and_report(merge_items(found), user_prompt, "get_order_items_batch_tool")
+    if errors:
+        payload["errors"] = errors
+    message = f"Retrieved {len(found)} of {len(ids)} items"
+    if skipped:
+        message += f"; skipped {len(skipped)} items beyond the limit of {DATA_CUTOFF_LIMIT}: {skipped}"
+    payload["message"] = message
+    return payload
+
+def merge_items(items: dict) -> dict:
+    """
+    Hoist top-level fields that are identical for every item into `common`
+    so order-level data is sent once instead of once per item.
+    """
+    dicts = [d for d in items.values() if isinstance(d, dict)]
+    if len(dicts) < 2 or len(dicts) != len(items):
+        return {"common": {}, "items": items}
+    common = {k: v for k, v in dicts[0].items() if all(k in d and d[k] == v for d in dicts[1:])}
+    return {
+        "common": common,
+        "items": {i: {k: v for k, v in d.items() if k not in common} for i, d in items.items()},
+    }
+
+def invalidate_item_details(order_id=None, order_item_id=None):
+    """Forget one cached item, every item of `order_id`, or everything when called without ids."""
+    if order_id is None:
+        item_cache.invalidate()
+    elif order_item_id is None:
+        item_cache.invalidate_where(lambda key: key[0] == int(order_id))
+    else:
+        item_cache.invalidate((int(order_id), int(order_item_id)))
+
+async def _fetch_item_details(order_id, order_item_id):
     url = base_url + 'item/details'
-    payload = json.dumps({
+    payload = {
         "is_internal": True,
         "page_number": "1",
         "order_id": order_id,
         "order_item_id": order_item_id
-    })
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {auth_token}',
     }
-
-    response = requests.request("POST", url, headers=headers, data=payload)
-    print(response.text)
+    response = await request_with_retries(_client(), "POST", url, json=payload)
+    response.raise_for_status()
     data = response.json()
-    logger.info(data)
+    logger.debug(data)
     return data
 
 def get_customer_details():
@@ -73,13 +180,16 @@ def get_item_details_tool():
 
         
 def filter_docs_to_limit(docs, limit):
-    """Filter the documents to the specified limit."""
+    """
+    Keep at most `limit` numbered entries (int keys, or digit strings once the
+    payload went through JSON); every other key is kept as is.
+    """
     new_docs = {}
     num_data = 0
     for key, value in docs.items():
-        if type(key) == int and num_data < limit:
-            new_docs[key] = value
+        if isinstance(key, int) or (isinstance(key, str) and key.isdigit()):
+            if num_data >= limit:
+                continue
             num_data += 1
-        else:
-            new_docs[key] = value
-    return new_docs
\ No newline at end of file
+        new_docs[key] = value
+    return new_docs
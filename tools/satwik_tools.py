@@ -0,0 +1,37 @@
+import traceback
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.tools import tool
+from utils.sql_engine import run_query, render_table
+from utils.sql_validator import extract_sql, is_read_only
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExecuteSqlInput(BaseModel):
+    sql: str = Field(
+        ...,
+        description="A single read-only ClickHouse SELECT query, exactly as validated. No code fences."
+    )
+
+@tool("execute_sql_tool", args_schema=ExecuteSqlInput)
+async def execute_sql_tool(sql: str):
+    """
+    Runs a read-only SQL query against the analytics database and returns the
+    first rows as a compact table.
+
+    Results are capped (rows and bytes); when the cap is hit the output says
+    so and the query should be narrowed with filters, GROUP BY or LIMIT.
+    """
+    if "```" in sql:
+        sql = extract_sql(sql) or sql
+    if not is_read_only(sql):
+        return "Refused: only a single read-only SELECT query can be executed."
+    try:
+        result = await run_query(sql)
+        logger.info(f"execute_sql_tool: {len(result.rows)} rows, {result.nbytes} bytes, "
+                    f"truncated={result.truncated}")
+        return render_table(result)
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        return f"Error executing query: {e}"
@@ -1,13 +1,21 @@
-from tools.newme_tools import  get_order_item_details_tool
+import os
+from tools.newme_tools import  get_order_item_details_tool, get_order_items_batch_tool
+from tools.satwik_tools import execute_sql_tool
+from constants import SQL_BACKEND
+
+# SATWIK only gets an execution tool when a backend is configured
+SQL_EXECUTION = os.getenv("SQL_BACKEND", SQL_BACKEND).lower() != "none"
+
 # Initialize tools
 tools_list = {
     "SUPERVISOR" : [
     ],
     "SAM" : [
         get_order_item_details_tool,
+        get_order_items_batch_tool,
         # get_item_details_tool,
         # get_customer_details
     ],
-    "SATWIK" : [],
+    "SATWIK" : [execute_sql_tool] if SQL_EXECUTION else [],
     "PREVIEW" : []
 }
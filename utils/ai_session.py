@@ -1,46 +1,102 @@
-import traceback, logging, datetime
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+import asyncio, traceback, logging, datetime
+from langchain_core.messages import HumanMessage, SystemMessage, RemoveMessage
 from constants import RECURSION_LIMIT
 from utils.datetime_utils import timezone_to_offset
 from agents.supervisor_agents import get_supervisor
+from utils import summarizer
 
 logger = logging.getLogger(__name__)
 
 
 class Session:
     """
-    Keeps per-conversation memory and streams LangGraph (SUPERVISOR) output
-    back to the caller chunk-by-chunk.
+    Streams LangGraph (SUPERVISOR) output back to the caller chunk-by-chunk.
+
+    Conversation memory lives in the supervisor's checkpointed thread; each
+    turn only sends the new HumanMessage.
     """
 
     _app = None                # compiled LangGraph (singleton)
+    _app_lock = asyncio.Lock()
 
     def __init__(self, session_id: str, user: str, exp: int,
                  timezone: str = "Asia/Calcutta", max_turns: int = 100):
         self.__max_turns = max_turns
-        self.__thread_id = f"{user}_{exp}"
+        # one LangGraph thread per conversation, not per user.  It must not
+        # depend on when/where the Session was created so that any replica
+        # (or this one after a restart) resumes the checkpointed thread.
+        self.__thread_id = session_id
+        self.exp = exp
         self.__session_id = session_id
         self.timezone = timezone
+        self.__seeded = False      # thread known to start with the session SystemMessage
+        self.__compaction: asyncio.Task | None = None
 
-        # history starts with a single SystemMessage
-        self.__state = {
-            "messages": [
-                SystemMessage(content=f"session_id={session_id}")
-            ]
-        }
+    @property
+    def session_id(self) -> str:
+        return self.__session_id
 
     # ------------------------------------------------------------------ #
     # Private helpers
     # ------------------------------------------------------------------ #
     async def _ensure_graph_loaded(self):
         if Session._app is None:
-            Session._app = await get_supervisor()
+            async with Session._app_lock:
+                if Session._app is None:
+                    Session._app = await get_supervisor()
 
-    def _trim_history(self) -> None:
-        """Trim oldest turns so total messages ≤ max_turns * 2."""
-        excess = len(self.__state["messages"]) - (self.__max_turns * 2)
-        if excess > 0:
-            self.__state["messages"] = self.__state["messages"][excess:]
+    def _config(self, sync: bool) -> dict:
+        return {
+            "configurable": {
+                "thread_id": self.__thread_id,
+                "session_id": self.__session_id,
+                "timezone_offset": timezone_to_offset(self.timezone),
+                "timezone": self.timezone,
+                "sync": sync,
+            },
+            "recursion_limit": RECURSION_LIMIT,
+        }
+
+    async def _new_messages(self, query: str, config: dict) -> list:
+        """Messages to send this turn: the query, plus the header on a fresh thread."""
+        messages = [HumanMessage(content=query)]
+        if not self.__seeded:
+            snapshot = await Session._app.aget_state(config)
+            if not snapshot.values.get("messages"):
+                messages.insert(0, SystemMessage(content=f"session_id={self.__session_id}"))
+            self.__seeded = True
+        return messages
+
+    async def _trim_history(self, messages: list, config: dict) -> list:
+        """
+        Remove oldest turns from the thread so it holds ≤ max_turns * 2
+        messages.  Returns the messages that remain.
+        """
+        excess = len(messages) - (self.__max_turns * 2)
+        if excess <= 0:
+            return messages
+        head = 1 if messages[0].type == "system" else 0     # keep session header
+        cut = head + excess
+        # cut on a turn boundary so tool calls stay paired with their results
+        while cut < len(messages) and messages[cut].type != "human":
+            cut += 1
+        await Session._app.aupdate_state(
+            config, {"messages": [RemoveMessage(id=m.id) for m in messages[head:cut]]}
+        )
+        return messages[:head] + messages[cut:]
+
+    async def _compact(self, messages: list, config: dict) -> None:
+        try:
+            await summarizer.compact(Session._app, config, messages)
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    def _schedule_compaction(self, messages: list, config: dict) -> None:
+        """Summarize old turns in the background, off the response path."""
+        if self.__compaction is not None and not self.__compaction.done():
+            return
+        if summarizer.needs_compaction(messages):
+            self.__compaction = asyncio.create_task(self._compact(messages, config))
 
     # ------------------------------------------------------------------ #
     # Public call
@@ -56,27 +112,17 @@ class Session:
         sync  : bool   (kept to match earlier signature)
         """
         await self._ensure_graph_loaded()
+        if self.__compaction is not None:
+            await self.__compaction        # never race the summary's state update
+            self.__compaction = None
 
-        # ①  append new user message to stored history
-        user_msg = HumanMessage(content=query)
-        self.__state["messages"].append(user_msg)
-
-        # ②  invoke LangGraph with full history
-        state = {"messages": list(self.__state["messages"])}   # shallow copy
-        config = {
-            "configurable": {
-                "thread_id": self.__thread_id,
-                "session_id": self.__session_id,
-                "timezone_offset": timezone_to_offset(self.timezone),
-                "timezone": self.timezone,
-                "sync": sync,
-            },
-            "recursion_limit": RECURSION_LIMIT,
-        }
-
-        assistant_chunks: list[str] = []
+        config = self._config(sync)
+        final_state = None
         prev_agent = ""
         try:
+            # ①  only the new turn; earlier history comes from the checkpoint
+            state = {"messages": await self._new_messages(query, config)}
+
             # yield "```"                         # opening fence for Slack
 
             async for event in Session._app.astream_events(
@@ -90,9 +136,15 @@ class Session:
                         if name != prev_agent:
                             # yield f"<<< agent = {name} >>>"
                             prev_agent = name
-                        assistant_chunks.append(chunk)
                         yield chunk
 
+                elif kind == "on_chain_end" and name == "FASTPATH":
+                    # routed without the supervisor LLM: the sub-agent's answer
+                    # arrives whole rather than as model tokens
+                    for message in (event["data"].get("output") or {}).get("messages", []):
+                        if message.content:
+                            yield message.content
+
                 elif kind == "on_chat_model_end" and name == "DEE":
                     content = event["data"]["output"].content
                     if content and content.startswith("/") and content != "/":
@@ -103,15 +155,13 @@ class Session:
                 elif kind == "on_tool_end":
                     logger.info(f"← {name} end {event['data'].get('output')}")
 
-            # ③  store assistant reply into history
-            assistant_text = "".join(assistant_chunks).strip()
-            if assistant_text:
-                self.__state["messages"].append(
-                    AIMessage(content=assistant_text)
-                )
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    final_state = event["data"].get("output")   # whole graph finished
 
-            # ④  keep history bounded
-            self._trim_history()
+            # ②  keep the checkpointed thread bounded
+            if isinstance(final_state, dict) and final_state.get("messages"):
+                kept = await self._trim_history(final_state["messages"], config)
+                self._schedule_compaction(kept, config)
 
             # yield "```"                        # closing fence
 
@@ -0,0 +1,104 @@
+import os, asyncio, logging, pathlib
+from langgraph.checkpoint.memory import MemorySaver
+from constants import (
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_SQLITE_PATH,
+    CHECKPOINT_POOL_MIN,
+    CHECKPOINT_POOL_MAX,
+)
+
+logger = logging.getLogger(__name__)
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# One saver per process, shared by the supervisor and every sub-graph.
+_saver = None
+_closers: list = []          # async callables releasing pools / connections
+_lock = asyncio.Lock()
+
+
+def _postgres_uri() -> str:
+    if os.getenv("CHECKPOINT_DB_URI"):
+        return os.getenv("CHECKPOINT_DB_URI")
+    return (
+        f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?sslmode=disable"
+    )
+
+
+async def _sqlite_saver():
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    path = pathlib.Path(os.getenv("CHECKPOINT_SQLITE_PATH", CHECKPOINT_SQLITE_PATH))
+    if not path.is_absolute():
+        path = ROOT / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = await aiosqlite.connect(str(path))
+    await conn.execute("PRAGMA journal_mode=WAL")     # readers don't block the writer
+    _closers.append(conn.close)
+    logger.info(f"checkpointer: sqlite at {path}")
+    return AsyncSqliteSaver(conn)
+
+
+async def _postgres_saver():
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+    pool = AsyncConnectionPool(
+        conninfo=_postgres_uri(),
+        min_size=int(os.getenv("CHECKPOINT_POOL_MIN", CHECKPOINT_POOL_MIN)),
+        max_size=int(os.getenv("CHECKPOINT_POOL_MAX", CHECKPOINT_POOL_MAX)),
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    await pool.open()
+    _closers.append(pool.close)
+    logger.info("checkpointer: postgres pool opened")
+    return AsyncPostgresSaver(pool)
+
+
+async def get_checkpointer():
+    """
+    Return the process-wide checkpointer selected by CHECKPOINT_BACKEND.
+
+    `memory` keeps state in-process (single worker, lost on restart);
+    `sqlite` persists locally; `postgres` lets any number of replicas share
+    conversation state, so a thread can be served by whichever worker
+    receives the Slack event.
+    """
+    global _saver
+    async with _lock:
+        if _saver is not None:
+            return _saver
+        backend = os.getenv("CHECKPOINT_BACKEND", CHECKPOINT_BACKEND).lower()
+        if backend == "sqlite":
+            saver = await _sqlite_saver()
+        elif backend in ("postgres", "postgresql"):
+            saver = await _postgres_saver()
+        elif backend == "memory":
+            saver = MemorySaver()
+        else:
+            raise ValueError(f"unknown CHECKPOINT_BACKEND {backend!r}")
+        if hasattr(saver, "setup"):
+            await saver.setup()                       # creates tables if needed
+        _saver = saver
+        return _saver
+
+
+async def forget_thread(thread_id: str) -> None:
+    """
+    Drop a thread whose session was evicted.  Only the in-process `memory`
+    backend is cleared – sqlite / postgres threads must survive so another
+    replica (or a restart) can resume the conversation.
+    """
+    if isinstance(_saver, MemorySaver):
+        await _saver.adelete_thread(thread_id)
+
+
+async def close_checkpointer() -> None:
+    global _saver
+    while _closers:
+        await _closers.pop()()
+    _saver = None
@@ -0,0 +1,153 @@
+# utils/code_context.py  –  enclosing definitions of changed lines, from the PR head
+from __future__ import annotations
+
+import ast, asyncio, bisect, logging, textwrap
+from collections import OrderedDict
+from constants import (
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_MAX_FILES,
+    CONTEXT_FETCH_CONCURRENCY,
+    CONTEXT_CACHE_MAX,
+)
+
+logger = logging.getLogger(__name__)
+
+_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class DefinitionIndex:
+    """
+    Line → innermost enclosing function / class of one source file, built
+    from a single AST walk.  Definitions are kept sorted by first line
+    (decorators included) so a lookup is a bisect plus a short walk back
+    through the enclosing scopes.
+    """
+
+    def __init__(self, source: str):
+        self.lines = source.splitlines()
+        defs, self._classes = [], set()
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            logger.info(f"code context: unparsable source ({e.msg} at line {e.lineno})")
+            tree = None
+        if tree is not None:
+            for node in ast.walk(tree):
+                if isinstance(node, _DEFS):
+                    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                    defs.append((start, node.end_lineno, node.name))
+                    if isinstance(node, ast.ClassDef):
+                        self._classes.add((start, node.end_lineno, node.name))
+        defs.sort()
+        self._defs = defs
+        self._starts = [d[0] for d in defs]
+
+    def enclosing(self, line: int) -> tuple[int, int, str] | None:
+        """(start, end, name) of the innermost definition containing `line`."""
+        i = bisect.bisect_right(self._starts, line) - 1
+        while i >= 0:
+            start, end, name = self._defs[i]
+            if end >= line:                   # later starts are nested deeper
+                return start, end, name
+            i -= 1
+        return None
+
+    def is_class(self, definition: tuple) -> bool:
+        return definition in self._classes
+
+    def source(self, start: int, end: int) -> str:
+        return textwrap.dedent("\n".join(self.lines[start - 1:end]))
+
+
+# (owner, repo, sha, path) -> DefinitionIndex; a SHA pins the content, so
+# entries never go stale and follow-up reviews reuse the parse
+_cache: OrderedDict[tuple, DefinitionIndex] = OrderedDict()
+
+
+def _remember(key: tuple, index: DefinitionIndex) -> DefinitionIndex:
+    _cache[key] = index
+    _cache.move_to_end(key)
+    while len(_cache) > CONTEXT_CACHE_MAX:
+        _cache.popitem(last=False)
+    return index
+
+
+async def load_indexes(owner: str, repo: str, sha: str, paths: list[str]) -> dict[str, DefinitionIndex]:
+    """Indexes for `paths` at `sha`, fetching (a few at a time) only those not cached."""
+    from utils.github_client import get_github, GitHubError
+
+    found, missing = {}, []
+    for path in paths:
+        index = _cache.get((owner, repo, sha, path))
+        if index is None:
+            missing.append(path)
+        else:
+            _cache.move_to_end((owner, repo, sha, path))
+            found[path] = index
+
+    semaphore = asyncio.Semaphore(CONTEXT_FETCH_CONCURRENCY)
+
+    async def fetch(path):
+        async with semaphore:
+            try:
+                source = await get_github().file_content(owner, repo, path, sha)
+            except GitHubError as e:
+                logger.warning(f"code context: cannot fetch {path}@{sha[:7]}: {e}")
+                return
+        # parse off the event loop; big files take a while
+        index = await asyncio.to_thread(DefinitionIndex, source)
+        found[path] = _remember((owner, repo, sha, path), index)
+
+    await asyncio.gather(*(fetch(p) for p in missing))
+    return found
+
+
+def touched_definitions(files, indexes: dict[str, DefinitionIndex],
+                        max_tokens: int = CONTEXT_TOKEN_BUDGET) -> dict[str, list[str]]:
+    """
+    {path: [source block, …]} of the definitions enclosing added lines, most
+    edited first, stopping at `max_tokens` in total.  `files` is the
+    per-file index from utils/diff_engine.py.
+    """
+    from utils.llmUtils import count_tokens
+
+    candidates = []                            # (edited lines, path, start, end, name)
+    for path, index in indexes.items():
+        hits: dict[tuple, int] = {}
+        for line in files[path].added:
+            d = index.enclosing(line)
+            if d is not None:
+                hits[d] = hits.get(d, 0) + 1
+        # a nested function is shown inside its touched parent function, not
+        # twice; classes never absorb their methods (they can be huge)
+        kept: dict[tuple, int] = {}
+        for d in sorted(hits, key=lambda d: d[0] - d[1]):       # widest first
+            outer = next((k for k in kept if k[0] <= d[0] and d[1] <= k[1]
+                          and not index.is_class(k)), None)
+            if outer is None:
+                kept[d] = hits[d]
+            else:
+                kept[outer] += hits[d]
+        candidates += [(n, path, *d) for d, n in kept.items()]
+    candidates.sort(key=lambda c: -c[0])
+
+    blocks: dict[str, list[str]] = {}
+    budget = max_tokens
+    for _, path, start, end, name in candidates:
+        block = f"# {path}:{start}-{end} {name}\n{indexes[path].source(start, end)}"
+        cost = count_tokens(block)
+        if cost > budget:
+            continue                           # a smaller one may still fit
+        budget -= cost
+        blocks.setdefault(path, []).append(block)
+    return blocks
+
+
+async def enrich(owner: str, repo: str, sha: str, files) -> dict[str, list[str]]:
+    """Enclosing definitions of the changed Python code, read at the PR head `sha`."""
+    paths = [p for p, f in files.items()
+             if p.endswith(".py") and f.status != "deleted" and f.added][:CONTEXT_MAX_FILES]
+    if not paths:
+        return {}
+    indexes = await load_indexes(owner, repo, sha, paths)
+    return touched_definitions(files, indexes)
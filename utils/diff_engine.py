@@ -0,0 +1,147 @@
+# utils/diff_engine.py  –  single-pass diff slicer / annotator / line index
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Iterable
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+
+@dataclass
+class FileIndex:
+    """Changed lines of one file: new-side numbers for '+', old-side for '-'."""
+    path: str
+    old_path: str | None = None
+    status: str = "modified"                   # added | deleted | modified | renamed
+    added: list[int] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+    hunks: list[tuple[int, int]] = field(default_factory=list)   # new-side (start, end)
+
+
+@dataclass
+class DiffResult:
+    text: str                                  # sliced + annotated diff for the prompt
+    files: dict[str, FileIndex]
+    lines_in: int = 0
+    lines_out: int = 0
+
+
+class DiffProcessor:
+    """
+    Consumes a unified diff line by line and produces, in one pass, what
+    `slice_diff` + `annotate_diff` produced (file header, hunk headers,
+    every +/- line prefixed with `path:lineno:`, and up to `context`
+    unchanged lines after each run of changes) plus a per-file index.
+
+    Unlike the two-pass version, line numbers stay correct across the
+    unchanged lines that are dropped, `--- a/…` headers are never mistaken
+    for removed lines, and added / deleted files (`/dev/null`) are handled.
+    """
+
+    def __init__(self, context: int = 3):
+        self.context = context
+        self.files: dict[str, FileIndex] = {}
+        self._out: list[str] = []
+        self._file: FileIndex | None = None
+        self._old_path: str | None = None
+        self._in_hunk = False
+        self._old_ln = self._new_ln = 0
+        self._ctx = 0
+        self.lines_in = 0
+
+    def feed(self, line: str) -> None:
+        self.lines_in += 1
+        line = line.rstrip("\r\n")
+        if self._in_hunk:
+            tag = line[:1]
+            if tag == "+":
+                self._change(line, self._new_ln, self._file.added)
+                self._new_ln += 1
+                return
+            if tag == "-":
+                self._change(line, self._old_ln, self._file.removed)
+                self._old_ln += 1
+                return
+            if tag == " " or line == "":
+                if self._ctx:
+                    self._emit(line)
+                    self._ctx -= 1
+                self._old_ln += 1
+                self._new_ln += 1
+                return
+            if tag == "\\":                    # "\ No newline at end of file"
+                return
+            self._in_hunk = False             # anything else starts a new header
+
+        if line.startswith("diff --git "):
+            self._file, self._old_path = None, None
+        elif line.startswith("--- "):
+            self._old_path = _strip_prefix(line[4:])
+        elif line.startswith("+++ "):
+            new_path = _strip_prefix(line[4:])
+            if new_path is None:               # deleted file: index under the old path
+                path, status = self._old_path, "deleted"
+            elif self._old_path is None:
+                path, status = new_path, "added"
+            else:
+                path = new_path
+                status = "renamed" if new_path != self._old_path else "modified"
+            self._file = self.files.setdefault(path, FileIndex(path, self._old_path, status))
+            self._emit(f"+++ b/{path}")
+        elif line.startswith("@@") and self._file is not None:
+            m = _HUNK_RE.match(line)
+            if m:
+                self._old_ln, self._new_ln = int(m.group(1)), int(m.group(2))
+                self._file.hunks.append((self._new_ln, self._new_ln))
+                self._in_hunk, self._ctx = True, self.context
+                self._emit(line)
+
+    def _change(self, line: str, lineno: int, bucket: list[int]) -> None:
+        self._emit(f"{self._file.path}:{lineno}:{line}")
+        bucket.append(lineno)
+        start, _ = self._file.hunks[-1]
+        self._file.hunks[-1] = (start, max(self._new_ln, start))
+        self._ctx = self.context
+
+    def _emit(self, line: str) -> None:
+        self._out.append(line)
+
+    def result(self) -> DiffResult:
+        return DiffResult("\n".join(self._out), self.files, self.lines_in, len(self._out))
+
+
+def _strip_prefix(path: str) -> str | None:
+    path = path.split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def iter_lines(text: str):
+    """Lines of `text` one at a time, without building the whole list."""
+    start, end = 0, len(text)
+    while start < end:
+        nl = text.find("\n", start)
+        if nl < 0:
+            nl = end
+        yield text[start:nl]
+        start = nl + 1
+
+
+def process_diff(lines: Iterable[str] | str, context: int = 3) -> DiffResult:
+    """Process a diff given as text or as any iterable of lines."""
+    if isinstance(lines, str):
+        lines = iter_lines(lines)
+    proc = DiffProcessor(context)
+    for line in lines:
+        proc.feed(line)
+    return proc.result()
+
+
+async def aprocess_diff(lines: AsyncIterable[str], context: int = 3) -> DiffResult:
+    """Process a diff while it downloads (e.g. `response.aiter_lines()`)."""
+    proc = DiffProcessor(context)
+    async for line in lines:
+        proc.feed(line)
+    return proc.result()
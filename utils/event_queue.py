@@ -0,0 +1,154 @@
+import asyncio, logging, time, traceback
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from constants import EVENT_WORKERS, EVENT_QUEUE_SIZE, EVENT_DEDUP_TTL, EVENT_DEDUP_MAX
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[object]]
+
+
+def event_keys(body: dict) -> list[str]:
+    """Ids that identify a Slack delivery; any match marks a duplicate."""
+    ev = body.get("event", {})
+    keys = []
+    if body.get("event_id"):
+        keys.append(f"event:{body['event_id']}")
+    if ev.get("client_msg_id"):
+        # same message delivered as both `app_mention` and `message.im`
+        keys.append(f"msg:{ev['client_msg_id']}")
+    if not keys and ev.get("channel") and ev.get("ts"):
+        keys.append(f"ts:{ev['channel']}:{ev['ts']}")
+    return keys
+
+
+class EventPipeline:
+    """
+    Ack-first processing for Slack events.
+
+    Listeners call `submit()` and return immediately, so Bolt acks the
+    envelope right away and Socket Mode is never held by an LLM call.  Jobs
+    are drained by a pool of async workers.  Every delivery is remembered by
+    `event_id` / `client_msg_id` *before* it runs, so a retried or double
+    delivered event never triggers a second supervisor run — even if the
+    first run is still in progress or failed.
+
+    Backpressure belongs to TurnScheduler; the bounded queue is only a last
+    resort, and an event refused there runs its `on_full` job (a busy reply)
+    instead of disappearing silently.
+    """
+
+    def __init__(self, workers: int = EVENT_WORKERS, maxsize: int = EVENT_QUEUE_SIZE,
+                 dedup_ttl: int = EVENT_DEDUP_TTL, dedup_max: int = EVENT_DEDUP_MAX,
+                 clock=time.monotonic):
+        self._workers = workers
+        self._maxsize = maxsize
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._rejections: set[asyncio.Task] = set()   # running on_full jobs
+        self._dedup_ttl = dedup_ttl
+        self._dedup_max = dedup_max
+        self._clock = clock
+        self._seen: OrderedDict[str, float] = OrderedDict()   # key -> first seen
+        self.metrics = {"accepted": 0, "duplicates": 0, "dropped": 0,
+                        "completed": 0, "failed": 0}
+
+    # ------------------------------------------------------------------ #
+    # Dedup
+    # ------------------------------------------------------------------ #
+    def _expire_seen(self, now: float) -> None:
+        while self._seen:
+            key, first = next(iter(self._seen.items()))
+            if now - first <= self._dedup_ttl and len(self._seen) <= self._dedup_max:
+                break
+            del self._seen[key]
+
+    def _claim(self, keys: list[str]) -> bool:
+        """Remember `keys`; False if any of them was already delivered."""
+        now = self._clock()
+        self._expire_seen(now)
+        if any(k in self._seen for k in keys):
+            return False
+        for k in keys:
+            self._seen[k] = now
+        return True
+
+    def _release(self, keys: list[str]) -> None:
+        for k in keys:
+            self._seen.pop(k, None)
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def submit(self, body: dict, job: Job, on_full: Job | None = None) -> bool:
+        """
+        Enqueue `job` for this event unless it is a redelivery.  When the
+        queue is full `on_full` runs instead (in the background).
+        """
+        if self._queue is None:
+            raise RuntimeError("EventPipeline.start() has not been called")
+        keys = event_keys(body)
+        if not self._claim(keys):
+            self.metrics["duplicates"] += 1
+            logger.info(f"duplicate slack event ignored: {keys}")
+            return False
+        try:
+            self._queue.put_nowait((keys, job))
+        except asyncio.QueueFull:
+            # forget it so Slack's retry gets a fresh chance
+            self._release(keys)
+            self.metrics["dropped"] += 1
+            logger.warning(f"event queue full, dropped {keys}")
+            if on_full is not None:
+                task = asyncio.create_task(self._run(keys, on_full))
+                self._rejections.add(task)
+                task.add_done_callback(self._rejections.discard)
+            return False
+        self.metrics["accepted"] += 1
+        return True
+
+    async def _run(self, keys: list[str], job: Job) -> None:
+        try:
+            await job()
+        except Exception:
+            logger.error(f"busy reply failed for {keys}\n{traceback.format_exc()}")
+
+    async def _worker(self, wid: int) -> None:
+        while True:
+            keys, job = await self._queue.get()
+            try:
+                await job()
+                self.metrics["completed"] += 1
+            except Exception:
+                self.metrics["failed"] += 1
+                logger.error(f"worker {wid} failed on {keys}\n{traceback.format_exc()}")
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        """Spawn the worker pool on the running loop (idempotent)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(self._maxsize)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self._workers)]
+
+    async def stop(self, drain: bool = True) -> None:
+        if drain and self._queue is not None:
+            await self._queue.join()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def workers(self) -> int:
+        """Size of the worker pool (concurrent jobs)."""
+        return self._workers
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._tasks),
+            "remembered": len(self._seen),
+        }
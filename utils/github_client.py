@@ -0,0 +1,204 @@
+# utils/github_client.py  –  shared GitHub REST client (keep-alive, ETags, rate limits)
+import asyncio, logging, os, time
+from collections import OrderedDict
+import httpx
+from utils.http_client import get_client, backoff_delay
+from constants import (
+    GITHUB_API_URL,
+    GITHUB_ETAG_CACHE_MAX,
+    GITHUB_RATE_RESERVE,
+    GITHUB_MAX_RATE_WAIT,
+    HTTP_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (optional, enables HTTP/2)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+JSON = "application/vnd.github+json"
+DIFF = "application/vnd.github.v3.diff"
+RAW  = "application/vnd.github.raw"
+
+
+class GitHubError(Exception):
+    """A GitHub call that failed; `status` is None for network errors."""
+
+    def __init__(self, status: int | None, message: str):
+        super().__init__(f"GitHub {status or 'request'} error: {message}")
+        self.status = status
+
+
+class GitHubClient:
+    """
+    One pooled (HTTP/2 when `h2` is installed) client for the process.
+
+    Every GET is conditional: responses carrying an ETag are remembered and
+    a later 304 is answered from memory, which GitHub does not count
+    against the rate limit.  Rate-limit headers are tracked; when the
+    remaining budget drops below GITHUB_RATE_RESERVE (a fraction of the
+    limit) requests are spread over the time left until reset, and a limit that was hit is waited out
+    if it resets within GITHUB_MAX_RATE_WAIT seconds.
+    GITHUB_API_URL points the client at a fake server (tools/mock_github_api.py).
+    """
+
+    def __init__(self, base_url: str | None = None, token: str | None = None):
+        self.base_url = (base_url or os.getenv("GITHUB_API_URL", GITHUB_API_URL)).rstrip("/")
+        self._token = token if token is not None else os.getenv("GITHUB_PAT")
+        self._etags: OrderedDict[tuple, tuple] = OrderedDict()   # (url, accept) -> (etag, headers, body)
+        self.rate = {"limit": None, "remaining": None, "reset": None}
+        self.metrics = {"requests": 0, "not_modified": 0, "throttled": 0, "rate_limited": 0}
+        self._next_at = 0.0             # earliest start for the next paced request
+
+    def _client(self) -> httpx.AsyncClient:
+        return get_client("github", http2=_HTTP2, headers={
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "newme-ai-agent",
+        })
+
+    # ---- rate limit ---- #
+    def _track(self, resp: httpx.Response) -> None:
+        h = resp.headers
+        if "X-RateLimit-Remaining" in h:
+            self.rate = {
+                "limit": int(h.get("X-RateLimit-Limit", 0)),
+                "remaining": int(h["X-RateLimit-Remaining"]),
+                "reset": int(h.get("X-RateLimit-Reset", 0)),
+            }
+
+    async def _pace(self) -> None:
+        """
+        While the budget is low each request takes the next free slot, one
+        `window / remaining` apart, so concurrent callers queue up instead
+        of all sleeping the same delay and then bursting together.
+        """
+        limit, remaining, reset = self.rate["limit"], self.rate["remaining"], self.rate["reset"]
+        if remaining is None or not limit or not reset or remaining >= limit * GITHUB_RATE_RESERVE:
+            return
+        if remaining == 0:
+            return          # spent: a 304 is still free, a 403 is waited out / failed in get()
+        now = time.time()
+        window = max(reset - now, 0)
+        interval = min(window / max(remaining, 1), GITHUB_MAX_RATE_WAIT)
+        start = max(now, self._next_at)
+        self._next_at = start + interval   # claimed before sleeping – no await in between
+        delay = start - now
+        if delay > 0.05:
+            self.metrics["throttled"] += 1
+            logger.info(f"GitHub budget low ({remaining}/{limit} left, reset in {window:.0f}s), "
+                        f"pacing {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _limit_wait(self, resp: httpx.Response) -> float | None:
+        """Seconds until a hit rate limit clears (None if this is not a rate limit)."""
+        if resp.status_code not in (403, 429):
+            return None
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            return max(int(resp.headers.get("X-RateLimit-Reset", 0)) - time.time(), 1.0)
+        return None
+
+    # ---- requests ---- #
+    async def get(self, path: str, accept: str = JSON, etag: str | None = None) -> httpx.Response:
+        """
+        GET `path` (relative to the API root).  With an explicit `etag` a 304
+        is returned to the caller as is; otherwise the client's own ETag
+        cache turns a 304 into the remembered 200.  Raises GitHubError for
+        any other non-2xx answer.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        key = (url, accept)
+        cached = self._etags.get(key) if etag is None else None
+        headers = {"Accept": accept}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        if etag or cached:
+            headers["If-None-Match"] = etag or cached[0]
+
+        for attempt in range(HTTP_RETRIES + 1):
+            await self._pace()
+            try:
+                self.metrics["requests"] += 1
+                resp = await self._client().get(url, headers=headers)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                if attempt == HTTP_RETRIES:
+                    raise GitHubError(None, f"{url}: {e!r}") from e
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            self._track(resp)
+
+            wait = self._limit_wait(resp)
+            if wait is not None:
+                self.metrics["rate_limited"] += 1
+                if wait > GITHUB_MAX_RATE_WAIT or attempt == HTTP_RETRIES:
+                    raise GitHubError(resp.status_code, f"rate limited for another {wait:.0f}s")
+                logger.warning(f"GitHub rate limit hit, waiting {wait:.0f}s")
+                await asyncio.sleep(wait)
+                continue
+            if resp.status_code >= 500 and attempt < HTTP_RETRIES:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            break
+
+        if resp.status_code == 304:
+            self.metrics["not_modified"] += 1
+            if cached is None:
+                return resp
+            self._etags.move_to_end(key)
+            return httpx.Response(200, headers=cached[1], content=cached[2], request=resp.request)
+        if resp.status_code >= 400:
+            raise GitHubError(resp.status_code, f"{url}: {resp.text[:300]}")
+        if "ETag" in resp.headers:
+            self._etags[key] = (resp.headers["ETag"], resp.headers, resp.content)
+            self._etags.move_to_end(key)
+            while len(self._etags) > GITHUB_ETAG_CACHE_MAX:
+                self._etags.popitem(last=False)
+        return resp
+
+    async def stream_lines(self, path: str, accept: str = DIFF):
+        """
+        Yield the body of a GET line by line as it arrives (no ETag cache),
+        so large diffs are processed without holding the whole text.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        headers = {"Accept": accept}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        await self._pace()
+        self.metrics["requests"] += 1
+        try:
+            async with self._client().stream("GET", url, headers=headers) as resp:
+                self._track(resp)
+                if resp.status_code >= 400:
+                    body = (await resp.aread()).decode(errors="ignore")
+                    raise GitHubError(resp.status_code, f"{url}: {body[:300]}")
+                async for line in resp.aiter_lines():
+                    yield line
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            raise GitHubError(None, f"{url}: {e!r}") from e
+
+    # ---- endpoints ---- #
+    async def pull(self, owner: str, repo: str, num: int, etag: str | None = None) -> httpx.Response:
+        return await self.get(f"repos/{owner}/{repo}/pulls/{num}", JSON, etag=etag)
+
+    async def file_content(self, owner: str, repo: str, path: str, ref: str) -> str:
+        return (await self.get(f"repos/{owner}/{repo}/contents/{path}?ref={ref}", RAW)).text
+
+    def stats(self) -> dict:
+        return {**self.metrics, **{f"rate_{k}": v for k, v in self.rate.items()},
+                "etag_entries": len(self._etags)}
+
+
+_github: GitHubClient | None = None
+
+def get_github() -> GitHubClient:
+    """Process-wide client (the pooled connection lives in utils/http_client.py)."""
+    global _github
+    if _github is None:
+        _github = GitHubClient()
+    return _github
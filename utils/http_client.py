@@ -0,0 +1,70 @@
+# utils/http_client.py  –  shared keep-alive httpx clients with retries
+import asyncio, logging, random
+import httpx
+from constants import (
+    HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_RETRIES,
+    HTTP_BACKOFF,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_client(name: str, **kwargs) -> httpx.AsyncClient:
+    """
+    One pooled client per upstream, created on first use and reused for the
+    life of the process so connections stay warm.  `kwargs` (headers,
+    base_url, http2 …) only apply on creation.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        kwargs.setdefault("timeout", httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT))
+        kwargs.setdefault("limits", httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                                 max_keepalive_connections=HTTP_MAX_KEEPALIVE))
+        client = _clients[name] = httpx.AsyncClient(**kwargs)
+    return client
+
+
+async def close_clients():
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+def backoff_delay(attempt: int, base: float = HTTP_BACKOFF) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, base * 2 ** attempt)
+
+
+async def request_with_retries(client: httpx.AsyncClient, method: str, url: str, *,
+                               retries: int = HTTP_RETRIES, **kwargs) -> httpx.Response:
+    """
+    `client.request` retried on connection errors, timeouts and retryable
+    status codes (honouring Retry-After).  The last response is returned
+    as-is; raising on status is left to the caller.
+    """
+    for attempt in range(retries + 1):
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"{method} {url} failed ({e!r}), retry {attempt + 1} in {delay:.2f}s")
+        else:
+            if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                return resp
+            delay = backoff_delay(attempt)
+            retry_after = resp.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            logger.warning(f"{method} {url} → {resp.status_code}, retry {attempt + 1} in {delay:.2f}s")
+            await resp.aclose()
+        await asyncio.sleep(delay)
@@ -71,61 +71,72 @@ async def _embed_query(text: str) -> List[float]:
     return await loop.run_in_executor(None, EMBEDDER.embed_query, text)
 
 # --------------------------------------------------------------------- #
-# 4)  Build FAISS index  (only runs if pickle absent)
+# 4)  Reusable batched embedding + index helpers
 # --------------------------------------------------------------------- #
-async def _build_index():
-    print("🔄  Building FAISS index (batched / parallel)…")
-    snippets, vectors = [], []
-    batch, tasks = [], []
-    sem = asyncio.Semaphore(PARALLEL)
+async def embed_batched(snippets: List[str], batch_size: int = BATCH_SIZE,
+                        parallel: int = PARALLEL) -> np.ndarray:
+    """
+    Embed `snippets` in batches with at most `parallel` requests in flight.
+    Row i of the result always belongs to snippets[i], whatever order the
+    batches complete in.
+    """
+    sem = asyncio.Semaphore(parallel)
+    batches = [snippets[i:i + batch_size] for i in range(0, len(snippets), batch_size)]
+    results: List[List[List[float]]] = [[] for _ in batches]
 
-    async def schedule(batch_snips: List[str], bid: int):
+    async def schedule(bid: int):
         async with sem:
-            vecs = await _embed_documents_snippets(batch_snips)
-            vectors.extend(vecs)
-            if bid % 20 == 0:
-                print(f"   ✓ finished batch {bid}")
+            results[bid] = await _embed_documents_snippets(batches[bid])
+            if (bid + 1) % 20 == 0:
+                print(f"   ✓ finished batch {bid + 1}")
+
+    await asyncio.gather(*(schedule(b) for b in range(len(batches))))
+    return np.asarray([v for batch in results for v in batch], dtype="float32")
+
+def build_flat_index(vectors: np.ndarray):
+    """Inner-product FAISS index (embeddings are unit-norm → cosine)."""
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    return index
 
-    batch_id = 0
+async def embed_query_vector(text: str) -> np.ndarray:
+    return np.asarray([await _embed_query(text)], dtype="float32")
+
+# --------------------------------------------------------------------- #
+# 5)  Build / load the code-snippet index  (built only if pickle absent)
+# --------------------------------------------------------------------- #
+async def _build_index():
+    print("🔄  Building FAISS index (batched / parallel)…")
+    snippets = []
     for snip_id, snippet in enumerate(iter_py_snippets(ROOT), 1):
         # truncate super-long snippets to fit token limit
         if len(TOKENIZER.encode(snippet)) > 8000:
             snippet = TOKENIZER.decode(TOKENIZER.encode(snippet)[:8000])
         snippets.append(snippet)
-        batch.append(snippet)
-
-        if len(batch) == BATCH_SIZE:
-            batch_id += 1
-            tasks.append(asyncio.create_task(schedule(batch.copy(), batch_id)))
-            batch.clear()
-
         if snip_id % 500 == 0:
             print(f"   · queued {snip_id} snippets")
 
-    if batch:
-        batch_id += 1
-        tasks.append(asyncio.create_task(schedule(batch.copy(), batch_id)))
-
-    await asyncio.gather(*tasks)
+    vec_np = await embed_batched(snippets)
     print(f"✅  Embedded {len(snippets)} snippets total")
-
-    vec_np = np.asarray(vectors, dtype="float32")
-    index  = faiss.IndexFlatIP(vec_np.shape[1])
-    index.add(vec_np)
+    index = build_flat_index(vec_np)
 
     with INDEX_PATH.open("wb") as f:
         pickle.dump((index, snippets), f)
     print(f"🔐  Saved index → {INDEX_PATH}")
 
-# --------------------------------------------------------------------- #
-# 5)  Load or build at import time
-# --------------------------------------------------------------------- #
-if INDEX_PATH.exists():
-    print(f"🔹  Loading FAISS index from {INDEX_PATH}")
-    faiss_index, meta = pickle.load(INDEX_PATH.open("rb"))
-else:
-    asyncio.run(_build_index())
-    faiss_index, meta = pickle.load(INDEX_PATH.open("rb"))
+faiss_index, meta = None, None
+
+async def _load_index():
+    """Load the pickled code index, building it first if needed (lazy)."""
+    global faiss_index, meta
+    if faiss_index is None:
+        if INDEX_PATH.exists():
+            print(f"🔹  Loading FAISS index from {INDEX_PATH}")
+        else:
+            await _build_index()
+        with INDEX_PATH.open("rb") as f:
+            faiss_index, meta = pickle.load(f)
+    return faiss_index, meta
 
 # --------------------------------------------------------------------- #
 # 6)  Public search API
@@ -135,17 +146,7 @@ async def vector_search(text: str, k: int = 3):
     Async-friendly search that works whether we’re using the asynchronous
     or synchronous LangChain embedding class.
     """
-    loop = asyncio.get_running_loop()
-
-    if ASYNC:
-        emb = await _embed_query(text)                    # true async path
-    else:                                                 # sync fallback
-        emb = await loop.run_in_executor(
-            None,                                         # default ThreadPool
-            EMBEDDER.embed_query,                         # blocking fn
-            text,
-        )
-
-    vec = np.asarray([emb], dtype="float32")
-    _, idx = faiss_index.search(vec, k)
-    return [meta[i] for i in idx[0] if i >= 0]
\ No newline at end of file
+    index, snippets = await _load_index()
+    vec = await embed_query_vector(text)
+    _, idx = index.search(vec, k)
+    return [snippets[i] for i in idx[0] if i >= 0]
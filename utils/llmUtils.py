@@ -1,10 +1,13 @@
-import os
+import os, json, hashlib
+from collections import OrderedDict
+import tiktoken
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_openai_tools_agent, create_tool_calling_agent
 import logging
 import traceback
 from langchain_core.messages import HumanMessage
+from constants import PROMPT_TOKEN_BUDGET
 
 class LLM():
         LLM_OPEN_AI = "openai"
@@ -13,10 +16,11 @@ class LLM():
 logger = logging.getLogger(__name__)
 llmType = "openai"
 
-def getLLM(type : str, name: str = None):
+def getLLM(type : str, name: str = None, model: str = "gpt-4o"):
     match type:
         case LLM.LLM_OPEN_AI:
-            return ChatOpenAI(name=name, model= "gpt-4o")
+            # stream_usage so usage_metadata (incl. cached tokens) survives streaming
+            return ChatOpenAI(name=name, model=model, stream_usage=True)
         case LLM.LLM_GOOGLE:
             return ChatGoogleGenerativeAI(
             name = name,
@@ -54,21 +58,104 @@ def approximate_token_count(text):
     words = text.split()
     return len(words) + sum(len(word) for word in words) // 4
 
-def filter_messages(messages: list, max_tokens: int = 59000) -> list:
+# gpt-4o tokenizer.  utils/index.py loads cl100k for the embedding model;
+# chat models from gpt-4o on use o200k, so count against that.
+try:
+    TOKENIZER = tiktoken.encoding_for_model("gpt-4o")
+except KeyError:
+    TOKENIZER = tiktoken.get_encoding("o200k_base")
+
+TOKENS_PER_MESSAGE = 3     # role / separator overhead per chat message
+
+MESSAGE_TOKENS_CACHE_MAX = 16384
+_message_tokens: OrderedDict[tuple, int] = OrderedDict()   # (id | digest, len) -> tokens
+
+def count_tokens(text: str) -> int:
+    """Exact token count (not memoized – one-off texts and diff lines)."""
+    return len(TOKENIZER.encode(text, disallowed_special=()))
+
+def message_text(message) -> str:
+    """Plain text of a message given as str, ("role", text) tuple or BaseMessage."""
+    if isinstance(message, str):
+        return message
+    if isinstance(message, tuple):
+        content = message[1]
+    else:
+        content = getattr(message, "content", "")
+    if isinstance(content, list):
+        content = "".join(
+            part if isinstance(part, str) else part.get("text", "") for part in content
+        )
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        content += json.dumps([{"name": c["name"], "args": c["args"]} for c in tool_calls])
+    return content
+
+def message_tokens(message) -> int:
+    """
+    Tokens of one chat message, memoized so history is encoded once per
+    process.  The memo is keyed on the message id (or a digest of the text)
+    rather than the text itself, so large payloads are not kept alive.
+    """
+    text = message_text(message)
+    key = (getattr(message, "id", None) or hashlib.sha1(text.encode()).digest(), len(text))
+    n = _message_tokens.get(key)
+    if n is None:
+        n = _message_tokens[key] = count_tokens(text) + TOKENS_PER_MESSAGE
+        if len(_message_tokens) > MESSAGE_TOKENS_CACHE_MAX:
+            _message_tokens.popitem(last=False)
+    else:
+        _message_tokens.move_to_end(key)
+    return n
+
+# ── prompt-cache instrumentation ───────────────────────────────────────
+PROMPT_USAGE: dict[str, dict] = {}   # agent -> running totals
+prompt_usage_hooks: list = []        # callables (agent, usage_dict) for metrics sinks
+
+def record_prompt_usage(agent: str, result) -> dict | None:
+    """
+    Report cached vs uncached prompt tokens of one model call.  OpenAI
+    returns the cache hit size in usage_metadata.input_token_details.
+    """
+    usage = getattr(result, "usage_metadata", None)
+    if not usage:
+        return None
+    prompt = usage.get("input_tokens", 0)
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    call = {"prompt_tokens": prompt, "cached_tokens": cached, "uncached_tokens": prompt - cached}
+
+    totals = PROMPT_USAGE.setdefault(agent, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+    totals["calls"] += 1
+    totals["prompt_tokens"] += prompt
+    totals["cached_tokens"] += cached
+    logger.info(f"{agent} prompt tokens={prompt} cached={cached} "
+                f"(running hit {totals['cached_tokens'] / max(totals['prompt_tokens'], 1):.0%})")
+    for hook in prompt_usage_hooks:
+        try:
+            hook(agent, call)
+        except Exception:
+            logger.error(traceback.format_exc())
+    return call
+
+def is_empty_response(result) -> bool:
+    """True when the model returned neither tool calls nor any text."""
+    if result.tool_calls:
+        return False
+    content = result.content
+    return not content or (isinstance(content, list) and not content[0].get("text"))
+
+def filter_messages(messages: list, max_tokens: int = PROMPT_TOKEN_BUDGET) -> list:
     filtered_messages = []
     total_tokens = 0
 
-    # Loop backward through the messages to get the last ones first
+    # Loop backward through the messages to get the last ones first.
+    # Counts are cached per text, so only messages new this turn get encoded.
     for message in reversed(messages):
-        if type(message) == str:
-            message_tokens = approximate_token_count(message)
-        else:
-            message_tokens = approximate_token_count(message.content)
-        if total_tokens + message_tokens > max_tokens:
+        n_tokens = message_tokens(message)
+        if total_tokens + n_tokens > max_tokens:
             break
         filtered_messages.append(message)
-        total_tokens += message_tokens
+        total_tokens += n_tokens
 
     # Return the filtered messages in their original order
     return list(reversed(filtered_messages))
-
@@ -0,0 +1,82 @@
+# utils/lookup_cache.py  –  short-TTL cache with single-flight upstream calls
+import asyncio, logging, time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class LookupCache:
+    """
+    Per-key result cache for upstream lookups.
+
+    `get_or_fetch(key, fetch)` returns a fresh cached value, or joins the
+    call already in flight for `key`, or starts one.  Concurrent identical
+    lookups therefore hit the upstream once.  Failures are shared with the
+    callers waiting on that flight but never cached.  A caller that is
+    cancelled does not cancel the flight for the others.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, clock=time.monotonic):
+        self._ttl = ttl
+        self._max = max_entries
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()      # key -> (value, stored_at)
+        self._inflight: dict = {}                       # key -> asyncio.Task
+        self.metrics = {"hits": 0, "coalesced": 0, "misses": 0, "errors": 0,
+                        "expired": 0, "evicted": 0, "invalidated": 0}
+
+    async def get_or_fetch(self, key, fetch):
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._clock() - entry[1] <= self._ttl:
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return entry[0]
+            del self._entries[key]
+            self.metrics["expired"] += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.metrics["coalesced"] += 1
+        else:
+            self.metrics["misses"] += 1
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(key, fetch))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+        except BaseException:
+            self.metrics["errors"] += 1
+            raise
+        else:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+                self.metrics["evicted"] += 1
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key=None) -> None:
+        """Drop one key, or everything when `key` is None (in-flight calls finish)."""
+        if key is None:
+            self.metrics["invalidated"] += len(self._entries)
+            self._entries.clear()
+        elif self._entries.pop(key, None) is not None:
+            self.metrics["invalidated"] += 1
+
+    def invalidate_where(self, predicate) -> None:
+        """Drop every cached key for which `predicate(key)` is true."""
+        for key in [k for k in self._entries if predicate(k)]:
+            del self._entries[key]
+            self.metrics["invalidated"] += 1
+
+    def stats(self) -> dict:
+        m = self.metrics
+        lookups = m["hits"] + m["coalesced"] + m["misses"]
+        saved = m["hits"] + m["coalesced"]             # upstream calls avoided
+        return {**m, "size": len(self._entries), "inflight": len(self._inflight),
+                "saved_upstream_calls": saved,
+                "hit_ratio": round(saved / lookups, 3) if lookups else 0.0}
@@ -0,0 +1,124 @@
+# utils/payload_projection.py  –  shrink tool payloads to what the question needs
+import json, logging, re
+from constants import DATA_CUTOFF_LIMIT
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE  = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_STOP     = {"a", "an", "and", "are", "by", "can", "do", "does", "for", "from", "get",
+             "give", "has", "have", "how", "i", "in", "is", "it", "item", "items", "me",
+             "my", "of", "on", "or", "order", "orders", "please", "show", "tell", "the",
+             "this", "to", "was", "what", "when", "which", "with"}
+# question words → field-name words they usually refer to
+_SYNONYMS = {
+    "where":    {"tracking", "track", "shipping", "shipment", "courier", "delivered",
+                 "dispatched", "location", "edd", "awb"},
+    "track":    {"tracking", "shipping", "courier", "awb", "status", "history"},
+    "tracking": {"track", "shipping", "courier", "awb", "history"},
+    "deliver":  {"delivered", "delivery", "edd", "shipping"},
+    "delivery": {"delivered", "edd", "shipping", "courier"},
+    "money":    {"refund", "amount", "price", "payment", "wallet"},
+    "paid":     {"payment", "price", "amount", "wallet", "coupon"},
+    "pay":      {"payment", "price", "amount"},
+    "cost":     {"price", "amount", "mrp", "asp"},
+    "price":    {"mrp", "asp", "amount"},
+    "return":   {"returned", "rvp", "pickup", "refund"},
+    "cancel":   {"cancelled", "cancellation"},
+    "status":   {"state"},
+}
+# identifiers and status are needed to talk about any item
+_ALWAYS = {"id", "status", "state"}
+
+# running totals, like llmUtils.PROMPT_USAGE
+PROJECTION_STATS = {"calls": 0, "raw_bytes": 0, "bytes": 0, "raw_tokens": 0, "tokens": 0}
+
+
+def _words(text: str) -> set[str]:
+    out = set()
+    for w in _WORD_RE.findall(_CAMEL_RE.sub("_", text).lower()):
+        if w in _STOP:
+            continue
+        out.add(w)
+        if len(w) > 3 and w.endswith("s"):
+            out.add(w[:-1])
+        if len(w) > 4 and w.endswith("ed"):          # cancelled → cancell, returned → return
+            out.add(w[:-2])
+    return out
+
+
+def prompt_words(user_prompt: str) -> set[str]:
+    words = _words(user_prompt)
+    for w in list(words):
+        words |= _SYNONYMS.get(w, set())
+    return words
+
+
+def _relevant(key, words: set[str]) -> bool:
+    kw = _words(str(key))
+    return bool(kw & words) or bool(kw & _ALWAYS)
+
+
+def truncate(value, limit: int = DATA_CUTOFF_LIMIT):
+    """Cut every list to `limit` entries (recursively), noting how many were dropped."""
+    if isinstance(value, dict):
+        return {k: truncate(v, limit) for k, v in value.items()}
+    if isinstance(value, list):
+        kept = [truncate(v, limit) for v in value[:limit]]
+        if len(value) > limit:
+            kept.append(f"… {len(value) - limit} more entries omitted")
+        return kept
+    return value
+
+
+def _project(value, words, limit):
+    """(projected value, whether anything in it matched the question)."""
+    if isinstance(value, dict):
+        out, matched = {}, False
+        for k, v in value.items():
+            if _relevant(k, words):
+                out[k] = truncate(v, limit)
+                matched = matched or bool(_words(str(k)) & words)
+            elif isinstance(v, (dict, list)):
+                sub, sub_matched = _project(v, words, limit)
+                if sub_matched:
+                    out[k], matched = sub, True
+        return out, matched
+    if isinstance(value, list):
+        projected = [_project(v, words, limit) for v in value[:limit]]
+        out = [v for v, _ in projected]
+        if len(value) > limit:
+            out.append(f"… {len(value) - limit} more entries omitted")
+        return out, any(m for _, m in projected)
+    return value, False
+
+
+def project(data, user_prompt: str, limit: int = DATA_CUTOFF_LIMIT):
+    """
+    Keep only fields whose names relate to `user_prompt` (plus ids and
+    statuses), with every list cut to `limit` entries.  When nothing in
+    the payload matches the question the whole payload is kept, truncated.
+    """
+    projected, matched = _project(data, prompt_words(user_prompt or ""), limit)
+    return projected if matched else truncate(data, limit)
+
+
+def _size(value) -> tuple[int, int]:
+    from utils.llmUtils import count_tokens
+    text = json.dumps(value, default=str, ensure_ascii=False)
+    return len(text.encode()), count_tokens(text)
+
+
+def project_and_report(data, user_prompt: str, tool: str, limit: int = DATA_CUTOFF_LIMIT):
+    """`project()` plus bytes / tokens saved, logged and added to PROJECTION_STATS."""
+    projected = project(data, user_prompt, limit)
+    raw_bytes, raw_tokens = _size(data)
+    nbytes, tokens = _size(projected)
+    PROJECTION_STATS["calls"] += 1
+    PROJECTION_STATS["raw_bytes"] += raw_bytes
+    PROJECTION_STATS["bytes"] += nbytes
+    PROJECTION_STATS["raw_tokens"] += raw_tokens
+    PROJECTION_STATS["tokens"] += tokens
+    logger.info(f"{tool} payload projected: {raw_bytes}→{nbytes} bytes, "
+                f"{raw_tokens}→{tokens} tokens ({raw_tokens - tokens} saved)")
+    return projected
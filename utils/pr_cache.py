@@ -0,0 +1,60 @@
+# utils/pr_cache.py  –  on-disk cache of PR diffs and reviews by head SHA
+import json, logging, os, pathlib, time
+from constants import PREVIEW_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / os.getenv("PREVIEW_CACHE_DIR", PREVIEW_CACHE_DIR)
+
+
+class PRCache:
+    """
+    One JSON file per pull request (`<owner>/<repo>/<num>.json`) holding the
+    last reviewed head SHA, the ETag of the PR resource, the last full
+    review and the incremental reviews made on top of it (`updates`, each
+    `{"since", "head", "review"}`).  Survives restarts and is shared by
+    every replica that mounts the same directory.
+    """
+
+    def __init__(self, root: pathlib.Path = CACHE_DIR):
+        self._root = root
+
+    def _path(self, owner: str, repo: str, num: int) -> pathlib.Path:
+        return self._root / owner / repo / f"{num}.json"
+
+    def load(self, owner: str, repo: str, num: int) -> dict | None:
+        path = self._path(owner, repo, num)
+        try:
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"ignoring unreadable PR cache entry {path}: {e}")
+            return None
+
+    def save(self, owner: str, repo: str, num: int, *, head_sha: str, etag: str | None,
+             review: str, updates: list[dict] = ()) -> None:
+        path = self._path(owner, repo, num)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "head_sha": head_sha, "etag": etag, "review": review,
+            "updates": list(updates), "reviewed_at": int(time.time()),
+        }))
+        os.replace(tmp, path)                   # readers never see a partial file
+
+    def invalidate(self, owner: str, repo: str, num: int) -> None:
+        self._path(owner, repo, num).unlink(missing_ok=True)
+
+
+def full_review(entry: dict) -> str:
+    """The full review followed by every incremental review since."""
+    parts = [entry["review"]] + [
+        f"Changes since the last review ({u['since'][:7]} → {u['head'][:7]}):\n\n{u['review']}"
+        for u in entry.get("updates", [])
+    ]
+    return "\n\n---\n\n".join(parts)
+
+
+pr_cache = PRCache()
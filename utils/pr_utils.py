@@ -1,24 +1,56 @@
-import httpx, re, pathlib
+import re, pathlib
+from utils.github_client import get_github, GitHubError
+from utils.diff_engine import DiffResult, aprocess_diff
 
 # ── PR diff fetcher ────────────────────────────────────────────────────
 _PR_RE = re.compile(r"https://github\.com/([^/]+)/([^/]+)/pull/(\d+)(?:/.*)?$")
 
 ROOT = pathlib.Path(__file__).resolve().parents[1] 
 
-async def fetch_pr_diff(url: str, token: str | None = None) -> str | None:
+def parse_pr_url(url: str) -> tuple[str, str, int] | None:
     m = _PR_RE.match(url.strip())
-    if not m:
+    return (m.group(1), m.group(2), int(m.group(3))) if m else None
+
+async def fetch_pr_diff_index(url: str, context: int = 3) -> DiffResult | None:
+    """Stream a PR's diff straight through the diff engine (None if `url` is not a PR link)."""
+    pr = parse_pr_url(url)
+    if not pr:
         return None
-    owner, repo, num = m.groups()
-    hdrs = {"Accept": "application/vnd.github.v3.diff"}
-    if token:
-        hdrs["Authorization"] = f"Bearer {token}"          # PAT
-    api = f"https://api.github.com/repos/{owner}/{repo}/pulls/{num}"
-    async with httpx.AsyncClient() as client:
-        r = await client.get(api, headers=hdrs)
-        return r.text if r.status_code == 200 else None
+    owner, repo, num = pr
+    return await aprocess_diff(
+        get_github().stream_lines(f"repos/{owner}/{repo}/pulls/{num}"), context
+    )
+
+async def fetch_pr_head(owner: str, repo: str, num: int,
+                        etag: str | None = None) -> tuple[str | None, str | None]:
+    """
+    `(head_sha, etag)` of a PR via a conditional request; `(None, etag)` when
+    GitHub answers 304 Not Modified (which does not count against the rate
+    limit).
+    """
+    r = await get_github().pull(owner, repo, num, etag=etag)
+    if r.status_code == 304:
+        return None, etag
+    return r.json()["head"]["sha"], r.headers.get("ETag")
+
+async def fetch_compare_diff(owner: str, repo: str, base: str, head: str,
+                             context: int = 3) -> DiffResult | None:
+    """
+    Processed diff between two commits (None if GitHub can't compare them,
+    e.g. after a force-push).
+    """
+    try:
+        return await aprocess_diff(
+            get_github().stream_lines(f"repos/{owner}/{repo}/compare/{base}...{head}"), context
+        )
+    except GitHubError as e:
+        if e.status in (404, 422):
+            return None
+        raise
 
 # ── diff slicer ────────────────────────────────────────────────────────
+# slice_diff / annotate_diff are the original two-pass helpers, kept for
+# tools/bench_diff.py; PREVIEW uses utils/diff_engine.py
 _HUNK   = re.compile(r"^@@")        # hunk header
 _FILE   = re.compile(r"^\+\+\+ b/") # '+++ b/...'
 
@@ -81,29 +113,71 @@ def annotate_diff(diff: str) -> str:
             new_ln += 1
     return "\n".join(out)
 
-# utils/pr_utils.py
-import ast, textwrap
-def functions_touched(diff: str, root=ROOT) -> str:
+# ── diff chunker ───────────────────────────────────────────────────────
+def _split_sections(diff: str) -> list[tuple[str, list[list[str]]]]:
+    """[(file header, [hunk lines, …]), …] of a sliced / annotated diff."""
+    sections, header, hunks = [], None, []
+    for ln in diff.splitlines():
+        if ln.startswith("+++ "):
+            if header is not None or hunks:
+                sections.append((header or "", hunks))
+            header, hunks = ln, []
+        elif ln.startswith("@@") or not hunks:
+            hunks.append([ln])
+        else:
+            hunks[-1].append(ln)
+    if header is not None or hunks:
+        sections.append((header or "", hunks))
+    return sections
+
+
+def chunk_diff(diff: str, max_tokens: int) -> list[str]:
     """
-    Return full source of every function/class whose lines were edited.
+    Split a diff into pieces of at most ~`max_tokens` tokens for separate
+    review calls.  Whole files are packed together while they fit; a larger
+    file is split between hunks (its header repeated on every piece); a
+    single oversized hunk is split by lines.  Sizes are summed per line, so
+    the whole diff is tokenized once.
     """
-    # 1) map filename -> set(edited_line_numbers)
-    edits = {}
-    for ln in diff.splitlines():
-        if ln.startswith(("+++ ", "--- ")):
-            cur = ln[6:] if ln.startswith("+++ b/") else cur
-        elif ln.startswith(("+", "-")) and ":" in ln:          # annotated form
-            file, lnno, _ = ln.split(":", 2)
-            edits.setdefault(file, set()).add(int(lnno))
-
-    blocks = []
-    for file, touched in edits.items():
-        src = pathlib.Path(root / file).read_text()
-        tree = ast.parse(src)
-        for node in [n for n in ast.walk(tree)
-                     if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]:
-            if any(node.lineno <= ln <= node.end_lineno for ln in touched):
-                snippet = "\n".join(src.splitlines()[node.lineno-1: node.end_lineno])
-                blocks.append(f"# {file}:{node.lineno}\n{textwrap.dedent(snippet)}")
-    return "\n\n".join(blocks[:20])   # safety cap
+    from utils.llmUtils import count_tokens
+
+    def size(lines):
+        return sum(count_tokens(ln) + 1 for ln in lines)
+
+    pieces: list[tuple[list[str], int]] = []   # self-contained (lines, tokens)
+    for header, hunks in _split_sections(diff):
+        head = [header] if header else []
+        head_size = size(head)
+        budget = max_tokens - head_size
+        current, used = [], 0
+        for hunk in hunks:
+            hunk_size = size(hunk)
+            if current and used + hunk_size > budget:
+                pieces.append((head + current, head_size + used))
+                current, used = [], 0
+            if hunk_size <= budget:
+                current.extend(hunk)
+                used += hunk_size
+                continue
+            for i, ln in enumerate(hunk):      # oversized hunk
+                ln_size = size([ln])
+                if current and used + ln_size > budget:
+                    pieces.append((head + current, head_size + used))
+                    current, used = [], 0
+                    if i and hunk[0].startswith("@@"):
+                        current, used = [hunk[0]], size(hunk[:1])
+                current.append(ln)
+                used += ln_size
+        if current or head:
+            pieces.append((head + current, head_size + used))
 
+    chunks, current, used = [], [], 0
+    for lines, n in pieces:                    # pack small files together
+        if current and used + n > max_tokens:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current += lines
+        used += n
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,35 @@
+import logging
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig
+from utils.datetime_utils import get_current_time_with_offset
+from utils.llmUtils import filter_messages, message_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def context_message(config: RunnableConfig) -> SystemMessage:
+    """Volatile per-call context (current time, timezone)."""
+    conf = config.get("configurable", {})
+    return SystemMessage(
+        content=f"Today is {get_current_time_with_offset(config):%d-%m-%Y %H:%M:%S}. "
+                f"TZ={conf.get('timezone', 'Asia/Kolkata')} "
+                f"offset={conf.get('timezone_offset', 330)}m."
+    )
+
+
+def build_messages(history, config: RunnableConfig, *extra, agent: str = "") -> list:
+    """
+    Assemble the message list for one model call without touching graph state.
+
+    Layout is  [static system prompt (from the agent's template)] + history +
+    [volatile context] + extra.  Keeping the time stamp *after* the history
+    means the prefix stays byte-identical between calls and is never written
+    back into the checkpointed thread.
+    """
+    messages = filter_messages(list(history))
+    messages.append(context_message(config))
+    messages.extend(extra)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{agent} prompt: {len(messages)} messages, "
+                     f"{sum(message_tokens(m) for m in messages)} tokens (excl. system prompt)")
+    return messages
@@ -0,0 +1,84 @@
+# utils/router.py  –  rule-based routing that skips the supervisor LLM
+import logging, re
+from utils.pr_utils import _PR_RE
+from constants import FAST_ROUTER_MIN_SCORE
+
+logger = logging.getLogger(__name__)
+
+_URL_RE   = re.compile(r"<?(https://github\.com/[^\s<>|]+)(?:\|[^>]*)?>?")   # Slack wraps links in <…>
+_ORDER_RE = re.compile(
+    r"\border(?:\s*id)?\s*(?:no\.?|number|#|:)?\s*(\d{3,})\D{0,30}?"
+    r"\bitem(?:\s*id)?\s*(?:no\.?|number|#|:)?\s*(\d{2,})",
+    re.I,
+)
+_WORD_RE  = re.compile(r"[a-z%]+")
+
+# words that only make sense for a query over many orders ("how many" / "query"
+# also occur in support questions, so they need a second signal)
+_ANALYTICS = {
+    "how many": 1, "count": 2, "number of": 2, "percentage": 2, "%": 1, "ratio": 2,
+    "rate": 1, "sql": 3, "query": 1, "clickhouse": 3, "total": 1, "average": 2,
+    "avg": 2, "sum": 1, "trend": 2, "daily": 1, "weekly": 1, "monthly": 1,
+    "per day": 2, "per week": 2, "per month": 2, "group by": 3, "breakdown": 2,
+    "top": 1, "last week": 1, "last month": 1, "yesterday": 1, "today": 1,
+    "orders": 1, "cancellations": 1, "returns": 1, "refunds": 1,
+}
+# words that point at one customer's order (SAM) instead
+_OPERATIONAL = {"i", "me", "mine", "my", "where", "track", "tracking", "status of order",
+                "my order", "refund for"}
+# words that lean on earlier turns ("same for returns", "split those by city")
+_BACK_REFS = {"those", "these", "them", "that", "same", "it", "above", "previous", "again"}
+_PR_FILLER = {"review", "please", "pls", "pr", "this", "check", "can", "you", "the", "a", "look", "at"}
+
+ROUTER_STATS = {"fastpath": {"PREVIEW": 0, "SAM": 0, "SATWIK": 0}, "llm": 0, "llm_hops_saved": 0}
+
+
+def _has(text: str, phrase: str) -> bool:
+    return re.search(rf"(?<!\w){re.escape(phrase)}(?!\w)", text) is not None
+
+
+def analytics_score(text: str) -> int:
+    """Cheap keyword classifier: > 0 leans SATWIK, < 0 leans SAM."""
+    low = text.lower()
+    score = sum(w for phrase, w in _ANALYTICS.items() if _has(low, phrase))
+    score -= sum(2 for phrase in _OPERATIONAL if _has(low, phrase))
+    return score
+
+
+def route(text: str, first_turn: bool = True) -> tuple[str, str] | None:
+    """
+    `(agent, query)` when the message can go straight to a sub-agent,
+    None when the supervisor LLM has to decide.
+      • a GitHub PR URL with at most a few filler words → PREVIEW (URL only)
+      • "order <id> … item <id>"                        → SAM
+      • clearly analytic wording, no order ids          → SATWIK
+        (later in a thread only without back-references, since SATWIK
+        gets the text alone and the supervisor would resolve them)
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+
+    m = _URL_RE.search(text)
+    if m and _PR_RE.match(m.group(1)):
+        rest = _WORD_RE.findall((text[:m.start()] + text[m.end():]).lower())
+        if all(w in _PR_FILLER for w in rest):
+            return "PREVIEW", m.group(1)
+        return None                                   # PR plus a real question
+
+    if _ORDER_RE.search(text):
+        return "SAM", text
+
+    if first_turn or not _BACK_REFS.intersection(_WORD_RE.findall(text.lower())):
+        if not re.search(r"\d{5,}", text) and analytics_score(text) >= FAST_ROUTER_MIN_SCORE:
+            return "SATWIK", text
+    return None
+
+
+def record(agent: str | None) -> None:
+    """Count a routing decision; a fast path saves the supervisor's route + answer calls."""
+    if agent is None:
+        ROUTER_STATS["llm"] += 1
+    else:
+        ROUTER_STATS["fastpath"][agent] += 1
+        ROUTER_STATS["llm_hops_saved"] += 2
@@ -0,0 +1,120 @@
+import asyncio, logging, time
+from contextlib import asynccontextmanager
+from constants import MAX_INFLIGHT_RUNS, MAX_QUEUED_TURNS
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerBusy(Exception):
+    """Raised when the wait queue is full and a new turn is shed."""
+
+
+class _Lane:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class TurnScheduler:
+    """
+    Sits in front of `Session.run_query`.
+
+    • turns of the same conversation run strictly one after another
+    • at most `max_inflight` graph runs execute at once across the process
+    • at most `max_queued` turns may wait; beyond that `SchedulerBusy` is raised
+      so bursts are shed instead of piling up unbounded
+
+    Usage::
+
+        async with scheduler.turn(session_id):
+            async for chunk in session.run_query(text): ...
+    """
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT_RUNS,
+                 max_queued: int = MAX_QUEUED_TURNS, clock=time.monotonic):
+        self._sem = asyncio.Semaphore(max_inflight)
+        self._max_inflight = max_inflight
+        self._max_queued = max_queued
+        self._clock = clock
+        self._lanes: dict[str, _Lane] = {}
+        self._queued = 0
+        self._inflight = 0
+        self.metrics = {
+            "started": 0, "completed": 0, "rejected": 0,
+            "wait_total": 0.0, "wait_max": 0.0, "wait_last": 0.0,
+        }
+
+    @asynccontextmanager
+    async def turn(self, key: str):
+        """Wait for this conversation's lane and a global slot; yields the wait time."""
+        if self._queued >= self._max_queued:
+            self.metrics["rejected"] += 1
+            raise SchedulerBusy(f"{self._queued} turns already waiting")
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane()
+        lane.users += 1
+        self._queued += 1
+        queued, start = True, self._clock()
+        try:
+            async with lane.lock:
+                async with self._sem:
+                    self._queued -= 1
+                    queued = False
+                    waited = self._clock() - start
+                    self._record_wait(waited)
+                    self._inflight += 1
+                    try:
+                        yield waited
+                    finally:
+                        self._inflight -= 1
+                        self.metrics["completed"] += 1
+        finally:
+            if queued:                       # cancelled while still waiting
+                self._queued -= 1
+            lane.users -= 1
+            if lane.users == 0:
+                self._lanes.pop(key, None)
+
+    def _record_wait(self, waited: float) -> None:
+        m = self.metrics
+        m["started"] += 1
+        m["wait_total"] += waited
+        m["wait_last"] = waited
+        m["wait_max"] = max(m["wait_max"], waited)
+        if waited > 1:
+            logger.info(f"turn waited {waited:.2f}s (queue={self._queued}, in_flight={self._inflight})")
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        return self._inflight
+
+    @property
+    def max_inflight(self) -> int:
+        return self._max_inflight
+
+    @property
+    def max_queued(self) -> int:
+        return self._max_queued
+
+    def stats(self) -> dict:
+        m = self.metrics
+        return {
+            "queue_depth": self._queued,
+            "in_flight": self._inflight,
+            "max_inflight": self._max_inflight,
+            "conversations": len(self._lanes),
+            "started": m["started"],
+            "completed": m["completed"],
+            "rejected": m["rejected"],
+            "wait_avg": round(m["wait_total"] / m["started"], 3) if m["started"] else 0.0,
+            "wait_max": round(m["wait_max"], 3),
+            "wait_last": round(m["wait_last"], 3),
+        }
@@ -0,0 +1,141 @@
+# utils/schema_index.py  –  column-level schema retrieval for SATWIK
+from __future__ import annotations
+
+import asyncio, hashlib, logging, pathlib, pickle, re
+from constants import SCHEMA_TOP_K
+
+logger = logging.getLogger(__name__)
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+SCHEMA_INDEX_PATH = ROOT / "data" / "schema_faiss.pkl"
+
+_COL_RE  = re.compile(r"^\s*`(\w+)`\s+(.+?)(?:\s+DEFAULT\s+.*?)?,?\s*$")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOP    = {"a", "an", "and", "by", "for", "from", "how", "in", "is", "many", "of",
+            "on", "or", "the", "to", "use", "what", "when", "which", "with"}
+
+
+def parse_ddl(ddl: str) -> dict[str, str]:
+    """`CREATE TABLE` body → {column: type} in declaration order."""
+    cols = {}
+    for line in ddl.splitlines():
+        m = _COL_RE.match(line)
+        if m:
+            cols[m.group(1)] = m.group(2).strip()
+    return cols
+
+
+def _words(text: str) -> set[str]:
+    out = set()
+    for w in _WORD_RE.findall(text.lower()):
+        if w in _STOP:
+            continue
+        out.add(w)
+        if len(w) > 4 and w.endswith("s"):          # cancellations → cancellation
+            out.add(w[:-1])
+    return out
+
+
+class SchemaRegistry:
+    """
+    Columns of every registered table, with types and business-rule hints,
+    indexed for retrieval.
+
+    `schema_for(question)` returns only the top-k relevant columns (plus each
+    table's core columns), so prompt size no longer grows with the number of
+    columns or tables.  Ranking uses embeddings through the FAISS helpers in
+    utils/index.py, boosted by word overlap; when embeddings are unavailable
+    it falls back to word overlap alone.
+    """
+
+    def __init__(self, cache_path: pathlib.Path = SCHEMA_INDEX_PATH):
+        self._entries: list[tuple[str, str, str, str]] = []   # (table, column, type, hint)
+        self._core: set[tuple[str, str]] = set()
+        self._cache_path = cache_path
+        self._index = None
+        self._lock = asyncio.Lock()
+
+    # ------------------------------------------------------------------ #
+    # Registration
+    # ------------------------------------------------------------------ #
+    def register(self, table: str, ddl: str, hints: dict[str, str] | None = None,
+                 core: tuple[str, ...] = ()) -> None:
+        hints = hints or {}
+        for col, typ in parse_ddl(ddl).items():
+            self._entries.append((table, col, typ, hints.get(col, "")))
+        self._core.update((table, c) for c in core)
+        self._index = None                     # re-embed on next lookup
+
+    def tables(self) -> list[str]:
+        return list(dict.fromkeys(t for t, *_ in self._entries))
+
+    def columns(self, table: str | None = None) -> set[str]:
+        return {c for t, c, *_ in self._entries if table is None or t == table}
+
+    # ------------------------------------------------------------------ #
+    # Index
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _doc(entry) -> str:
+        table, col, typ, hint = entry
+        return f"{table}.{col} ({typ}){': ' + hint if hint else ''}"
+
+    async def _ensure_index(self):
+        async with self._lock:
+            if self._index is not None:
+                return self._index
+            from utils.index import embed_batched, build_flat_index
+
+            docs = [self._doc(e) for e in self._entries]
+            key = hashlib.sha256("\n".join(docs).encode()).hexdigest()
+            vectors = None
+            if self._cache_path.exists():
+                with self._cache_path.open("rb") as f:
+                    cached_key, cached_vectors = pickle.load(f)
+                if cached_key == key:
+                    vectors = cached_vectors
+            if vectors is None:
+                logger.info(f"embedding {len(docs)} schema columns")
+                vectors = await embed_batched(docs)
+                self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with self._cache_path.open("wb") as f:
+                    pickle.dump((key, vectors), f)
+            self._index = build_flat_index(vectors)
+            return self._index
+
+    # ------------------------------------------------------------------ #
+    # Retrieval
+    # ------------------------------------------------------------------ #
+    async def retrieve(self, question: str, k: int = SCHEMA_TOP_K) -> list[tuple]:
+        """Core columns + the `k` best matches, in declaration order."""
+        q_words = _words(question)
+        scores = [
+            0.1 * len(q_words & _words(f"{col} {hint}"))
+            for _, col, _, hint in self._entries
+        ]
+        try:
+            from utils.index import embed_query_vector
+            index = await self._ensure_index()
+            sims, ids = index.search(await embed_query_vector(question),
+                                     min(k * 2, len(self._entries)))
+            for sim, i in zip(sims[0], ids[0]):
+                if i >= 0:
+                    scores[i] += float(sim)
+        except Exception as e:                 # no embeddings → lexical only
+            logger.warning(f"schema retrieval falling back to keywords: {e}")
+
+        ranked = sorted(range(len(self._entries)), key=lambda i: scores[i], reverse=True)
+        picked = {i for i in ranked[:k] if scores[i] > 0}
+        picked |= {i for i, (t, c, *_) in enumerate(self._entries) if (t, c) in self._core}
+        return [self._entries[i] for i in sorted(picked)]
+
+    @staticmethod
+    def render(entries) -> str:
+        """`table → col Type, col Type …` per table."""
+        by_table: dict[str, list[str]] = {}
+        for table, col, typ, _ in entries:
+            by_table.setdefault(table, []).append(f"{col} {typ}")
+        return "\n".join(f"{t} → {', '.join(cols)}" for t, cols in by_table.items())
+
+    async def schema_for(self, question: str, k: int = SCHEMA_TOP_K) -> str:
+        return self.render(await self.retrieve(question, k))
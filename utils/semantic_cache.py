@@ -0,0 +1,163 @@
+import logging, re, time
+from collections import OrderedDict
+from constants import SATWIK_CACHE_TTL, SATWIK_CACHE_MAX, SATWIK_CACHE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+_PUNCT_RE    = re.compile(r"[^\w\s'-]")
+_SPACE_RE    = re.compile(r"\s+")
+_LITERAL_RE  = re.compile(r"\d+(?:[./-]\d+)*|'[^']*'|\"[^\"]*\"")
+# relative dates make an answer valid only for the day it was generated on
+_RELATIVE_RE = re.compile(
+    r"\b(today|yesterday|tomorrow|tonight|now|current|this|last|past|previous|"
+    r"recent|ytd|mtd|wtd|ago|since)\b"
+)
+# what a question is grouped / filtered by: "by city" and "by state" embed
+# almost identically but are different queries
+_GROUPING_RE = re.compile(r"\b(?:by|per|each|every|across)\s+([a-z_]+)|\b([a-z_]+)[ -]wise\b")
+_DIMENSIONS  = {
+    "city", "state", "pincode", "pin", "zip", "country", "region", "zone",
+    "category", "brand", "product", "sku", "size", "colour", "color",
+    "seller", "vendor", "warehouse", "courier", "carrier", "provider",
+    "payment", "cod", "prepaid", "channel", "source", "platform", "coupon",
+    "customer", "hour", "day", "week", "month", "quarter", "year", "weekday",
+}
+_PERIODS     = {"hourly": "hour", "daily": "day", "weekly": "week", "monthly": "month",
+                "quarterly": "quarter", "yearly": "year", "annual": "year"}
+_WORD_RE     = re.compile(r"[a-z]+")
+
+
+def normalize(question: str) -> str:
+    q = _PUNCT_RE.sub(" ", question.lower())
+    return _SPACE_RE.sub(" ", q).strip()
+
+
+def date_context(question: str, today: str) -> str:
+    """`today` if the answer depends on the current date, else ''."""
+    return today if _RELATIVE_RE.search(question.lower()) else ""
+
+
+def _singular(word: str) -> str:
+    word = _PERIODS.get(word, word)
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _gate(question: str) -> frozenset:
+    """Terms two questions must share before a semantic hit is trusted."""
+    q = question.lower()
+    # "top 5" and "top 10" embed almost identically; never let them collide
+    terms = set(_LITERAL_RE.findall(q))
+    for m in _GROUPING_RE.finditer(q):
+        terms.add("by:" + _singular(m.group(1) or m.group(2)))
+    words = _WORD_RE.findall(q)
+    terms.update("by:" + _PERIODS[w] for w in words if w in _PERIODS)    # "daily" = "per day"
+    terms.update(w for w in map(_singular, words) if w in _DIMENSIONS)
+    # "this week" and "last week" share a date context but not an answer
+    terms.update("when:" + w for w in _RELATIVE_RE.findall(q))
+    return frozenset(terms)
+
+
+async def openai_embed(text: str):
+    """Query embedding from utils/index.py (OpenAI vectors are unit-norm)."""
+    from utils.index import embed_query_vector
+    return (await embed_query_vector(text))[0]
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on a normalized question plus its date context.
+
+    Lookup is exact first, then by embedding similarity among entries with
+    the same date context and the same gate terms: literals (numbers, quoted
+    values), what the question groups by, and the dimensions it names.
+    Entries expire after `ttl` seconds and the least recently used are
+    evicted past `max_entries`.  `embed` is an async text → unit vector
+    function; without one the cache is exact-match only.
+    """
+
+    def __init__(self, embed=None, *, ttl: int = SATWIK_CACHE_TTL,
+                 max_entries: int = SATWIK_CACHE_MAX,
+                 threshold: float = SATWIK_CACHE_SIMILARITY, clock=time.time):
+        self._embed = embed
+        self._ttl = ttl
+        self._max = max_entries
+        self._threshold = threshold
+        self._clock = clock
+        # (context, normalized) -> [answer, stored_at, vector, gate terms]
+        self._entries: OrderedDict[tuple, list] = OrderedDict()
+        self.metrics = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                        "stores": 0, "evicted": 0, "expired": 0}
+
+    def _expired(self, entry, now) -> bool:
+        return now - entry[1] > self._ttl
+
+    async def _vector(self, text: str):
+        if self._embed is None:
+            return None
+        try:
+            return await self._embed(text)
+        except Exception as e:
+            logger.warning(f"semantic cache embedding failed: {e}")
+            return None
+
+    async def lookup(self, question: str, today: str):
+        """
+        Returns ``(answer | None, probe)``; pass `probe` to `store()` on a
+        miss so the question is not normalized / embedded twice.
+        """
+        now = self._clock()
+        key = (date_context(question, today), normalize(question))
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry, now):
+            del self._entries[key]
+            self.metrics["expired"] += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.metrics["exact_hits"] += 1
+            return entry[0], None
+
+        gate = _gate(question)
+        vector = await self._vector(key[1])
+        if vector is not None:
+            best, best_key = self._threshold, None
+            for k, entry in self._entries.items():
+                _, _, vec, terms = entry
+                if k[0] != key[0] or terms != gate or vec is None or self._expired(entry, now):
+                    continue
+                sim = float(vec @ vector)
+                if sim >= best:
+                    best, best_key = sim, k
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.metrics["semantic_hits"] += 1
+                logger.info(f"semantic cache hit ({best:.3f}): {question!r} ~ {best_key[1]!r}")
+                return self._entries[best_key][0], None
+
+        self.metrics["misses"] += 1
+        return None, (key, vector, gate)
+
+    def store(self, probe, answer: str) -> None:
+        if probe is None:
+            return
+        key, vector, gate = probe
+        self._entries[key] = [answer, self._clock(), vector, gate]
+        self._entries.move_to_end(key)
+        self.metrics["stores"] += 1
+        while len(self._entries) > self._max:
+            self._entries.popitem(last=False)
+            self.metrics["evicted"] += 1
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        m = self.metrics
+        lookups = m["exact_hits"] + m["semantic_hits"] + m["misses"]
+        hits = m["exact_hits"] + m["semantic_hits"]
+        return {**m, "size": len(self._entries),
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0}
@@ -0,0 +1,138 @@
+import asyncio, logging, time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from constants import SESSION_TTL_SECONDS, MAX_SESSIONS, SESSION_SWEEP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Registry of live sessions keyed by ``user::conversation``.
+
+    Entries expire after `ttl` seconds without use and the least recently
+    used ones are evicted once `max_sessions` is reached, so memory stays
+    flat no matter how many Slack threads we have seen.  A background task
+    sweeps expired entries that are never looked up again.  `on_evict` is
+    awaited in the background with the key of every expired or evicted
+    session (e.g. to drop its in-memory checkpointer thread).
+    """
+
+    def __init__(self, factory: Callable[[str, str, int], object], *,
+                 ttl: int = SESSION_TTL_SECONDS,
+                 max_sessions: int = MAX_SESSIONS,
+                 sweep_interval: float = SESSION_SWEEP_INTERVAL,
+                 on_evict: Callable[[str], Awaitable] | None = None,
+                 clock=time.time):
+        self._factory = factory            # (key, user_id, exp) -> Session
+        self._ttl = ttl
+        self._max = max_sessions
+        self._sweep_interval = sweep_interval
+        self._clock = clock
+        self._on_evict = on_evict
+        self._cleanups: set[asyncio.Task] = set()
+        self._entries: OrderedDict[str, list] = OrderedDict()  # key -> [session, last_seen]
+        self._sweeper: asyncio.Task | None = None
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    @staticmethod
+    def key(user_id: str, conv_id: str) -> str:
+        return f"{user_id}::{conv_id}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------ #
+    # Lookup
+    # ------------------------------------------------------------------ #
+    def get(self, user_id: str, conv_id: str):
+        """Return the live session for this conversation, creating it if needed."""
+        key = self.key(user_id, conv_id)
+        now = self._clock()
+        entry = self._entries.get(key)
+
+        if entry is not None and now - entry[1] > self._ttl:
+            del self._entries[key]
+            self.metrics["expired"] += 1
+            self._released(key)
+            entry = None
+
+        if entry is not None:
+            self.metrics["hits"] += 1
+            entry[1] = now
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        self.metrics["misses"] += 1
+        session = self._factory(key, user_id, int(now) + self._ttl)
+        self._entries[key] = [session, now]
+        while len(self._entries) > self._max:
+            evicted, _ = self._entries.popitem(last=False)     # least recently used
+            self.metrics["evicted"] += 1
+            self._released(evicted)
+        return session
+
+    def drop(self, user_id: str, conv_id: str) -> None:
+        self._entries.pop(self.key(user_id, conv_id), None)
+
+    # ------------------------------------------------------------------ #
+    # Expiry
+    # ------------------------------------------------------------------ #
+    def sweep(self) -> int:
+        """Remove every expired entry; returns how many were dropped."""
+        cutoff = self._clock() - self._ttl
+        # entries are kept in last-used order, so expired ones sit at the front
+        removed = 0
+        while self._entries:
+            key, (_, last_seen) = next(iter(self._entries.items()))
+            if last_seen >= cutoff:
+                break
+            del self._entries[key]
+            self._released(key)
+            removed += 1
+        self.metrics["expired"] += removed
+        return removed
+
+    def _released(self, key: str) -> None:
+        """Run `on_evict(key)` in the background (skipped outside an event loop)."""
+        if self._on_evict is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._on_evict(key))
+        except RuntimeError:
+            return
+        self._cleanups.add(task)                  # keep a reference until it finishes
+        task.add_done_callback(self._cleanup_done)
+
+    def _cleanup_done(self, task: asyncio.Task) -> None:
+        self._cleanups.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"session cleanup failed: {task.exception()!r}")
+
+    def stats(self) -> dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "size": len(self._entries),
+            "hit_ratio": round(self.metrics["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            removed = self.sweep()
+            logger.info(f"session sweep: removed={removed} {self.stats()}")
+
+    def start_sweeper(self) -> None:
+        """Start the background sweep task on the running loop (idempotent)."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop_sweeper(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
@@ -0,0 +1,121 @@
+import time, logging
+from constants import (
+    STREAM_PLACEHOLDER,
+    STREAM_FLUSH_INTERVAL,
+    STREAM_FLUSH_CHARS,
+    SLACK_MAX_MESSAGE_CHARS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SlackStreamer:
+    """
+    Posts a placeholder message and progressively edits it as chunks arrive.
+
+    Edits are coalesced on a time / size budget so a fast token stream turns
+    into roughly one `chat.update` per `flush_interval` seconds, which keeps
+    us under Slack's per-channel rate limits.  When the text outgrows a
+    single message the current one is frozen and a new one is started.
+
+    `client` only needs async `chat_postMessage` / `chat_update`, so a fake
+    client can be passed in tests.
+    """
+
+    def __init__(self, client, channel: str, thread_ts: str | None = None, *,
+                 placeholder: str = STREAM_PLACEHOLDER,
+                 flush_interval: float = STREAM_FLUSH_INTERVAL,
+                 flush_chars: int = STREAM_FLUSH_CHARS,
+                 max_chars: int = SLACK_MAX_MESSAGE_CHARS,
+                 clock=time.monotonic):
+        self._client = client
+        self._channel = channel
+        self._thread_ts = thread_ts
+        self._placeholder = placeholder
+        self._flush_interval = flush_interval
+        self._flush_chars = flush_chars
+        self._max_chars = max_chars
+        self._clock = clock
+
+        self._ts: str | None = None    # message currently being edited
+        self._parts: list[str] = []    # text of that message
+        self._size = 0
+        self._pending = 0              # chars received since the last edit
+        self._last_flush = 0.0
+        self._shown = ""               # what Slack currently displays
+        self._chunks: list[str] = []   # full reply across all messages
+        self.messages: list[str] = []  # ts of every message we posted
+
+    # ------------------------------------------------------------------ #
+    # Private helpers
+    # ------------------------------------------------------------------ #
+    async def _post(self, text: str) -> None:
+        resp = await self._client.chat_postMessage(
+            channel=self._channel, thread_ts=self._thread_ts, text=text
+        )
+        self._ts = resp["ts"]
+        self._shown = text
+        self.messages.append(self._ts)
+
+    async def _update(self, text: str) -> None:
+        if text == self._shown:
+            return
+        try:
+            await self._client.chat_update(
+                channel=self._channel, ts=self._ts, text=text
+            )
+            self._shown = text
+        except Exception as e:          # rate-limited etc. – next flush retries
+            logger.warning(f"chat.update failed for {self._ts}: {e}")
+
+    async def _flush(self) -> None:
+        self._pending = 0
+        self._last_flush = self._clock()
+        await self._update("".join(self._parts) or self._placeholder)
+
+    async def _roll_over(self) -> None:
+        """Freeze the current message and move the overflow to a new one."""
+        text = "".join(self._parts)
+        while len(text) > self._max_chars:
+            cut = text.rfind("\n", 0, self._max_chars)
+            if cut <= 0:
+                cut = self._max_chars
+            head, text = text[:cut], text[cut:].lstrip("\n")
+            await self._update(head)
+            await self._post(text[: self._max_chars] or self._placeholder)
+        self._parts, self._size = [text], len(text)
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    async def start(self) -> None:
+        """Post the placeholder message that will be edited in place."""
+        await self._post(self._placeholder)
+        self._last_flush = self._clock()
+
+    async def push(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self._chunks.append(chunk)
+        self._parts.append(chunk)
+        self._size += len(chunk)
+        self._pending += len(chunk)
+
+        if self._size > self._max_chars:
+            await self._roll_over()
+            self._pending = 0
+            self._last_flush = self._clock()
+            return
+        if (self._pending >= self._flush_chars
+                or self._clock() - self._last_flush >= self._flush_interval):
+            await self._flush()
+
+    async def finish(self, fallback: str = "_(no answer)_") -> str:
+        """Write the final text (or `fallback`) and return the full reply."""
+        reply = "".join(self._chunks).strip()
+        current = "".join(self._parts).strip()
+        if not current:
+            current = "…" if reply else fallback
+        self._parts, self._size = [current], len(current)
+        await self._flush()
+        return reply or fallback
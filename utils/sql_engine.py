@@ -0,0 +1,232 @@
+# utils/sql_engine.py  –  pluggable, capped SQL execution for SATWIK
+import os, re, abc, asyncio, logging, sqlite3
+import httpx
+from utils.http_client import get_client
+from constants import (
+    DATA_CUTOFF_LIMIT,
+    SQL_BACKEND,
+    SQL_RESULT_MAX_BYTES,
+    SQL_FETCH_BATCH,
+    SQL_TIMEOUT,
+    SQL_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryResult:
+    __slots__ = ("columns", "rows", "truncated", "nbytes")
+
+    def __init__(self, columns, rows, truncated, nbytes):
+        self.columns = columns
+        self.rows = rows
+        self.truncated = truncated      # stopped at the row / byte cap
+        self.nbytes = nbytes
+
+
+def _row_size(row) -> int:
+    return sum(len(str(v)) for v in row) + len(row)
+
+
+class _Collector:
+    """Accumulates rows until the row or byte cap is hit."""
+
+    def __init__(self, max_rows: int, max_bytes: int):
+        self.max_rows, self.max_bytes = max_rows, max_bytes
+        self.rows, self.nbytes, self.truncated = [], 0, False
+
+    def add(self, row) -> bool:
+        """False once a cap is reached – the caller must stop fetching."""
+        size = _row_size(row)
+        if len(self.rows) >= self.max_rows or self.nbytes + size > self.max_bytes:
+            self.truncated = True
+            return False
+        self.rows.append(tuple(row))
+        self.nbytes += size
+        return True
+
+
+# ── DB-API backends (SQLite / DuckDB stand-ins) ─────────────────────────
+class _DBAPIBackend(abc.ABC):
+    """
+    Pooled DB-API connections; rows are pulled with `fetchmany` in a worker
+    thread and the cursor is dropped as soon as a cap is reached, so large
+    results are never materialized.
+    """
+
+    def __init__(self, pool_size: int = SQL_POOL_SIZE):
+        self._pool_size = pool_size
+        self._pool: asyncio.Queue | None = None
+
+    @abc.abstractmethod
+    def _connect(self):
+        """A new read-only DB-API connection (runs in a worker thread)."""
+
+    async def _acquire(self):
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+            for _ in range(self._pool_size):
+                self._pool.put_nowait(await asyncio.to_thread(self._connect))
+        return await self._pool.get()
+
+    def _run(self, conn, sql: str, collector: _Collector):
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            columns = [d[0] for d in cur.description or []]
+            while True:
+                batch = cur.fetchmany(SQL_FETCH_BATCH)
+                if not batch or not all(collector.add(r) for r in batch):
+                    break
+            return columns
+        finally:
+            cur.close()
+
+    async def execute(self, sql: str, max_rows: int, max_bytes: int) -> QueryResult:
+        conn = await self._acquire()
+        try:
+            collector = _Collector(max_rows, max_bytes)
+            task = asyncio.ensure_future(asyncio.to_thread(self._run, conn, sql, collector))
+            try:
+                columns = await asyncio.wait_for(asyncio.shield(task), SQL_TIMEOUT)
+            except asyncio.TimeoutError:
+                conn.interrupt()              # stop the statement before reusing the connection
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            return QueryResult(columns, collector.rows, collector.truncated, collector.nbytes)
+        finally:
+            self._pool.put_nowait(conn)
+
+
+class SQLiteBackend(_DBAPIBackend):
+    """Local stand-in for tests; opened read-only."""
+
+    def __init__(self, path: str, pool_size: int = SQL_POOL_SIZE):
+        super().__init__(pool_size)
+        self._path = path
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self._path}?mode=ro", uri=True, check_same_thread=False)
+
+
+class DuckDBBackend(_DBAPIBackend):
+    def __init__(self, path: str, pool_size: int = SQL_POOL_SIZE):
+        super().__init__(pool_size)
+        self._path = path
+
+    def _connect(self):
+        import duckdb           # optional dependency
+        return duckdb.connect(self._path, read_only=True)
+
+
+# ── ClickHouse over HTTP ───────────────────────────────────────────────
+_TSV_ESCAPES = {"b": "\b", "f": "\f", "r": "\r", "n": "\n", "t": "\t", "0": "\0"}
+_TSV_ESCAPE_RE = re.compile(r"\\(.)", re.S)
+# the output format is ours; a FORMAT clause in the model's SQL would clash with it
+_FORMAT_CLAUSE = re.compile(r"\s+FORMAT\s+[A-Za-z]\w*(?=\s*(?:SETTINGS\b|;|$))", re.I)
+
+
+def _tsv_unescape(field: str) -> str | None:
+    """One pass over the escape sequences; `\\N` is NULL."""
+    if field == "\\N":
+        return None
+    if "\\" not in field:
+        return field
+    return _TSV_ESCAPE_RE.sub(lambda m: _TSV_ESCAPES.get(m.group(1), m.group(1)), field)
+
+
+class ClickHouseHTTPBackend:
+    """
+    Streams `TSVWithNames` over a shared keep-alive client.  The server is
+    asked to stop at the row cap as well (`max_result_rows` with
+    `result_overflow_mode=break`) and the query runs read-only.
+    """
+
+    def __init__(self, url: str, user: str = "default", password: str = "",
+                 database: str = "default", pool_size: int = SQL_POOL_SIZE):
+        self._url = url
+        self._auth = (user, password)
+        self._database = database
+        self._pool_size = pool_size
+
+    def _client(self) -> httpx.AsyncClient:
+        # shared via utils.http_client, so close_http_clients() shuts it down
+        return get_client(
+            "clickhouse",
+            timeout=httpx.Timeout(SQL_TIMEOUT, connect=5),
+            limits=httpx.Limits(max_connections=self._pool_size,
+                                max_keepalive_connections=self._pool_size),
+        )
+
+    async def execute(self, sql: str, max_rows: int, max_bytes: int) -> QueryResult:
+        params = {
+            "database": self._database,
+            "readonly": 2,                    # read-only, but per-query settings allowed
+            "max_result_rows": max_rows + 1,
+            "result_overflow_mode": "break",
+            "max_execution_time": SQL_TIMEOUT,
+        }
+        query = f"{_FORMAT_CLAUSE.sub('', sql.rstrip().rstrip(';'))}\nFORMAT TSVWithNames"
+        collector, columns = _Collector(max_rows, max_bytes), []
+        async with self._client().stream("POST", self._url, params=params,
+                                       content=query.encode(), auth=self._auth) as resp:
+            if resp.status_code != 200:
+                body = (await resp.aread()).decode(errors="ignore")
+                raise RuntimeError(f"ClickHouse {resp.status_code}: {body[:500]}")
+            async for line in resp.aiter_lines():
+                fields = [_tsv_unescape(f) for f in line.split("\t")]
+                if not columns:
+                    columns = fields
+                elif not collector.add(fields):
+                    break                     # closing the stream aborts the transfer
+        return QueryResult(columns, collector.rows, collector.truncated, collector.nbytes)
+
+
+# ── rendering ──────────────────────────────────────────────────────────
+def render_table(result: QueryResult, max_cell: int = 30) -> str:
+    """Compact fixed-width table for Slack (inside a code block)."""
+    if not result.columns:
+        return "(no columns)"
+    cells = [[str(c) for c in result.columns]] + [
+        ["NULL" if v is None else str(v) for v in row] for row in result.rows
+    ]
+    cells = [[c if len(c) <= max_cell else c[: max_cell - 1] + "…" for c in row] for row in cells]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(cells[0]))]
+    lines = [" | ".join(c.ljust(w) for c, w in zip(row, widths)).rstrip() for row in cells]
+    lines.insert(1, "-+-".join("-" * w for w in widths))
+    footer = f"{len(result.rows)} row(s)"
+    if result.truncated:
+        footer += " – truncated, add filters / LIMIT for the rest"
+    return "```\n" + "\n".join(lines) + f"\n```\n{footer}"
+
+
+# ── backend selection ──────────────────────────────────────────────────
+_backend = None
+
+def get_backend():
+    """Backend chosen by SQL_BACKEND (None when execution is disabled)."""
+    global _backend
+    kind = os.getenv("SQL_BACKEND", SQL_BACKEND).lower()
+    if _backend is None and kind != "none":
+        if kind == "sqlite":
+            _backend = SQLiteBackend(os.getenv("SQL_SQLITE_PATH", "data/analytics.sqlite"))
+        elif kind == "duckdb":
+            _backend = DuckDBBackend(os.getenv("SQL_DUCKDB_PATH", "data/analytics.duckdb"))
+        elif kind == "clickhouse":
+            _backend = ClickHouseHTTPBackend(
+                os.getenv("CLICKHOUSE_URL", "http://localhost:8123"),
+                user=os.getenv("CLICKHOUSE_USER", "default"),
+                password=os.getenv("CLICKHOUSE_PASSWORD", ""),
+                database=os.getenv("CLICKHOUSE_DATABASE", "default"),
+            )
+        else:
+            raise ValueError(f"unknown SQL_BACKEND {kind!r}")
+    return _backend
+
+
+async def run_query(sql: str, max_rows: int = DATA_CUTOFF_LIMIT,
+                    max_bytes: int = SQL_RESULT_MAX_BYTES) -> QueryResult:
+    backend = get_backend()
+    if backend is None:
+        raise RuntimeError("SQL execution is disabled (SQL_BACKEND=none)")
+    return await backend.execute(sql, max_rows, max_bytes)
@@ -0,0 +1,288 @@
+# utils/sql_validator.py  –  offline static checks for SATWIK's ClickHouse SQL
+import re
+
+# ── lexer ──────────────────────────────────────────────────────────────
+_SQL_BLOCK = re.compile(r"```sql\s*(.*?)```", re.S | re.I)
+_COMMENT   = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_TOKEN     = re.compile(
+    r"""(?P<str>'(?:[^'\\]|\\.|'')*')
+      | (?P<qid>`[^`]+`|"[^"]+")
+      | (?P<num>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<id>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op>->|<=|>=|!=|<>|\|\||::|[(),.;*+\-/%=<>\[\]{}?:])
+      | (?P<ws>\s+)
+      | (?P<bad>.)""",
+    re.X | re.S,
+)
+
+KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "as", "on", "join", "left",
+    "right", "inner", "outer", "full", "cross", "group", "by", "order", "having",
+    "limit", "offset", "with", "case", "when", "then", "else", "end", "is", "null",
+    "between", "like", "ilike", "distinct", "asc", "desc", "union", "all", "any",
+    "interval", "second", "minute", "hour", "day", "week", "month", "quarter", "year",
+    "using", "over", "partition", "rows", "range", "preceding", "following",
+    "unbounded", "current", "row", "exists", "true", "false", "settings", "format",
+    "final", "prewhere", "array", "global", "nulls", "first", "last", "semi", "anti",
+    "asof", "totals", "rollup", "cube", "top", "ties", "fill", "except", "intersect",
+    "sample", "if", "cast", "extract", "values", "filter", "within", "qualify",
+    "both", "leading", "trailing", "for",
+}
+TYPES = {
+    "date", "date32", "datetime", "datetime64", "string", "fixedstring", "uuid",
+    "uint8", "uint16", "uint32", "uint64", "int8", "int16", "int32", "int64",
+    "float32", "float64", "decimal", "nullable", "lowcardinality", "bool",
+}
+FUNCTIONS = {
+    # aggregates
+    "count", "sum", "avg", "min", "max", "uniq", "uniqexact", "any", "anylast",
+    "argmin", "argmax", "median", "quantile", "quantiles", "grouparray",
+    "groupuniqarray", "countif", "sumif", "avgif", "minif", "maxif", "uniqif",
+    "uniqexactif", "stddevpop", "stddevsamp", "varpop", "varsamp", "topk",
+    # conditionals / nulls
+    "if", "multiif", "coalesce", "ifnull", "nullif", "isnull", "isnotnull", "assumenotnull",
+    # dates
+    "date", "time", "hour", "today", "yesterday", "now", "now64", "todate", "todatetime",
+    "todatetime64", "totime", "toyear", "toquarter", "tomonth", "toweek", "todayofmonth",
+    "todayofweek", "todayofyear", "tohour", "tominute", "tosecond", "toyyyymm",
+    "toyyyymmdd", "tostartofday", "tostartofweek", "tostartofmonth", "tostartofquarter",
+    "tostartofyear", "tostartofhour", "tostartofinterval", "tomonday", "datediff",
+    "date_diff", "dateadd", "date_add", "datesub", "date_sub", "adddays", "addhours",
+    "addweeks", "addmonths", "addyears", "subtractdays", "subtracthours",
+    "subtractweeks", "subtractmonths", "subtractyears", "formatdatetime", "date_trunc",
+    "datetrunc", "parsedatetimebesteffort", "totimezone", "tounixtimestamp",
+    "tointervalday", "tointervalweek", "tointervalmonth", "tointervalhour",
+    # casts / numbers
+    "tostring", "toint8", "toint16", "toint32", "toint64", "touint8", "touint16",
+    "touint32", "touint64", "tofloat32", "tofloat64", "todecimal32", "todecimal64",
+    "round", "floor", "ceil", "abs", "greatest", "least", "intdiv", "modulo", "pow",
+    "sqrt", "log", "exp",
+    # strings / arrays
+    "lower", "upper", "length", "concat", "substring", "substr", "trim", "trimboth",
+    "replaceall", "replaceone", "position", "positioncaseinsensitive", "match",
+    "extract", "splitbychar", "splitbystring", "has", "hasany", "arrayjoin",
+    "arraymap", "arrayfilter", "arrayexists", "arrayall", "arraycount", "arraysum",
+    "arrayfirst", "arraysort", "arraydistinct", "arraystringconcat", "empty", "notempty", "like",
+    "ilike", "jsonextractstring", "jsonextractint", "jsonextractraw", "in", "notin",
+    "cast", "tuple",
+    # window
+    "row_number", "rank", "dense_rank", "lag", "lead", "laginframe", "leadinframe",
+    "first_value", "last_value",
+}
+# keywords that legitimately precede "(" without being functions
+_PAREN_KEYWORDS = {"in", "exists", "over", "as", "from", "join", "using", "values",
+                   "and", "or", "not", "on", "where", "having", "select", "when",
+                   "then", "else", "by", "filter", "within", "all", "any", "union"}
+_WRITE = {"insert", "alter", "drop", "truncate", "delete", "update", "create",
+          "rename", "optimize", "attach", "detach", "grant", "revoke", "kill", "system"}
+
+_CALLABLE = FUNCTIONS | _PAREN_KEYWORDS | TYPES
+# aggregate combinators, stripped from the end: sumIf, uniqArrayIf, countDistinct, avgState …
+_COMBINATORS = ("mergestate", "simplestate", "state", "merge", "if", "array", "distinct",
+                "ornull", "ordefault", "foreach", "resample", "map")
+# families with many spelled-out variants: quantileExact, uniqCombined64, toLastDayOfMonth …
+_FUNCTION_FAMILIES = (
+    "quantile", "uniq", "array", "grouparray", "groupbit", "topk", "stddev", "var",
+    "covar", "corr", "argmin", "argmax", "any", "tostartof", "tolastdayof", "torelative",
+    "tointerval", "todatetime", "todecimal", "toint", "touint", "tofloat", "tounix",
+    "jsonextract", "jsonhas", "json_", "multisearch", "replace", "split",
+)
+# functions whose arguments use FROM / IN as keywords: EXTRACT(YEAR FROM d)
+_KEYWORD_ARG_FUNCS = {"extract", "trim", "substring", "position", "overlay"}
+# clauses after which names are settings / formats, not columns
+_TRAILING_CLAUSES = {"settings", "format"}
+
+DEFAULT_EXCLUDED_STATUSES = ("wc-failed", "trash", "wc-pending")
+
+
+def extract_sql(text: str) -> str | None:
+    """SQL inside the first ```sql block of a model answer (None if absent)."""
+    m = _SQL_BLOCK.search(text or "")
+    return m.group(1).strip() if m else None
+
+
+def _tokens(sql: str) -> list[tuple[str, str]]:
+    out = []
+    for m in _TOKEN.finditer(_COMMENT.sub(" ", sql)):
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        val = m.group()
+        if kind == "qid":
+            kind, val = "id", val[1:-1]
+        out.append((kind, val))
+    return out
+
+
+# ── checks ─────────────────────────────────────────────────────────────
+def is_read_only(sql: str) -> bool:
+    """Single SELECT / WITH statement without write keywords."""
+    toks = _tokens(sql)
+    if not toks or toks[0][1].lower() not in ("select", "with", "("):
+        return False
+    if any(val == ";" for _, val in toks[:-1]):
+        return False
+    return not any(kind == "id" and val.lower() in _WRITE for kind, val in toks)
+
+def validate_sql(sql: str, columns: set[str], tables: set[str], question: str = "") -> list[str]:
+    """
+    Return a list of human-readable problems (empty list → looks valid).
+
+    Checks: read-only statement, balanced parentheses, every table exists,
+    every identifier is a known column / alias / CTE / function, and the
+    default `order_status` exclusion from SATWIK's rules is applied.
+    """
+    errors: list[str] = []
+    toks = _tokens(sql)
+    if not toks:
+        return ["empty query"]
+
+    if not is_read_only(sql):
+        return ["only a single read-only SELECT query is allowed"]
+    for kind, val in toks:
+        if kind == "bad":
+            errors.append(f"unexpected character {val!r}")
+            break
+
+    depth = 0
+    for _, val in toks:
+        depth += (val == "(") - (val == ")")
+        if depth < 0:
+            break
+    if depth != 0:
+        errors.append("unbalanced parentheses")
+
+    # token positions to leave alone: arguments of EXTRACT(… FROM …) and
+    # friends, and everything after SETTINGS / FORMAT
+    in_keyword_func, skipped = _keyword_arg_positions(toks), set()
+    for i, (kind, val) in enumerate(toks):
+        if kind == "id" and val.lower() in _TRAILING_CLAUSES and not in_keyword_func[i]:
+            skipped.update(range(i, len(toks)))
+            break
+
+    # pass 1: names introduced by the query itself
+    ctes, aliases, table_aliases, lambda_args, used_tables = set(), set(), set(), set(), []
+    table_positions: set[int] = set()
+    for i, (kind, val) in enumerate(toks):
+        if kind != "id" or i in skipped:
+            continue
+        low = val.lower()
+        prev = toks[i - 1][1].lower() if i else ""
+        nxt = toks[i + 1] if i + 1 < len(toks) else ("", "")
+        if nxt[1] == "->":                                  # x -> expr
+            lambda_args.add(val)
+        elif low == "as" and nxt[0] == "id":                # expr AS alias
+            aliases.add(nxt[1])
+        elif low not in KEYWORDS and low not in TYPES and nxt[1] not in ("(", ".") \
+                and _ends_expression(toks, i - 1):          # expr alias / (subquery) alias
+            aliases.add(val)
+            table_aliases.add(val)
+        elif nxt[1].lower() == "as" and prev in ("with", ",") \
+                and i + 2 < len(toks) and toks[i + 2][1] == "(":
+            ctes.add(val)                                   # WITH name AS ( … )
+        elif low in ("from", "join") and nxt[0] == "id" and not in_keyword_func[i]:
+            j, name = i + 1, nxt[1]
+            table_positions.add(j)
+            while j + 2 < len(toks) and toks[j + 1][1] == "." and toks[j + 2][0] == "id":
+                name += "." + toks[j + 2][1]
+                j += 2
+                table_positions.add(j)
+            used_tables.append(name)
+            alias = toks[j + 1] if j + 1 < len(toks) else ("", "")
+            if alias[1].lower() == "as" and j + 2 < len(toks):
+                alias = toks[j + 2]
+            if alias[0] == "id" and alias[1].lower() not in KEYWORDS:
+                table_aliases.add(alias[1])
+
+    for name in used_tables:
+        if name not in tables and name not in ctes:
+            errors.append(f"unknown table {name!r}")
+
+    # pass 2: every other identifier must resolve
+    known = columns | aliases | ctes | table_aliases | lambda_args
+    owners = ctes | table_aliases | {p for t in tables for p in (t, *t.split("."))}
+    unknown_cols, unknown_funcs = [], []
+    for i, (kind, val) in enumerate(toks):
+        if kind != "id" or i in table_positions or i in skipped:
+            continue
+        low = val.lower()
+        prev = toks[i - 1][1] if i else ""
+        nxt = toks[i + 1][1] if i + 1 < len(toks) else ""
+        if nxt == "(":
+            if not is_known_function(low) and val not in ctes:
+                unknown_funcs.append(val)
+        elif nxt == ".":                                    # owner of owner.name
+            continue
+        elif prev == ".":
+            owner = toks[i - 2][1] if i >= 2 else ""
+            if owner in owners and val not in columns and val not in aliases:
+                unknown_cols.append(f"{owner}.{val}")
+        elif low not in KEYWORDS and low not in TYPES and val not in known:
+            unknown_cols.append(val)
+
+    for name in dict.fromkeys(unknown_cols):
+        errors.append(f"unknown column {name!r}")
+    for name in dict.fromkeys(unknown_funcs):
+        errors.append(f"unknown function {name}()")
+
+    errors.extend(check_rules(toks, question))
+    return errors
+
+
+def is_known_function(name: str) -> bool:
+    """Known function (case-insensitive), allowing combinator suffixes and families."""
+    name = name.lower()
+    while True:
+        if name in _CALLABLE or name.startswith(_FUNCTION_FAMILIES):
+            return True
+        for suffix in _COMBINATORS:
+            if name.endswith(suffix) and len(name) > len(suffix):
+                name = name[: -len(suffix)]
+                break
+        else:
+            return False
+
+
+def _keyword_arg_positions(toks) -> list[bool]:
+    """True for tokens directly inside EXTRACT( … ), TRIM( … ) etc."""
+    flags, stack = [], []
+    for i, (_, val) in enumerate(toks):
+        flags.append(bool(stack) and stack[-1])
+        if val == "(":
+            prev = toks[i - 1][1].lower() if i else ""
+            stack.append(prev in _KEYWORD_ARG_FUNCS)
+        elif val == ")" and stack:
+            stack.pop()
+    return flags
+
+
+def _ends_expression(toks, j: int) -> bool:
+    """Whether toks[j] can end an expression, so a bare name after it is an alias."""
+    if j < 0:
+        return False
+    kind, val = toks[j]
+    if val == ")" or kind in ("num", "str"):
+        return True
+    if kind != "id":
+        return False
+    low = val.lower()
+    if low == "end":                                        # CASE … END alias
+        return True
+    return low not in KEYWORDS                              # a column or table name
+
+
+def check_rules(toks, question: str = "") -> list[str]:
+    """SATWIK business rules that can be verified statically."""
+    errors = []
+    q = question.lower()
+    literals = {val.strip("'") for kind, val in toks if kind == "str"}
+    idents = {val for kind, val in toks if kind == "id"}
+    user_asked = "order_status" in q or any(s in q for s in DEFAULT_EXCLUDED_STATUSES)
+    if not user_asked:
+        missing = [s for s in DEFAULT_EXCLUDED_STATUSES if s not in literals]
+        if "order_status" not in idents or missing:
+            errors.append(
+                "rule 6: add `order_status NOT IN ('wc-failed','trash','wc-pending')` "
+                "(default exclusion, the user did not ask about these statuses)"
+            )
+    return errors
@@ -0,0 +1,83 @@
+import logging
+from langchain_core.messages import SystemMessage, HumanMessage, RemoveMessage
+from utils.llmUtils import getLLM, message_text, message_tokens, count_tokens
+from constants import SUMMARY_TRIGGER_TOKENS, SUMMARY_KEEP_TURNS, SUMMARY_MODEL
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_NAME = "conversation_summary"
+MAX_TRANSCRIPT_TOKENS = 30000     # input cap for one summarization call
+MAX_MESSAGE_CHARS = 4000          # long tool payloads are clipped in the transcript
+
+SUMMARY_PROMPT = """
+Summarize the conversation below between a user and the Newme assistant so it
+can replace the original messages. Keep every fact that may be needed later:
+order ids, item ids, PR URLs, table names, SQL that was produced, decisions and
+open questions. Drop pleasantries. Write compact plain text, at most 250 words.
+If a previous summary is included, merge it into the new one.
+"""
+
+llm = getLLM("openai", "SUMMARIZER", model=SUMMARY_MODEL)
+
+
+def is_summary(message) -> bool:
+    return getattr(message, "name", None) == SUMMARY_NAME
+
+
+def needs_compaction(messages: list, threshold: int = SUMMARY_TRIGGER_TOKENS) -> bool:
+    return sum(message_tokens(m) for m in messages) > threshold
+
+
+def split_for_compaction(messages: list, keep_turns: int = SUMMARY_KEEP_TURNS) -> list:
+    """
+    Return the messages to fold into the summary: everything after the
+    session header and before the last `keep_turns` human turns.
+    """
+    start = 1 if messages and messages[0].type == "system" and not is_summary(messages[0]) else 0
+    humans = [i for i, m in enumerate(messages) if m.type == "human"]
+    if len(humans) <= keep_turns:
+        return []
+    end = humans[-keep_turns]
+    return messages[start:end]
+
+
+def _transcript(messages: list) -> str:
+    lines, total = [], 0
+    for m in reversed(messages):                 # newest first so the cap drops the oldest
+        text = message_text(m)
+        if len(text) > MAX_MESSAGE_CHARS:
+            text = text[:MAX_MESSAGE_CHARS] + " …[truncated]"
+        line = f"{'previous summary' if is_summary(m) else m.type}: {text}"
+        total += count_tokens(line)
+        if total > MAX_TRANSCRIPT_TOKENS:
+            break
+        lines.append(line)
+    return "\n".join(reversed(lines))
+
+
+async def compact(app, config: dict, messages: list) -> bool:
+    """
+    Replace old turns of the checkpointed thread with one summary message.
+
+    The summary reuses the id of the first folded message, so add_messages
+    swaps it in place and the summary keeps its position in the history.
+    """
+    old = split_for_compaction(messages)
+    if len(old) < 2:
+        return False
+
+    result = await llm.ainvoke([
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=_transcript(old)),
+    ])
+    summary = SystemMessage(
+        id=old[0].id,
+        name=SUMMARY_NAME,
+        content=f"Summary of the earlier conversation:\n{result.content}",
+    )
+    await app.aupdate_state(
+        config, {"messages": [summary] + [RemoveMessage(id=m.id) for m in old[1:]]}
+    )
+    logger.info(f"compacted {len(old)} messages into a summary "
+                f"({message_tokens(summary)} tokens)")
+    return True